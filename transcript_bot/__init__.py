@@ -4,6 +4,12 @@ __version__ = "1.0.0"
 __author__ = "Your Name"
 __email__ = "your.email@example.com"
 
-from .core.bot import main
-
 __all__ = ["main"]
+
+
+def __getattr__(name):
+    # Importing the bot pulls in telegram and every handler; defer until used
+    if name == "main":
+        from .core.bot import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
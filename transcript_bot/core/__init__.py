@@ -1,5 +1,10 @@
 """Core bot functionality."""
 
-from .bot import main
-
 __all__ = ["main"]
+
+
+def __getattr__(name):
+    if name == "main":
+        from .bot import main
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,8 +4,11 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
 import logging
 import os
+import time
+from urllib.parse import urlparse
 
 from telegram import Update
 from telegram.ext import (
@@ -16,40 +19,198 @@ from telegram.ext import (
     filters,
 )
 
-from ..handlers import start, handle_voice, handle_audio, handle_video_note, setlang, command, history
-from ..handlers.callbacks import handle_retry_callback, handle_language_callback, handle_summarize_callback, handle_show_full_callback, handle_transcript_full_callback, handle_disabled_callback
+from ..handlers import start, handle_voice, handle_audio, handle_video_note, setlang, setmodel, command, history
+from ..handlers.callbacks import handle_retry_callback, handle_cancel_callback, handle_language_callback, handle_model_callback, handle_summarize_callback, handle_show_full_callback, handle_transcript_full_callback, handle_disabled_callback
+from ..db import init_database, get_quota_buckets
+from ..utils import warm_user_cache, TELEGRAM_LOCAL_MODE
 from ..utils.logger import setup_logging, log_user_action
+from ..utils.workers import run_in_worker
+from ..utils.governor import apply_thread_limits
+from ..utils.outbox import OutputScheduler
+from ..transcribers import warm_up
+from .jobs import schedule_jobs, sync_quotas
+from ..utils.quota import quotas
+from .health import start_health_server, mark_ready
+from ..pipeline import start_pipeline, get_pipeline
+from ..pipeline.intake import FRONTEND_ONLY
 
-# Setup enhanced logging
-setup_logging()
 logger = logging.getLogger(__name__)
 
+# Self-hosted Bot API server (e.g. http://localhost:8081), api.telegram.org if empty
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").rstrip("/")
+
+# Public URL to receive updates on (behind TLS termination); polls if empty
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+
+# Address and port of the embedded webhook server
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+
+# Telegram echoes it in X-Telegram-Bot-Api-Secret-Token; other requests are refused
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Connections Telegram opens to the webhook at once (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Only the update types there are handlers for
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Skip the warm-up inference (the model then loads on the first job)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
+
+# Seconds between warm-up attempts after a failure, doubling up to the maximum
+WARMUP_RETRY_SECONDS = 5
+WARMUP_RETRY_MAX_SECONDS = 300
+
+
+async def warm_up_backend() -> None:
+    """
+    Load and warm the backend on the worker pool, then report ready.
+
+    A failed warm-up is retried with backoff; until one succeeds /readyz
+    keeps answering 503 so the replica gets no traffic.
+    """
+    delay = WARMUP_RETRY_SECONDS
+    while WARMUP_ENABLED:
+        start = time.perf_counter()
+        try:
+            # Jobs arriving meanwhile wait on the model load lock
+            await run_in_worker(warm_up)
+            logger.info(f"Backend warmed up in {time.perf_counter() - start:.1f}s")
+            break
+        except Exception as e:
+            logger.error(f"Backend warm-up failed, retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+    mark_ready()
+
+
+async def post_init(application: Application) -> None:
+    """Start the pipeline and health server, and warm up the backend in the background."""
+    try:
+        application.bot_data["health_server"] = await start_health_server()
+    except OSError as e:
+        logger.error(f"Failed to start health server: {e}")
+
+    # A frontend only queues jobs, the workers load the backend
+    if FRONTEND_ONLY:
+        logger.info("Frontend mode: jobs are queued for `run.py worker` processes")
+        mark_ready()
+        return
+
+    start_pipeline(application.bot)
+    application.bot_data["warm_up_task"] = asyncio.create_task(warm_up_backend())
+
+
+async def post_shutdown(application: Application) -> None:
+    """Stop the pipeline and the health server, and save quota usage."""
+    # A failing warm-up retries until cancelled
+    warm_up_task = application.bot_data.get("warm_up_task")
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    if not FRONTEND_ONLY:
+        await get_pipeline().stop()
+    if quotas.enabled:
+        try:
+            await sync_quotas()
+        except Exception as e:
+            logger.error(f"Failed to save quotas: {e}")
+    server = application.bot_data.get("health_server")
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
 
 def main() -> None:
     """Start the bot."""
+    # Setup enhanced logging (the CLI may already have done it)
+    if not logging.getLogger().handlers:
+        setup_logging()
+
+    # No-op for variables the CLI already set
+    apply_thread_limits()
+
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not token:
         raise ValueError("TELEGRAM_BOT_TOKEN environment variable is not set")
 
-    application = Application.builder().token(token).build()
+    if TELEGRAM_LOCAL_MODE and not TELEGRAM_API_URL:
+        raise ValueError("TELEGRAM_LOCAL_MODE needs TELEGRAM_API_URL pointing to a local Bot API server")
+
+    try:
+        init_database()
+    except Exception as e:
+        logger.error(f"Database initialization error: {e}")
+
+    builder = (
+        Application.builder()
+        .token(token)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        # Every outgoing message goes through the rate-aware scheduler
+        .rate_limiter(OutputScheduler())
+    )
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_URL}/bot").base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+    if TELEGRAM_LOCAL_MODE:
+        # get_file returns paths on the server's disk, read without a download
+        builder = builder.local_mode(True)
+        logger.info(f"Using local Bot API server at {TELEGRAM_API_URL}")
+    application = builder.build()
+
+    # Load user profiles once so lookups never hit the database per message
+    try:
+        logger.info(f"Warmed user cache with {warm_user_cache()} profiles")
+    except Exception as e:
+        logger.error(f"Failed to warm user cache: {e}")
+
+    # Quota checks are answered from memory, the database shares them between frontends
+    if quotas.enabled:
+        try:
+            rows = get_quota_buckets()
+            quotas.load(rows)
+            logger.info(f"Loaded {len(rows)} quota buckets")
+        except Exception as e:
+            logger.error(f"Failed to load quotas: {e}")
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("setlang", setlang))
+    application.add_handler(CommandHandler("setmodel", setmodel))
     application.add_handler(CommandHandler("command", command))
     application.add_handler(CommandHandler("history", history))
     application.add_handler(MessageHandler(filters.VOICE, handle_voice))
     application.add_handler(MessageHandler(filters.AUDIO, handle_audio))
     application.add_handler(MessageHandler(filters.VIDEO_NOTE, handle_video_note))
     application.add_handler(CallbackQueryHandler(handle_retry_callback, pattern=r"^retry_"))
+    application.add_handler(CallbackQueryHandler(handle_cancel_callback, pattern=r"^cancel_"))
     application.add_handler(CallbackQueryHandler(handle_language_callback, pattern=r"^lang_"))
+    application.add_handler(CallbackQueryHandler(handle_model_callback, pattern=r"^model_"))
     application.add_handler(CallbackQueryHandler(handle_summarize_callback, pattern=r"^summarize_"))
     application.add_handler(CallbackQueryHandler(handle_transcript_full_callback, pattern=r"^transcript_full_"))
     application.add_handler(CallbackQueryHandler(handle_show_full_callback, pattern=r"^show_full_"))
     application.add_handler(CallbackQueryHandler(handle_disabled_callback, pattern=r"^sent_disabled$"))
 
-    logger.info("Bot started")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    # Background jobs
+    schedule_jobs(application)
+
+    if WEBHOOK_URL:
+        if not WEBHOOK_SECRET:
+            logger.warning("WEBHOOK_SECRET is not set: anyone who finds the webhook URL can post updates")
+        logger.info(f"Bot started, receiving updates on {WEBHOOK_URL}")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=urlparse(WEBHOOK_URL).path.lstrip("/"),
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET or None,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=ALLOWED_UPDATES,
+        )
+    else:
+        logger.info("Bot started")
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
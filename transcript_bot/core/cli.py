@@ -8,8 +8,6 @@ from typing import Optional
 import click
 from dotenv import load_dotenv
 
-from .bot import main as run_bot
-
 # Load environment variables
 load_dotenv()
 
@@ -46,7 +44,54 @@ def cli():
     is_flag=True,
     help="Check configuration without starting the bot"
 )
-def run(env: Optional[str], token: Optional[str], log_level: str, check: bool):
+@click.option(
+    "--api-url",
+    type=str,
+    help="URL of a self-hosted Bot API server"
+)
+@click.option(
+    "--local",
+    is_flag=True,
+    help="Read files from disk (Bot API server started with --local)"
+)
+@click.option(
+    "--webhook",
+    type=str,
+    help="Receive updates on this public URL instead of polling"
+)
+@click.option(
+    "--port",
+    type=int,
+    help="Port of the embedded webhook server (default: 8443)"
+)
+@click.option(
+    "--secret-token",
+    type=str,
+    help="Secret Telegram must send with every webhook request"
+)
+@click.option(
+    "--max-connections",
+    type=click.IntRange(1, 100),
+    help="Concurrent webhook connections Telegram may open (default: 40)"
+)
+@click.option(
+    "--frontend",
+    is_flag=True,
+    help="Only queue jobs; `worker` processes transcribe them"
+)
+def run(
+    env: Optional[str],
+    token: Optional[str],
+    log_level: str,
+    check: bool,
+    api_url: Optional[str],
+    local: bool,
+    webhook: Optional[str],
+    port: Optional[int],
+    secret_token: Optional[str],
+    max_connections: Optional[int],
+    frontend: bool,
+):
     """Run the transcription bot."""
 
     # Override environment if specified
@@ -57,8 +102,29 @@ def run(env: Optional[str], token: Optional[str], log_level: str, check: bool):
     if token:
         os.environ["TELEGRAM_BOT_TOKEN"] = token
 
+    # Set before the utils are imported, they read it for MAX_FILE_SIZE
+    if api_url:
+        os.environ["TELEGRAM_API_URL"] = api_url
+    if local:
+        os.environ["TELEGRAM_LOCAL_MODE"] = "true"
+
+    # Webhook settings
+    if webhook:
+        os.environ["WEBHOOK_URL"] = webhook
+    if port:
+        os.environ["WEBHOOK_PORT"] = str(port)
+    if secret_token:
+        os.environ["WEBHOOK_SECRET"] = secret_token
+    if max_connections:
+        os.environ["WEBHOOK_MAX_CONNECTIONS"] = str(max_connections)
+
+    if frontend:
+        os.environ["PROCESSING_MODE"] = "frontend"
+
     # Set log level
     import logging
+    from ..utils.logger import setup_logging
+    setup_logging()
     logging.getLogger().setLevel(getattr(logging, log_level.upper()))
 
     # Check configuration
@@ -76,19 +142,34 @@ def run(env: Optional[str], token: Optional[str], log_level: str, check: bool):
             click.echo("⚠️  WARNING: OPENAI_API_KEY is not set for production mode!", err=True)
             click.echo("The bot will not work without it.", err=True)
 
+    local_mode = os.getenv("TELEGRAM_LOCAL_MODE", "false").lower() == "true"
+    if local_mode and not os.getenv("TELEGRAM_API_URL"):
+        click.echo("❌ Local mode needs a Bot API server URL (--api-url or TELEGRAM_API_URL)", err=True)
+        sys.exit(1)
+
     if check:
         click.echo("✅ Configuration check passed!")
         click.echo(f"   Environment: {environment}")
         click.echo(f"   Log Level: {log_level}")
         click.echo(f"   Bot Token: {'✓ Set' if bot_token else '✗ Missing'}")
+        click.echo(f"   Bot API: {os.getenv('TELEGRAM_API_URL') or 'api.telegram.org'}{' (local mode)' if local_mode else ''}")
+        click.echo(f"   Updates: {os.getenv('WEBHOOK_URL') or 'long polling'}")
+        click.echo(f"   Processing: {os.getenv('PROCESSING_MODE', 'local')}")
         if environment == "production":
             api_key = os.getenv("OPENAI_API_KEY")
             click.echo(f"   OpenAI API Key: {'✓ Set' if api_key else '✗ Missing'}")
         return
 
-    click.echo(f"🚀 Starting transcription bot in {environment} mode...")
+    click.echo(f"🚀 Starting transcription bot in {environment} mode ({'webhook' if os.getenv('WEBHOOK_URL') else 'polling'})...")
     click.echo(f"📊 Log level: {log_level}")
 
+    # Cap BLAS/OpenMP threads before anything imports numpy
+    from ..utils.governor import apply_thread_limits
+    apply_thread_limits()
+
+    # Imported here so other commands don't pay for telegram and the handlers
+    from .bot import main as run_bot
+
     try:
         run_bot()
     except KeyboardInterrupt:
@@ -98,6 +179,83 @@ def run(env: Optional[str], token: Optional[str], log_level: str, check: bool):
         sys.exit(1)
 
 
+@cli.command()
+@click.option(
+    "--env",
+    type=click.Choice(["development", "production"], case_sensitive=False),
+    help="Override environment setting"
+)
+@click.option(
+    "--token",
+    type=str,
+    help="Override Telegram bot token"
+)
+@click.option(
+    "--log-level",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False),
+    default="INFO",
+    help="Set logging level"
+)
+@click.option(
+    "--api-url",
+    type=str,
+    help="URL of a self-hosted Bot API server"
+)
+@click.option(
+    "--local",
+    is_flag=True,
+    help="Read files from disk (Bot API server started with --local)"
+)
+@click.option(
+    "--worker-id",
+    type=str,
+    help="Name of this worker in job leases (default: host:pid)"
+)
+def worker(
+    env: Optional[str],
+    token: Optional[str],
+    log_level: str,
+    api_url: Optional[str],
+    local: bool,
+    worker_id: Optional[str],
+):
+    """Transcribe jobs queued by a `run --frontend` bot."""
+
+    if env:
+        os.environ["ENVIRONMENT"] = env.lower()
+    if token:
+        os.environ["TELEGRAM_BOT_TOKEN"] = token
+    if api_url:
+        os.environ["TELEGRAM_API_URL"] = api_url
+    if local:
+        os.environ["TELEGRAM_LOCAL_MODE"] = "true"
+
+    import logging
+    from ..utils.logger import setup_logging
+    setup_logging()
+    logging.getLogger().setLevel(getattr(logging, log_level.upper()))
+
+    if not os.getenv("TELEGRAM_BOT_TOKEN"):
+        click.echo("❌ TELEGRAM_BOT_TOKEN is not set!", err=True)
+        click.echo("Set it in your .env file or use --token option", err=True)
+        sys.exit(1)
+
+    environment = os.getenv("ENVIRONMENT", "development").lower()
+    click.echo(f"🛠️  Starting transcription worker in {environment} mode...")
+
+    # Cap BLAS/OpenMP threads before anything imports numpy
+    from ..utils.governor import apply_thread_limits
+    apply_thread_limits()
+
+    from .worker import main as run_worker
+
+    try:
+        run_worker(worker_id)
+    except Exception as e:
+        click.echo(f"❌ Error: {e}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
 def config():
     """Show current configuration."""
@@ -107,6 +265,8 @@ def config():
     api_key = os.getenv("OPENAI_API_KEY")
     whisper_model = os.getenv("WHISPER_MODEL", "base")
     whisper_device = os.getenv("WHISPER_DEVICE", "auto")
+    whisper_profile = os.getenv("WHISPER_PROFILE", "accurate")
+    tune_file = Path(os.getenv("WHISPER_TUNE_FILE", "whisper_tune.json"))
 
     click.echo("📋 Current Configuration:")
     click.echo(f"   Environment: {environment}")
@@ -114,6 +274,7 @@ def config():
     click.echo(f"   OpenAI API Key: {'✓ Set' if api_key else '✗ Missing'}")
     click.echo(f"   Whisper Model: {whisper_model}")
     click.echo(f"   Whisper Device: {whisper_device}")
+    click.echo(f"   Whisper Profile: {whisper_profile} ({'tuned' if tune_file.exists() else 'defaults'})")
 
     # Check .env file
     env_file = Path(".env")
@@ -123,6 +284,229 @@ def config():
         click.echo(f"\n📁 .env file: ✗ Not found (copy from .env.example)")
 
 
+@cli.command()
+def stats():
+    """Show usage statistics aggregated across all database shards."""
+    from ..db import init_database, get_global_stats
+
+    init_database()
+    report = get_global_stats()
+
+    click.echo("📊 Usage Statistics:")
+    click.echo(f"   Transcriptions: {report['total_transcriptions']}")
+    click.echo(f"   Users: {report['total_users']}")
+    click.echo(f"   Audio: {report['total_duration_minutes']} minutes")
+
+    if report['languages']:
+        click.echo("\n🌍 Languages:")
+        for language, count in sorted(report['languages'].items(), key=lambda item: -item[1]):
+            click.echo(f"   {language or 'unknown'}: {count}")
+
+    click.echo(f"\n🗄️  Shards ({len(report['shards'])}):")
+    for shard in report['shards']:
+        click.echo(
+            f"   {shard['path']}: {shard['transcriptions']} transcriptions, "
+            f"{shard['users']} users, {shard['size_bytes'] / 1024:.1f} KB"
+        )
+
+
+@cli.command()
+def vacuum():
+    """Switch the database to incremental vacuum (run with the bot stopped)."""
+    from ..db import init_database
+    from ..db.maintenance import enable_incremental_vacuum
+
+    init_database()
+    click.echo("🧹 Rewriting databases that do not use incremental vacuum yet...")
+    for path, converted in enable_incremental_vacuum().items():
+        click.echo(f"   {path}: {'converted' if converted else 'already incremental'}")
+
+
+@cli.command("startup-profile")
+@click.option(
+    "--module",
+    default="transcript_bot.core.bot",
+    show_default=True,
+    help="Module whose import is profiled"
+)
+@click.option(
+    "--with-backend",
+    is_flag=True,
+    help="Also load the transcription backend selected by ENVIRONMENT"
+)
+@click.option(
+    "--top",
+    type=int,
+    default=15,
+    show_default=True,
+    help="Number of slowest modules to show"
+)
+def startup_profile(module: str, with_backend: bool, top: int):
+    """Print an import-time breakdown of bot startup."""
+    import subprocess
+    import time
+
+    code = f"import {module}"
+    if with_backend:
+        code += "; from transcript_bot.transcribers import get_backend; get_backend()"
+
+    # Run in a fresh interpreter so nothing is already cached in sys.modules
+    project_root = str(Path(__file__).resolve().parents[2])
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [project_root, env.get("PYTHONPATH")]))
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    wall_time = time.perf_counter() - start
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        click.echo("❌ Import failed:\n" + "\n".join(errors[-5:]), err=True)
+        sys.exit(1)
+
+    packages = {}
+    for name, self_us, _ in modules:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+
+    click.echo(f"⏱️  Startup profile for: {code}")
+    click.echo(f"   Wall time (incl. interpreter): {wall_time * 1000:.0f} ms")
+    click.echo(f"   Imports: {len(modules)} modules, {sum(m[1] for m in modules) / 1000:.0f} ms")
+
+    click.echo("\n📦 By top-level package:")
+    for root, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        click.echo(f"   {self_us / 1000:8.1f} ms  {root}")
+
+    click.echo("\n🐢 Slowest modules (cumulative):")
+    for name, _, cumulative_us in sorted(modules, key=lambda item: -item[2])[:top]:
+        click.echo(f"   {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+@cli.command()
+@click.option(
+    "--model",
+    default=lambda: os.getenv("WHISPER_MODEL", "base"),
+    show_default="WHISPER_MODEL",
+    help="Whisper model to benchmark"
+)
+@click.option(
+    "--samples",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    required=True,
+    help="Folder of real speech recordings similar to your users' audio"
+)
+@click.option(
+    "--cpus",
+    type=int,
+    help="Core budget to tune for (default: all cores)"
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Where to write the tuned profiles (default: WHISPER_TUNE_FILE)"
+)
+def tune(model: str, samples: Path, cpus: Optional[int], output: Optional[Path]):
+    """Benchmark decoding settings and save the fastest per profile."""
+    from ..transcribers.profiles import WHISPER_TUNE_FILE, save_tuning
+    from ..transcribers.routing import WHISPER_POOL, parse_pool
+    from ..transcribers.tuning import load_samples, benchmark, default_device
+
+    output = output or WHISPER_TUNE_FILE
+    device = default_device()
+    cpus = cpus or os.cpu_count() or 1
+
+    # Tuned settings only apply to the model they were measured on
+    configured = [name for name, _ in parse_pool(WHISPER_POOL, os.getenv("WHISPER_MODEL", "base"))]
+    if model not in configured:
+        click.echo(f"⚠️  {model} is not WHISPER_MODEL or in WHISPER_POOL ({', '.join(configured)}); "
+                   f"the bot will not apply these settings.")
+
+    sample_paths = load_samples(samples)
+    click.echo(f"🔧 Tuning {model} on {device} with {cpus} cores, {len(sample_paths)} samples")
+    click.echo(f"\n   {'compute':<14}{'threads':>8}{'workers':>8}{'beam':>6}{'RTF':>8}")
+
+    def report(result: dict) -> None:
+        click.echo(
+            f"   {result['compute_type']:<14}{result['cpu_threads']:>8}{result['num_workers']:>8}"
+            f"{result['beam_size']:>6}{result['rtf']:>8.3f}"
+        )
+
+    try:
+        best, results = benchmark(model, device, sample_paths, cpus, progress=report)
+    except ValueError as e:
+        click.echo(f"❌ {e}", err=True)
+        sys.exit(1)
+    finally:
+        for path in sample_paths:
+            os.unlink(path)
+
+    save_tuning(output, model, device, best, results)
+
+    click.echo("\n🏆 Best settings per profile:")
+    for name, result in best.items():
+        click.echo(
+            f"   {name}: {result['compute_type']}, cpu_threads={result['cpu_threads']}, "
+            f"num_workers={result['num_workers']}, beam_size={result['beam_size']} (RTF {result['rtf']:.3f})"
+        )
+    click.echo(f"\n✅ Saved to {output}; the bot applies it to {model} for WHISPER_PROFILE on startup.")
+
+
+@cli.command("bench-pipeline")
+@click.option(
+    "--jobs",
+    type=int,
+    default=40,
+    show_default=True,
+    help="Number of jobs in the mixed workload"
+)
+@click.option(
+    "--scale",
+    type=float,
+    default=0.2,
+    show_default=True,
+    help="Multiplier for the simulated stage costs"
+)
+def bench_pipeline(jobs: int, scale: float):
+    """Compare sequential processing with the staged pipeline."""
+    import asyncio
+
+    from ..pipeline.bench import run_benchmark
+    from ..pipeline.stages import DOWNLOAD_CONCURRENCY, DELIVER_CONCURRENCY, PIPELINE_QUEUE_SIZE
+    from ..utils.governor import budget_plan
+
+    click.echo(f"⏱️  Simulating {jobs} mixed jobs (cost scale {scale})...")
+    results = asyncio.run(run_benchmark(
+        jobs,
+        scale=scale,
+        download_concurrency=DOWNLOAD_CONCURRENCY,
+        decode_workers=budget_plan["decode_workers"],
+        inference_workers=budget_plan["inference_workers"],
+        deliver_concurrency=DELIVER_CONCURRENCY,
+        queue_size=PIPELINE_QUEUE_SIZE,
+    ))
+
+    baseline = results[0]["jobs_per_minute"]
+    click.echo(f"\n   {'mode':<34}{'wall s':>8}{'jobs/min':>10}{'gain':>7}{'mean s':>8}{'p95 s':>8}")
+    for result in results:
+        click.echo(
+            f"   {result['mode']:<34}{result['wall_seconds']:>8.1f}{result['jobs_per_minute']:>10.1f}"
+            f"{result['jobs_per_minute'] / baseline:>6.2f}x{result['mean_latency']:>8.1f}{result['p95_latency']:>8.1f}"
+        )
+
+
 @cli.command()
 def init():
     """Initialize a new .env file from template."""
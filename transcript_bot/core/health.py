@@ -0,0 +1,80 @@
+"""Local HTTP endpoints for liveness, readiness and metrics."""
+
+import asyncio
+import logging
+import os
+import threading
+
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Address of the health server; set HEALTH_PORT=0 to disable it
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8080"))
+
+# Set once the transcription backend is loaded and warmed up
+_ready = threading.Event()
+
+
+def mark_ready() -> None:
+    """Report the bot as ready to take jobs."""
+    _ready.set()
+    metrics.set_gauge("bot_ready", 1)
+
+
+def is_ready() -> bool:
+    """Return True once warm-up has finished."""
+    return _ready.is_set()
+
+
+def _route(path: str) -> tuple[int, str, str]:
+    """Return status, content type and body for a request path."""
+    if path == "/healthz":
+        return 200, "text/plain", "ok\n"
+    if path == "/readyz":
+        if is_ready():
+            return 200, "text/plain", "ready\n"
+        return 503, "text/plain", "warming up\n"
+    if path == "/metrics":
+        return 200, "text/plain; version=0.0.4", metrics.render_prometheus()
+    return 404, "text/plain", "not found\n"
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve a single HTTP/1.0-style request and close the connection."""
+    reasons = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 503: "Service Unavailable"}
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain headers; the endpoints take no input
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) < 2 or parts[0] not in ("GET", "HEAD"):
+            status, content_type, body = 405, "text/plain", "method not allowed\n"
+        else:
+            status, content_type, body = _route(parts[1].split("?")[0])
+
+        payload = body.encode()
+        head = (
+            f"HTTP/1.1 {status} {reasons[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode() + (payload if parts and parts[0] != "HEAD" else b""))
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_health_server() -> asyncio.AbstractServer | None:
+    """Start the health server on the running event loop."""
+    if HEALTH_PORT <= 0:
+        return None
+    server = await asyncio.start_server(_handle, HEALTH_HOST, HEALTH_PORT)
+    logger.info(f"Health server listening on {HEALTH_HOST}:{HEALTH_PORT}")
+    return server
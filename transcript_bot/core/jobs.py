@@ -0,0 +1,91 @@
+"""Recurring background jobs scheduled on the application's job queue."""
+
+import asyncio
+import logging
+import os
+
+from telegram.ext import Application, ContextTypes
+
+from ..db import sync_quota_buckets
+from ..db.maintenance import MAINTENANCE_INTERVAL, run_maintenance
+from ..utils.utils import sweep_expired_entries
+from ..utils.quota import QUOTA_SYNC_INTERVAL, quotas
+from ..transcribers import unload_idle_models
+from ..transcribers.model_manager import WHISPER_IDLE_UNLOAD_SECONDS
+from ..pipeline.intake import FRONTEND_ONLY
+
+logger = logging.getLogger(__name__)
+
+# How often expired retry data and transcripts are swept (seconds)
+EXPIRY_SWEEP_INTERVAL = int(os.getenv("EXPIRY_SWEEP_INTERVAL", "30"))
+
+
+async def db_maintenance_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Apply retention, compress old transcripts and vacuum the database."""
+    try:
+        # SQLite work is blocking, keep it off the event loop
+        await asyncio.to_thread(run_maintenance)
+        # Catch expired entries that are not in this process's expiry heap
+        await asyncio.to_thread(sweep_expired_entries, True)
+    except Exception as e:
+        logger.error(f"DB maintenance failed: {e}")
+
+
+async def expiry_sweep_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Expire retry data and button transcripts whose TTL has passed."""
+    try:
+        stats = await asyncio.to_thread(sweep_expired_entries)
+    except Exception as e:
+        logger.error(f"Expiry sweep failed: {e}")
+        return
+
+    for store, counts in stats.items():
+        if counts["expired"]:
+            logger.debug(f"Expired {counts['expired']} {store} entries, reclaimed {counts['reclaimed_bytes']} bytes")
+
+
+async def model_idle_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Unload Whisper models that have been idle too long."""
+    try:
+        await asyncio.to_thread(unload_idle_models)
+    except Exception as e:
+        logger.error(f"Model unload failed: {e}")
+
+
+async def sync_quotas() -> None:
+    """Add the quota usage since the last sync to the database and reload the shared buckets."""
+    # Taken on the event loop, the only place charges are made
+    charges = quotas.take_charges()
+    try:
+        rows = await asyncio.to_thread(sync_quota_buckets, charges, quotas.capacity, quotas.window)
+    except Exception:
+        quotas.restore()
+        raise
+    quotas.load(rows)
+
+
+async def quota_sync_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Share audio quota usage with the other frontends."""
+    try:
+        await sync_quotas()
+    except Exception as e:
+        logger.error(f"Quota sync failed: {e}")
+
+
+def schedule_jobs(application: Application) -> None:
+    """Register all recurring jobs."""
+    job_queue = application.job_queue
+    if job_queue is None:
+        logger.warning("Job queue unavailable (install python-telegram-bot[job-queue]), background jobs disabled")
+        return
+
+    job_queue.run_repeating(expiry_sweep_job, interval=EXPIRY_SWEEP_INTERVAL, first=EXPIRY_SWEEP_INTERVAL, name="expiry_sweep")
+    job_queue.run_repeating(db_maintenance_job, interval=MAINTENANCE_INTERVAL, first=60, name="db_maintenance")
+
+    if quotas.enabled:
+        job_queue.run_repeating(quota_sync_job, interval=QUOTA_SYNC_INTERVAL, first=QUOTA_SYNC_INTERVAL, name="quota_sync")
+
+    # Workers unload their own models
+    if WHISPER_IDLE_UNLOAD_SECONDS > 0 and not FRONTEND_ONLY:
+        interval = max(10, WHISPER_IDLE_UNLOAD_SECONDS // 4)
+        job_queue.run_repeating(model_idle_job, interval=interval, first=interval, name="model_idle_unload")
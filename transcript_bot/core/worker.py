@@ -0,0 +1,103 @@
+"""Worker process: run queued transcription jobs and post their results."""
+
+# Load environment variables FIRST before any other imports
+from dotenv import load_dotenv
+load_dotenv()
+
+import asyncio
+import logging
+import os
+import signal
+
+from telegram.ext import ExtBot
+
+from ..db import init_database
+from ..utils import TELEGRAM_LOCAL_MODE
+from ..utils.logger import setup_logging
+from ..utils.governor import apply_thread_limits
+from ..utils.outbox import OutputScheduler
+from ..transcribers import unload_idle_models
+from ..transcribers.model_manager import WHISPER_IDLE_UNLOAD_SECONDS
+from ..pipeline.worker import Worker
+from .bot import TELEGRAM_API_URL, warm_up_backend
+from .health import start_health_server
+
+logger = logging.getLogger(__name__)
+
+
+async def _unload_idle_models() -> None:
+    """Unload Whisper models that have been idle too long."""
+    interval = max(10, WHISPER_IDLE_UNLOAD_SECONDS // 4)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(unload_idle_models)
+        except Exception as e:
+            logger.error(f"Model unload failed: {e}")
+
+
+async def _run(token: str, worker_id: str | None) -> None:
+    """Run the worker until it is cancelled or receives SIGTERM."""
+    bot_kwargs = {}
+    if TELEGRAM_API_URL:
+        bot_kwargs["base_url"] = f"{TELEGRAM_API_URL}/bot"
+        bot_kwargs["base_file_url"] = f"{TELEGRAM_API_URL}/file/bot"
+    if TELEGRAM_LOCAL_MODE:
+        bot_kwargs["local_mode"] = True
+
+    # Stop cleanly on `docker stop`, handing unfinished jobs back
+    main_task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, main_task.cancel)
+
+    # Workers post results themselves, through their own output scheduler
+    async with ExtBot(token, rate_limiter=OutputScheduler(), **bot_kwargs) as bot:
+        try:
+            server = await start_health_server()
+        except OSError as e:
+            logger.error(f"Failed to start health server: {e}")
+            server = None
+
+        background = [asyncio.create_task(warm_up_backend())]
+        if WHISPER_IDLE_UNLOAD_SECONDS > 0:
+            background.append(asyncio.create_task(_unload_idle_models()))
+
+        try:
+            await Worker(bot, worker_id).run()
+        finally:
+            for task in background:
+                task.cancel()
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+
+
+def main(worker_id: str | None = None) -> None:
+    """Start a transcription worker."""
+    # Setup enhanced logging (the CLI may already have done it)
+    if not logging.getLogger().handlers:
+        setup_logging()
+
+    # No-op for variables the CLI already set
+    apply_thread_limits()
+
+    token = os.getenv("TELEGRAM_BOT_TOKEN")
+    if not token:
+        raise ValueError("TELEGRAM_BOT_TOKEN environment variable is not set")
+
+    if TELEGRAM_LOCAL_MODE and not TELEGRAM_API_URL:
+        raise ValueError("TELEGRAM_LOCAL_MODE needs TELEGRAM_API_URL pointing to a local Bot API server")
+
+    try:
+        init_database()
+    except Exception as e:
+        logger.error(f"Database initialization error: {e}")
+
+    try:
+        asyncio.run(_run(token, worker_id))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
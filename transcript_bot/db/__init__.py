@@ -3,17 +3,65 @@
 from .database import (
     init_database,
     save_transcription,
+    save_transcriptions,
     get_user_history,
     get_user_stats,
+    get_global_stats,
     save_user_setting,
-    get_user_setting
+    get_user_setting,
+    save_user_model,
+    get_user_preferences,
+    get_all_user_settings,
+    get_quota_buckets,
+    sync_quota_buckets,
+    save_chunk,
+    get_chunks,
+    delete_chunks,
+    enqueue_job,
+    claim_job,
+    fail_abandoned_jobs,
+    set_job_message,
+    renew_leases,
+    release_job,
+    complete_job,
+    request_cancel,
+    get_cancel_requests,
+    get_queue_work,
+    report_worker,
+    get_worker_stats,
+    get_queue_depth
 )
+from .maintenance import run_maintenance
 
 __all__ = [
     "init_database",
     "save_transcription",
+    "save_transcriptions",
     "get_user_history",
     "get_user_stats",
+    "get_global_stats",
     "save_user_setting",
-    "get_user_setting"
+    "get_user_setting",
+    "save_user_model",
+    "get_user_preferences",
+    "get_all_user_settings",
+    "get_quota_buckets",
+    "sync_quota_buckets",
+    "save_chunk",
+    "get_chunks",
+    "delete_chunks",
+    "enqueue_job",
+    "claim_job",
+    "fail_abandoned_jobs",
+    "set_job_message",
+    "renew_leases",
+    "release_job",
+    "complete_job",
+    "request_cancel",
+    "get_cancel_requests",
+    "get_queue_work",
+    "report_worker",
+    "get_worker_stats",
+    "get_queue_depth",
+    "run_maintenance"
 ]
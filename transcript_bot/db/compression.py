@@ -0,0 +1,89 @@
+"""Transparent compression for large text columns."""
+
+import logging
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Codec used for new writes: "none", "zlib" or "zstd"
+TRANSCRIPT_COMPRESSION = os.getenv("TRANSCRIPT_COMPRESSION", "none").lower()
+
+# Texts shorter than this are stored as plain TEXT (compression would not pay off)
+COMPRESSION_MIN_BYTES = int(os.getenv("TRANSCRIPT_COMPRESSION_MIN_BYTES", "256"))
+
+# One-byte codec tags prefixed to compressed BLOBs. Plain rows stay TEXT,
+# so any BLOB value in a text column is compressed.
+ZLIB_TAG = b"\x01"
+ZSTD_TAG = b"\x02"
+
+# The zstd fallback is logged once, not on every write
+_warned_fallback = False
+
+
+def get_codec() -> str:
+    """Return the effective codec, falling back to zlib when zstd is unavailable."""
+    global _warned_fallback
+    if TRANSCRIPT_COMPRESSION == "zstd" and zstandard is None:
+        if not _warned_fallback:
+            logger.warning("zstandard is not installed, falling back to zlib compression")
+            _warned_fallback = True
+        return "zlib"
+    if TRANSCRIPT_COMPRESSION not in ("zlib", "zstd"):
+        return "none"
+    return TRANSCRIPT_COMPRESSION
+
+
+def compress_text(text: str, codec: str | None = None) -> str | bytes:
+    """
+    Compress text for storage if it is large enough.
+
+    Args:
+        text: Text to store
+        codec: Codec override, defaults to the configured one
+
+    Returns:
+        The original text, or a tagged compressed BLOB
+    """
+    codec = codec or get_codec()
+    raw = text.encode("utf-8")
+
+    if codec == "none" or len(raw) < COMPRESSION_MIN_BYTES:
+        return text
+
+    if codec == "zstd":
+        compressed = ZSTD_TAG + zstandard.ZstdCompressor(level=9).compress(raw)
+    else:
+        compressed = ZLIB_TAG + zlib.compress(raw, 9)
+
+    # Keep the plain text if compression did not actually save space
+    return compressed if len(compressed) < len(raw) else text
+
+
+def decompress_text(value: str | bytes | None) -> str | None:
+    """
+    Decode a value read from a text column.
+
+    Args:
+        value: Column value, either plain TEXT or a tagged BLOB
+
+    Returns:
+        The stored text
+    """
+    if value is None or isinstance(value, str):
+        return value
+
+    tag, payload = bytes(value[:1]), bytes(value[1:])
+    if tag == ZLIB_TAG:
+        return zlib.decompress(payload).decode("utf-8")
+    if tag == ZSTD_TAG:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed transcripts")
+        return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+
+    raise ValueError(f"Unknown compression tag: {tag!r}")
@@ -1,17 +1,43 @@
 """Database module for storing user transcription history."""
 
+import json
+import logging
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-# Database file path
-DB_PATH = Path("bot.db")
+from .compression import compress_text, decompress_text
+from .storage import (
+    DB_PATH, DB_SHARDS, connect, get_shard_index, get_shard_path, get_shard_paths, read_connection, write_connection
+)
 
-def init_database() -> None:
-    """Initialize the database with required tables."""
-    conn = sqlite3.connect(DB_PATH)
+logger = logging.getLogger(__name__)
+
+# Per-user tables, with the column each one is sharded by
+_USER_TABLES = {'transcriptions': 'user_id', 'user_settings': 'user_id', 'quota_buckets': 'subject_id'}
+
+def _init_file(cursor: sqlite3.Cursor, path: Path) -> None:
+    """Apply the storage settings every database file uses."""
+    # Incremental vacuum must be enabled before any table is created.
+    # Existing databases need one full VACUUM to switch modes, which locks
+    # the file for its whole run: that is left to `run.py vacuum`.
+    cursor.execute('PRAGMA auto_vacuum')
+    if cursor.fetchone()[0] != 2:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != 2:
+            logger.warning(f"{path} does not use incremental vacuum, run `python run.py vacuum` while the bot is stopped")
+
+    # WAL lets the maintenance job run alongside readers
+    cursor.execute('PRAGMA journal_mode = WAL')
+
+def _init_schema(path: Path) -> None:
+    """Create the per-user tables in one database file."""
+    conn = connect(path)
     cursor = conn.cursor()
+    _init_file(cursor, path)
 
     # Create transcriptions table
     cursor.execute('''
@@ -22,91 +48,243 @@ def init_database() -> None:
             language TEXT,
             duration_seconds REAL,
             timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            audio_type TEXT
+            audio_type TEXT,
+            quota_seconds REAL
         )
     ''')
 
+    # Databases created before quotas: the seconds charged for the audio,
+    # which can differ from the measured duration_seconds
+    cursor.execute('PRAGMA table_info(transcriptions)')
+    if 'quota_seconds' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE transcriptions ADD COLUMN quota_seconds REAL')
+
+    # Retention and compaction scan by age
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_transcriptions_timestamp ON transcriptions (timestamp)'
+    )
+
     # Create user settings table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS user_settings (
             user_id INTEGER PRIMARY KEY,
             language TEXT DEFAULT 'es',
+            model TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
 
+    # Databases created before per-user model preferences
+    cursor.execute('PRAGMA table_info(user_settings)')
+    if 'model' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute('ALTER TABLE user_settings ADD COLUMN model TEXT')
+
+    # Audio-second quotas of users and chats that have not refilled yet
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS quota_buckets (
+            kind TEXT NOT NULL,
+            subject_id INTEGER NOT NULL,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            PRIMARY KEY (kind, subject_id)
+        )
+    ''')
+
     conn.commit()
     conn.close()
-    print(f"✅ Database initialized at {DB_PATH}")
+
+def _init_global_schema() -> None:
+    """Create tables that are not per-user in the main database file."""
+    with write_connection() as conn:
+        conn.execute('PRAGMA journal_mode = WAL')
+
+        # Completed chunks of long transcriptions, so retries can resume
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS transcription_chunks (
+                job_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                start_seconds REAL NOT NULL,
+                end_seconds REAL NOT NULL,
+                text TEXT NOT NULL,
+                segments TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, chunk_index)
+            )
+        ''')
+
+        # Jobs handed from the frontend to worker processes
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS job_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_expires REAL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_job_queue_status ON job_queue (status, id)')
+
+        # Queues created before the cancel button
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(job_queue)')}
+        if 'cancel_requested' not in columns:
+            conn.execute('ALTER TABLE job_queue ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0')
+
+        # Capacity and speed of the live workers, for admission control
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                capacity INTEGER NOT NULL,
+                rtf REAL,
+                expires REAL NOT NULL
+            )
+        ''')
+
+def _migrate_unsharded() -> int:
+    """
+    Move per-user rows that a single-file setup left in DB_PATH into the shards.
+
+    Each shard's rows are copied and deleted in one transaction. Settings
+    already in a shard win over old ones, and transcriptions get new IDs.
+
+    Returns:
+        Number of moved rows
+    """
+    conn = connect(DB_PATH)
+    conn.create_function('shard_index', 1, get_shard_index, deterministic=True)
+    moved = 0
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        tables = [table for table in _USER_TABLES if table in existing]
+        if not any(conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() for table in tables):
+            return 0
+
+        for index, path in enumerate(get_shard_paths()):
+            conn.execute('ATTACH DATABASE ? AS shard', (str(path),))
+            try:
+                with conn:
+                    for table in tables:
+                        key = _USER_TABLES[table]
+                        columns = {row[1] for row in conn.execute(f'PRAGMA main.table_info({table})')}
+                        columns &= {row[1] for row in conn.execute(f'PRAGMA shard.table_info({table})')}
+                        if table == 'transcriptions':
+                            columns.discard('id')
+                        names = ', '.join(sorted(columns))
+                        cursor = conn.execute(
+                            f'INSERT OR IGNORE INTO shard.{table} ({names}) '
+                            f'SELECT {names} FROM main.{table} WHERE shard_index({key}) = ?',
+                            (index,)
+                        )
+                        moved += cursor.rowcount
+                        conn.execute(f'DELETE FROM main.{table} WHERE shard_index({key}) = ?', (index,))
+            finally:
+                conn.execute('DETACH DATABASE shard')
+    finally:
+        conn.close()
+    return moved
+
+def init_database() -> None:
+    """Initialize every shard with the required tables."""
+    for path in get_shard_paths():
+        _init_schema(path)
+
+    # With shards, DB_PATH is a file of its own holding only global tables
+    if DB_PATH not in get_shard_paths():
+        conn = connect(DB_PATH)
+        try:
+            _init_file(conn.cursor(), DB_PATH)
+        finally:
+            conn.close()
+        moved = _migrate_unsharded()
+        if moved:
+            logger.info(f"Moved {moved} per-user rows from {DB_PATH} into {DB_SHARDS} shards")
+
+    _init_global_schema()
+
+    if DB_SHARDS == 1:
+        print(f"✅ Database initialized at {DB_PATH}")
+    else:
+        print(f"✅ Database initialized with {DB_SHARDS} shards at {DB_PATH.parent.absolute()}")
 
 def save_transcription(
     user_id: int,
     text: str,
     language: str,
     duration_seconds: float = None,
-    audio_type: str = None
+    audio_type: str = None,
+    quota_seconds: float = None
 ) -> None:
     """Save a transcription to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        INSERT INTO transcriptions (user_id, text, language, duration_seconds, audio_type)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (user_id, text, language, duration_seconds, audio_type))
+    with write_connection(user_id) as conn:
+        conn.execute('''
+            INSERT INTO transcriptions (user_id, text, language, duration_seconds, audio_type, quota_seconds)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, compress_text(text), language, duration_seconds, audio_type, quota_seconds))
 
-    conn.commit()
-    conn.close()
+def save_transcriptions(user_id: int, items: List[Dict[str, Any]]) -> None:
+    """Save several transcriptions of one user in a single transaction."""
+    with write_connection(user_id) as conn:
+        conn.executemany('''
+            INSERT INTO transcriptions (user_id, text, language, duration_seconds, audio_type, quota_seconds)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                user_id, compress_text(item['text']), item.get('language'), item.get('duration_seconds'),
+                item.get('audio_type'), item.get('quota_seconds')
+            )
+            for item in items
+        ])
 
 def get_user_history(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Get user's transcription history."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with read_connection(user_id) as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT text, language, duration_seconds, timestamp, audio_type
-        FROM transcriptions
-        WHERE user_id = ?
-        ORDER BY timestamp DESC
-        LIMIT ?
-    ''', (user_id, limit))
+        cursor.execute('''
+            SELECT text, language, duration_seconds, timestamp, audio_type
+            FROM transcriptions
+            WHERE user_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (user_id, limit))
 
-    columns = ['text', 'language', 'duration_seconds', 'timestamp', 'audio_type']
-    history = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        columns = ['text', 'language', 'duration_seconds', 'timestamp', 'audio_type']
+        history = [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-    conn.close()
+    for item in history:
+        item['text'] = decompress_text(item['text'])
     return history
 
 def get_user_stats(user_id: int) -> Dict[str, Any]:
     """Get user's transcription statistics."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with read_connection(user_id) as conn:
+        cursor = conn.cursor()
 
-    # Total transcriptions
-    cursor.execute('SELECT COUNT(*) FROM transcriptions WHERE user_id = ?', (user_id,))
-    total_count = cursor.fetchone()[0]
+        # Total transcriptions
+        cursor.execute('SELECT COUNT(*) FROM transcriptions WHERE user_id = ?', (user_id,))
+        total_count = cursor.fetchone()[0]
 
-    # Total duration
-    cursor.execute(
-        'SELECT SUM(duration_seconds) FROM transcriptions WHERE user_id = ? AND duration_seconds IS NOT NULL',
-        (user_id,)
-    )
-    total_duration = cursor.fetchone()[0] or 0
-
-    # Most used language
-    cursor.execute('''
-        SELECT language, COUNT(*) as count
-        FROM transcriptions
-        WHERE user_id = ?
-        GROUP BY language
-        ORDER BY count DESC
-        LIMIT 1
-    ''', (user_id,))
-    result = cursor.fetchone()
-    favorite_lang = result[0] if result else 'es'
+        # Total duration
+        cursor.execute(
+            'SELECT SUM(duration_seconds) FROM transcriptions WHERE user_id = ? AND duration_seconds IS NOT NULL',
+            (user_id,)
+        )
+        total_duration = cursor.fetchone()[0] or 0
 
-    conn.close()
+        # Most used language
+        cursor.execute('''
+            SELECT language, COUNT(*) as count
+            FROM transcriptions
+            WHERE user_id = ?
+            GROUP BY language
+            ORDER BY count DESC
+            LIMIT 1
+        ''', (user_id,))
+        result = cursor.fetchone()
+        favorite_lang = result[0] if result else 'es'
 
     return {
         'total_transcriptions': total_count,
@@ -115,32 +293,391 @@ def get_user_stats(user_id: int) -> Dict[str, Any]:
         'favorite_language': favorite_lang
     }
 
+def get_global_stats() -> Dict[str, Any]:
+    """Aggregate statistics across all shards (admin reporting)."""
+    shards = []
+    languages: Dict[str, int] = {}
+
+    for path in get_shard_paths():
+        conn = connect(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(*), COUNT(DISTINCT user_id), COALESCE(SUM(duration_seconds), 0)
+                FROM transcriptions
+            ''')
+            count, users, duration = cursor.fetchone()
+
+            cursor.execute('SELECT language, COUNT(*) FROM transcriptions GROUP BY language')
+            for language, lang_count in cursor.fetchall():
+                languages[language] = languages.get(language, 0) + lang_count
+
+            cursor.execute('SELECT COUNT(*) FROM user_settings')
+            settings = cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+        shards.append({
+            'path': str(path),
+            'transcriptions': count,
+            'users': users,
+            'user_settings': settings,
+            'duration_seconds': duration,
+            'size_bytes': path.stat().st_size if path.exists() else 0,
+        })
+
+    total_duration = sum(shard['duration_seconds'] for shard in shards)
+    return {
+        # Users never span shards, so per-shard distinct counts add up
+        'total_transcriptions': sum(shard['transcriptions'] for shard in shards),
+        'total_users': sum(shard['users'] for shard in shards),
+        'total_duration_seconds': total_duration,
+        'total_duration_minutes': round(total_duration / 60, 1),
+        'languages': languages,
+        'shards': shards,
+    }
+
 def save_user_setting(user_id: int, language: str) -> None:
     """Save user's language preference."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with write_connection(user_id) as conn:
+        conn.execute('''
+            INSERT INTO user_settings (user_id, language, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                language = excluded.language,
+                updated_at = excluded.updated_at
+        ''', (user_id, language))
 
-    cursor.execute('''
-        INSERT OR REPLACE INTO user_settings (user_id, language, updated_at)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
-    ''', (user_id, language))
-
-    conn.commit()
-    conn.close()
+def save_user_model(user_id: int, model: str = None) -> None:
+    """Save user's preferred Whisper model (None for automatic routing)."""
+    with write_connection(user_id) as conn:
+        conn.execute('''
+            INSERT INTO user_settings (user_id, model, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                model = excluded.model,
+                updated_at = excluded.updated_at
+        ''', (user_id, model))
 
 def get_user_setting(user_id: int) -> str:
     """Get user's language preference."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT language FROM user_settings WHERE user_id = ?', (user_id,))
+        result = cursor.fetchone()
 
-    cursor.execute('SELECT language FROM user_settings WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-
-    conn.close()
     return result[0] if result else 'es'
 
-# Initialize database on import
-try:
-    init_database()
-except Exception as e:
-    print(f"⚠️ Database initialization error: {e}")
+def get_user_preferences(user_id: int) -> Dict[str, Any]:
+    """Get user's language and model preferences."""
+    with read_connection(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT language, model FROM user_settings WHERE user_id = ?', (user_id,))
+        result = cursor.fetchone()
+
+    if not result:
+        return {'language': 'es', 'model': None}
+    return {'language': result[0] or 'es', 'model': result[1]}
+
+def get_all_user_settings(limit: int = None) -> Dict[int, Dict[str, Any]]:
+    """Get the preferences of the most recently updated users across all shards."""
+    rows = []
+    for path in get_shard_paths():
+        conn = connect(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT user_id, language, model, updated_at FROM user_settings
+                ORDER BY updated_at DESC
+                LIMIT ?
+            ''', (limit if limit is not None else -1,))
+            rows.extend(cursor.fetchall())
+        finally:
+            conn.close()
+
+    rows.sort(key=lambda row: row[3] or '', reverse=True)
+    if limit is not None:
+        rows = rows[:limit]
+    return {
+        user_id: {'language': language or 'es', 'model': model}
+        for user_id, language, model, _ in rows
+    }
+
+def get_quota_buckets() -> List[Tuple[str, int, float, float]]:
+    """Read the quota buckets of every shard as (kind, subject_id, tokens, updated)."""
+    rows = []
+    for path in get_shard_paths():
+        conn = connect(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT kind, subject_id, tokens, updated FROM quota_buckets')
+            rows.extend(cursor.fetchall())
+        finally:
+            conn.close()
+    return rows
+
+def sync_quota_buckets(
+    charges: List[Tuple[str, int, float]],
+    capacity: Dict[str, int],
+    window: int
+) -> List[Tuple[str, int, float, float]]:
+    """
+    Add quota charges to the buckets and read them all back.
+
+    Each charge refills its bucket up to now and subtracts the seconds in
+    one statement, so frontends syncing concurrently add up their usage
+    instead of overwriting each other's. Buckets that have refilled, or
+    whose quota is disabled, are deleted.
+
+    Args:
+        charges: (kind, subject_id, seconds) charged since the last sync,
+            negative seconds for refunds
+        capacity: Quota in seconds per kind, 0 for none
+        window: Seconds over which an empty bucket refills
+
+    Returns:
+        Every remaining bucket as (kind, subject_id, tokens, updated)
+    """
+    now = time.time()
+    by_shard: Dict[Path, list] = {path: [] for path in get_shard_paths()}
+    for kind, subject_id, seconds in charges:
+        if capacity.get(kind):
+            by_shard[get_shard_path(subject_id)].append({
+                'kind': kind, 'subject_id': subject_id, 'seconds': seconds,
+                'capacity': capacity[kind], 'rate': capacity[kind] / window, 'now': now,
+            })
+
+    rows = []
+    for path, shard_charges in by_shard.items():
+        conn = connect(path)
+        try:
+            with conn:
+                # A clock behind the writer's must not drain the bucket
+                conn.executemany('''
+                    INSERT INTO quota_buckets (kind, subject_id, tokens, updated)
+                    VALUES (:kind, :subject_id, MIN(:capacity, :capacity - :seconds), :now)
+                    ON CONFLICT(kind, subject_id) DO UPDATE SET
+                        tokens = MIN(:capacity, MIN(:capacity, tokens + MAX(0, :now - updated) * :rate) - :seconds),
+                        updated = MAX(updated, :now)
+                ''', shard_charges)
+                conn.execute('''
+                    DELETE FROM quota_buckets
+                    WHERE kind NOT IN (SELECT value FROM json_each(?))
+                ''', (json.dumps([kind for kind, seconds in capacity.items() if seconds]),))
+                conn.executemany('''
+                    DELETE FROM quota_buckets
+                    WHERE kind = ? AND tokens + MAX(0, ? - updated) * ? >= ?
+                ''', [
+                    (kind, now, seconds / window, seconds)
+                    for kind, seconds in capacity.items() if seconds
+                ])
+            rows.extend(conn.execute('SELECT kind, subject_id, tokens, updated FROM quota_buckets'))
+        finally:
+            conn.close()
+    return rows
+
+def save_chunk(
+    job_id: str,
+    chunk_index: int,
+    start_seconds: float,
+    end_seconds: float,
+    text: str,
+    segments: List[Dict[str, Any]] = None
+) -> None:
+    """Checkpoint one finished chunk of a long transcription."""
+    with write_connection() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO transcription_chunks
+                (job_id, chunk_index, start_seconds, end_seconds, text, segments)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (job_id, chunk_index, start_seconds, end_seconds, text, json.dumps(segments or [])))
+
+def get_chunks(job_id: str) -> List[Dict[str, Any]]:
+    """Get the checkpointed chunks of a job, in order."""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT chunk_index, start_seconds, end_seconds, text, segments
+            FROM transcription_chunks
+            WHERE job_id = ?
+            ORDER BY chunk_index
+        ''', (job_id,))
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'chunk_index': index,
+            'start_seconds': start,
+            'end_seconds': end,
+            'text': text,
+            'segments': json.loads(segments) if segments else []
+        }
+        for index, start, end, text, segments in rows
+    ]
+
+def delete_chunks(job_id: str) -> None:
+    """Drop the checkpoints of a finished job."""
+    with write_connection() as conn:
+        conn.execute('DELETE FROM transcription_chunks WHERE job_id = ?', (job_id,))
+
+def enqueue_job(payload: Dict[str, Any]) -> int:
+    """Queue a job for the workers, returning its queue ID."""
+    with write_connection() as conn:
+        cursor = conn.execute('INSERT INTO job_queue (payload) VALUES (?)', (json.dumps(payload),))
+        return cursor.lastrowid
+
+def claim_job(
+    worker_id: str,
+    lease_seconds: float,
+    max_attempts: int,
+    aging_weight: float = 0.0,
+) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """
+    Lease the next job that is queued or whose lease ran out.
+
+    The claim is a single UPDATE, so two workers never lease the same job,
+    whether they are threads or processes sharing the database file.
+
+    Args:
+        worker_id: Worker taking the lease
+        lease_seconds: Lease length
+        max_attempts: Claims after which a job whose worker died is no
+            longer retried (see fail_abandoned_jobs)
+        aging_weight: Seconds a job's turn is pushed back per second of
+            audio (shortest job first with aging); 0 takes the oldest
+    """
+    now = time.time()
+    with write_connection() as conn:
+        row = conn.execute('''
+            UPDATE job_queue
+            SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM job_queue
+                WHERE status = 'queued' OR (
+                    status = 'leased' AND lease_expires < ? AND attempts < ? AND cancel_requested = 0
+                )
+                ORDER BY CAST(strftime('%s', created_at) AS REAL)
+                    + ? * COALESCE(json_extract(payload, '$.duration'), 0), id
+                LIMIT 1
+            )
+            RETURNING id, payload
+        ''', (worker_id, now + lease_seconds, now, max_attempts, aging_weight)).fetchone()
+
+    return (row[0], json.loads(row[1])) if row else None
+
+def fail_abandoned_jobs(max_attempts: int) -> List[Tuple[Dict[str, Any], bool]]:
+    """
+    Give up on jobs whose workers died max_attempts times, or died after
+    the job was cancelled.
+
+    Each job is returned once, to the one caller that failed it, so its
+    user can be told.
+
+    Returns:
+        Payload of each job and whether it had been cancelled
+    """
+    with write_connection() as conn:
+        rows = conn.execute('''
+            UPDATE job_queue SET status = 'failed'
+            WHERE status = 'leased' AND lease_expires < ? AND (attempts >= ? OR cancel_requested = 1)
+            RETURNING payload, cancel_requested
+        ''', (time.time(), max_attempts)).fetchall()
+    return [(json.loads(payload), bool(cancelled)) for payload, cancelled in rows]
+
+def set_job_message(job_id: int, message_id: int) -> None:
+    """Record a queued job's processing message, for whoever handles it next."""
+    with write_connection() as conn:
+        conn.execute(
+            "UPDATE job_queue SET payload = json_set(payload, '$.processing_message_id', ?) WHERE id = ?",
+            (message_id, job_id)
+        )
+
+def renew_leases(worker_id: str, job_ids: List[int], lease_seconds: float) -> None:
+    """Extend the leases a worker still holds."""
+    if not job_ids:
+        return
+    expires = time.time() + lease_seconds
+    with write_connection() as conn:
+        conn.executemany('''
+            UPDATE job_queue SET lease_expires = ?
+            WHERE id = ? AND worker_id = ? AND status = 'leased'
+        ''', [(expires, job_id, worker_id) for job_id in job_ids])
+
+def release_job(job_id: int, worker_id: str) -> None:
+    """Hand a leased job back without counting the attempt."""
+    with write_connection() as conn:
+        conn.execute('''
+            UPDATE job_queue
+            SET status = 'queued', worker_id = NULL, lease_expires = NULL, attempts = attempts - 1
+            WHERE id = ? AND worker_id = ?
+        ''', (job_id, worker_id))
+
+def complete_job(job_id: int, worker_id: str) -> None:
+    """Remove a finished job (delivered, or failed with a retry button)."""
+    with write_connection() as conn:
+        conn.execute('DELETE FROM job_queue WHERE id = ? AND worker_id = ?', (job_id, worker_id))
+
+def request_cancel(job_id: int, user_id: int) -> bool:
+    """Ask the worker running a job to cancel it; False unless user_id sent it."""
+    with write_connection() as conn:
+        cursor = conn.execute('''
+            UPDATE job_queue SET cancel_requested = 1
+            WHERE id = ? AND status = 'leased' AND json_extract(payload, '$.user_id') = ?
+        ''', (job_id, user_id))
+        return cursor.rowcount > 0
+
+def get_cancel_requests(worker_id: str) -> List[int]:
+    """IDs of the jobs a worker holds whose users cancelled them."""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM job_queue
+            WHERE worker_id = ? AND status = 'leased' AND cancel_requested = 1
+        ''', (worker_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+def get_queue_work(key_limit: float, aging_weight: float) -> float:
+    """
+    Audio seconds the workers would transcribe before a job with key_limit.
+
+    Counts every leased job, and the queued ones whose claim order key
+    (see claim_job) is at most key_limit.
+    """
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(json_extract(payload, '$.duration')), 0) FROM job_queue
+            WHERE status = 'leased' OR (
+                status = 'queued'
+                AND CAST(strftime('%s', created_at) AS REAL)
+                    + ? * COALESCE(json_extract(payload, '$.duration'), 0) <= ?
+            )
+        ''', (aging_weight, key_limit))
+        return cursor.fetchone()[0]
+
+def report_worker(worker_id: str, capacity: int, rtf: Optional[float], ttl: float) -> None:
+    """Record a worker's capacity and measured real-time factor for ttl seconds."""
+    with write_connection() as conn:
+        conn.execute('''
+            INSERT INTO workers (worker_id, capacity, rtf, expires) VALUES (?, ?, ?, ?)
+            ON CONFLICT(worker_id) DO UPDATE SET
+                capacity = excluded.capacity, rtf = excluded.rtf, expires = excluded.expires
+        ''', (worker_id, capacity, rtf, time.time() + ttl))
+
+def get_worker_stats() -> Tuple[int, Optional[float]]:
+    """Total capacity of the live workers and their mean real-time factor."""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(SUM(capacity), 0), SUM(rtf * capacity) / SUM(CASE WHEN rtf IS NULL THEN 0 ELSE capacity END)
+            FROM workers WHERE expires > ?
+        ''', (time.time(),))
+        capacity, rtf = cursor.fetchone()
+        return capacity, rtf
+
+def get_queue_depth() -> int:
+    """Count the jobs waiting for a worker."""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM job_queue WHERE status = 'queued'")
+        return cursor.fetchone()[0]
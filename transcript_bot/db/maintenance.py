@@ -0,0 +1,219 @@
+"""Background maintenance for the transcription database."""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict
+
+from .compression import COMPRESSION_MIN_BYTES, compress_text, get_codec
+from .storage import connect, get_database_paths, get_shard_paths, write_connection
+
+logger = logging.getLogger(__name__)
+
+# Delete transcriptions older than this many days (0 keeps them forever)
+RETENTION_DAYS = int(os.getenv("TRANSCRIPT_RETENTION_DAYS", "0"))
+
+# Compress rows older than this many days
+COMPACT_AFTER_DAYS = int(os.getenv("TRANSCRIPT_COMPACT_AFTER_DAYS", "7"))
+
+# Rows touched per transaction, kept small so writers are never blocked for long
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "200"))
+
+# Upper bound on batches per run, so one run never monopolizes the database
+MAINTENANCE_MAX_BATCHES = int(os.getenv("MAINTENANCE_MAX_BATCHES", "50"))
+
+# Free pages released per incremental vacuum step
+VACUUM_PAGES = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "256"))
+
+# Checkpoints of jobs that were never retried are dropped after this many hours
+CHECKPOINT_RETENTION_HOURS = int(os.getenv("CHECKPOINT_RETENTION_HOURS", "24"))
+
+# How often the maintenance job runs (seconds)
+MAINTENANCE_INTERVAL = int(os.getenv("MAINTENANCE_INTERVAL", "3600"))
+
+
+def apply_retention(conn: sqlite3.Connection) -> int:
+    """
+    Delete transcriptions past the retention period in small batches.
+
+    Args:
+        conn: Open database connection
+
+    Returns:
+        Number of deleted rows
+    """
+    if RETENTION_DAYS <= 0:
+        return 0
+
+    deleted = 0
+    for _ in range(MAINTENANCE_MAX_BATCHES):
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM transcriptions
+                WHERE id IN (
+                    SELECT id FROM transcriptions
+                    WHERE timestamp < datetime('now', ?)
+                    LIMIT ?
+                )
+            ''', (f"-{RETENTION_DAYS} days", MAINTENANCE_BATCH_SIZE))
+        deleted += cursor.rowcount
+        if cursor.rowcount < MAINTENANCE_BATCH_SIZE:
+            break
+
+    return deleted
+
+
+def compact_transcriptions(conn: sqlite3.Connection) -> int:
+    """
+    Migrate old plain-text rows to compressed form in small batches.
+
+    Args:
+        conn: Open database connection
+
+    Returns:
+        Number of compressed rows
+    """
+    codec = get_codec()
+    if codec == "none":
+        return 0
+
+    compacted = 0
+    last_id = 0
+    for _ in range(MAINTENANCE_MAX_BATCHES):
+        rows = conn.execute('''
+            SELECT id, text FROM transcriptions
+            WHERE id > ?
+              AND typeof(text) = 'text'
+              AND length(CAST(text AS BLOB)) >= ?
+              AND timestamp < datetime('now', ?)
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, COMPRESSION_MIN_BYTES, f"-{COMPACT_AFTER_DAYS} days", MAINTENANCE_BATCH_SIZE)).fetchall()
+
+        if not rows:
+            break
+
+        updates = []
+        for row_id, text in rows:
+            value = compress_text(text, codec)
+            if isinstance(value, bytes):
+                updates.append((value, row_id))
+
+        with conn:
+            conn.executemany('UPDATE transcriptions SET text = ? WHERE id = ?', updates)
+
+        compacted += len(updates)
+        last_id = rows[-1][0]
+
+    return compacted
+
+
+def incremental_vacuum(conn: sqlite3.Connection) -> int:
+    """
+    Return free pages to the filesystem a few at a time.
+
+    Args:
+        conn: Open database connection
+
+    Returns:
+        Number of pages released
+    """
+    free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    if not free_before:
+        return 0
+
+    conn.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES})').fetchall()
+    free_after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return free_before - free_after
+
+
+def purge_stale_checkpoints(conn: sqlite3.Connection) -> int:
+    """
+    Delete chunk checkpoints of abandoned jobs.
+
+    Args:
+        conn: Open connection to the main database file
+
+    Returns:
+        Number of deleted rows
+    """
+    with conn:
+        cursor = conn.execute(
+            "DELETE FROM transcription_chunks WHERE created_at < datetime('now', ?)",
+            (f"-{CHECKPOINT_RETENTION_HOURS} hours",)
+        )
+    return cursor.rowcount
+
+
+def purge_dead_queue_rows(conn: sqlite3.Connection) -> int:
+    """
+    Delete queue jobs that were given up on and workers that stopped reporting.
+
+    Failed jobs were already reported to their users when they were given
+    up on; the rows are never read again.
+
+    Args:
+        conn: Open connection to the main database file
+
+    Returns:
+        Number of deleted rows
+    """
+    with conn:
+        jobs = conn.execute("DELETE FROM job_queue WHERE status = 'failed'").rowcount
+        workers = conn.execute('DELETE FROM workers WHERE expires < ?', (time.time(),)).rowcount
+    return jobs + workers
+
+
+def enable_incremental_vacuum() -> Dict[str, bool]:
+    """
+    Switch every database file to incremental auto-vacuum.
+
+    Files that were created without it need a full VACUUM, which rewrites
+    the file under an exclusive lock: run this while the bot is stopped.
+
+    Returns:
+        Whether each file was converted, by path
+    """
+    converted = {}
+    for path in get_database_paths():
+        conn = connect(path)
+        try:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                converted[str(path)] = False
+                continue
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            converted[str(path)] = True
+        finally:
+            conn.close()
+    return converted
+
+
+def run_maintenance() -> Dict[str, int]:
+    """Run retention and compaction on every shard, and incremental vacuum on every file."""
+    stats = {'deleted': 0, 'compacted': 0, 'vacuumed_pages': 0}
+
+    with write_connection() as conn:
+        stats['stale_checkpoints'] = purge_stale_checkpoints(conn)
+        stats['dead_queue_rows'] = purge_dead_queue_rows(conn)
+
+    shards = get_shard_paths()
+    for path in get_database_paths():
+        conn = connect(path)
+        try:
+            if path in shards:
+                stats['deleted'] += apply_retention(conn)
+                stats['compacted'] += compact_transcriptions(conn)
+            stats['vacuumed_pages'] += incremental_vacuum(conn)
+            # Fold the WAL back into the main file without blocking readers
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        finally:
+            conn.close()
+
+    logger.info(
+        f"DB maintenance: deleted={stats['deleted']} compacted={stats['compacted']} "
+        f"vacuumed_pages={stats['vacuumed_pages']} stale_checkpoints={stats['stale_checkpoints']} "
+        f"dead_queue_rows={stats['dead_queue_rows']}"
+    )
+    return stats
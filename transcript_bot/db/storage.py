@@ -0,0 +1,113 @@
+"""SQLite storage layer with optional sharding by user_id."""
+
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+# Database file path (single-file mode) and base name for shard files
+DB_PATH = Path(os.getenv("DB_PATH", "bot.db"))
+
+# Number of shard files for per-user tables. 1 keeps everything in DB_PATH.
+DB_SHARDS = max(1, int(os.getenv("DB_SHARDS", "1")))
+
+# Seconds to wait on a locked database before giving up
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "30"))
+
+# One writer connection and lock per database file
+_writers: dict = {}
+_writers_guard = threading.Lock()
+
+
+def get_shard_paths() -> List[Path]:
+    """Return the database file of every shard."""
+    if DB_SHARDS == 1:
+        return [DB_PATH]
+    return [
+        DB_PATH.with_name(f"{DB_PATH.stem}.shard{i}{DB_PATH.suffix}")
+        for i in range(DB_SHARDS)
+    ]
+
+
+def get_database_paths() -> List[Path]:
+    """Return every database file: the shards, and DB_PATH for global tables."""
+    paths = get_shard_paths()
+    if DB_PATH not in paths:
+        paths.append(DB_PATH)
+    return paths
+
+
+def get_shard_index(user_id: int) -> int:
+    """Map a user to a shard with a stable hash."""
+    if DB_SHARDS == 1:
+        return 0
+    return zlib.crc32(str(user_id).encode()) % DB_SHARDS
+
+
+def get_shard_path(user_id: int | None = None) -> Path:
+    """
+    Return the database file holding a user's data.
+
+    Args:
+        user_id: Telegram user ID, or None for global (non-user) tables
+
+    Returns:
+        Path to the SQLite file
+    """
+    if user_id is None:
+        return DB_PATH
+    return get_shard_paths()[get_shard_index(user_id)]
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open a connection with the pragmas every shard uses."""
+    conn = sqlite3.connect(path, timeout=DB_TIMEOUT, check_same_thread=False)
+    conn.execute('PRAGMA synchronous = NORMAL')
+    return conn
+
+
+@contextmanager
+def read_connection(user_id: int | None = None) -> Iterator[sqlite3.Connection]:
+    """Open a short-lived read connection on the user's shard."""
+    conn = connect(get_shard_path(user_id))
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def write_connection(user_id: int | None = None) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow the single writer connection of the user's shard.
+
+    Writes to one shard are serialized in-process, so threads never fight
+    over SQLite's file lock. Writes to different shards run in parallel.
+    The transaction is committed on success and rolled back on error.
+    """
+    path = get_shard_path(user_id)
+
+    with _writers_guard:
+        if path not in _writers:
+            _writers[path] = (connect(path), threading.Lock())
+        conn, lock = _writers[path]
+
+    with lock:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def close_writers() -> None:
+    """Close all cached writer connections."""
+    with _writers_guard:
+        for conn, lock in _writers.values():
+            with lock:
+                conn.close()
+        _writers.clear()
@@ -1,10 +1,11 @@
 """All handlers for the transcription bot."""
 
 # Import from subdirectories
-from .commands import start, setlang, command, history
+from .commands import start, setlang, setmodel, command, history
 from .messages import handle_voice, handle_audio, handle_video_note
 from .callbacks import (
     handle_language_callback,
+    handle_model_callback,
     handle_retry_callback,
     handle_summarize_callback,
     handle_transcript_full_callback,
@@ -16,6 +17,7 @@ __all__ = [
     # Commands
     "start",
     "setlang",
+    "setmodel",
     "command",
     "history",
 
@@ -26,6 +28,7 @@ __all__ = [
 
     # Callbacks
     "handle_language_callback",
+    "handle_model_callback",
     "handle_retry_callback",
     "handle_summarize_callback",
     "handle_transcript_full_callback",
@@ -1,14 +1,18 @@
 """Callback handlers."""
 
 from .language import handle_language_callback
+from .model import handle_model_callback
 from .retry import handle_retry_callback
+from .cancel import handle_cancel_callback
 from .summarize import handle_summarize_callback
 from .transcript import handle_transcript_full_callback
 from .disabled import handle_disabled_callback, handle_show_full_callback
 
 __all__ = [
     "handle_language_callback",
+    "handle_model_callback",
     "handle_retry_callback",
+    "handle_cancel_callback",
     "handle_summarize_callback",
     "handle_transcript_full_callback",
     "handle_disabled_callback",
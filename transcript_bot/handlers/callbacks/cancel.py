@@ -0,0 +1,33 @@
+"""Handle cancel transcription callback."""
+
+import logging
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from ...utils import get_user_language
+from ...utils.logger import log_user_action
+from ...pipeline import cancel_job
+from ...i18n import t
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_cancel_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle cancel button clicks."""
+    query = update.callback_query
+
+    user = update.effective_user
+    user_lang = get_user_language(user.id)
+
+    cancel_key = query.data.removeprefix("cancel_")
+
+    # Only the sender may cancel, and only while the job runs
+    if not await cancel_job(cancel_key, user.id):
+        await query.answer(t("commands.transcription.cancel_unavailable", user_lang), show_alert=True)
+        return
+
+    log_user_action(user.id, user.username, "cancelled transcription")
+
+    # The pipeline replaces the processing message once the job has stopped
+    await query.answer(t("commands.transcription.cancelling", user_lang))
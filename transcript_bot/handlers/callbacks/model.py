@@ -0,0 +1,40 @@
+"""Handle model selection callback."""
+
+import logging
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from ...utils import set_user_model, get_user_language
+from ...transcribers import available_models
+from ...i18n import t
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_model_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle model selection from inline keyboard."""
+    query = update.callback_query
+    await query.answer()
+
+    user_id = update.effective_user.id
+    user_lang = get_user_language(user_id)
+
+    # Extract model name from callback data ("auto" clears the preference)
+    model = query.data.removeprefix("model_")
+
+    if model == "auto" or model in available_models():
+        set_user_model(user_id, None if model == "auto" else model)
+        model_name = t("commands.setmodel.auto", user_lang) if model == "auto" else model
+
+        try:
+            await query.edit_message_text(
+                t("commands.setmodel.changed", user_lang, model_name=model_name),
+                parse_mode='Markdown'
+            )
+        except Exception as e:
+            logger.error(f"Failed to update model confirmation: {e}")
+            await query.edit_message_text(t("commands.setmodel.error", user_lang))
+    else:
+        logger.error(f"Invalid model: {model}")
+        await query.edit_message_text(t("commands.setmodel.error", user_lang))
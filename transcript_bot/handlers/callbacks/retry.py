@@ -1,76 +1,68 @@
 """Handle retry transcription callback."""
 
-import asyncio
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from ...utils import get_user_language, failed_transcriptions
-from ...utils.logger import log_user_action, log_transcription, log_api_call
-from ...transcribers import transcribe_audio
+from ...utils.logger import log_user_action
+from ...utils.outbox import PRIORITY_PROGRESS
+from ...pipeline import resume_job
+from ...pipeline.intake import FRONTEND_ONLY
 from ...i18n import t
 
 logger = logging.getLogger(__name__)
-executor = ThreadPoolExecutor(max_workers=2)
 
 
 async def handle_retry_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle retry button clicks."""
     query = update.callback_query
-    await query.answer()
 
     user = update.effective_user
     user_lang = get_user_language(user.id)
-    log_user_action(user.id, user.username, "requested retry transcription")
 
     retry_id = query.data.replace("retry_", "")
 
-    if retry_id not in failed_transcriptions:
+    retry_data = failed_transcriptions.get(retry_id)
+    if retry_data is None:
+        await query.answer()
         await query.edit_message_text(t("commands.messages.expired", user_lang))
         return
 
-    retry_data = failed_transcriptions[retry_id]
-    tmp_path = retry_data["tmp_path"]
+    # Only the sender may retry: the job is requeued, and its result
+    # saved, under the presser's user ID
+    if retry_data.get("user_id") != user.id:
+        await query.answer(t("commands.transcription.retry_not_yours", user_lang), show_alert=True)
+        return
+
+    tmp_path = retry_data.get("tmp_path")
+    pcm_path = retry_data.get("pcm_path")
 
-    try:
-        # Show processing status
-        await query.edit_message_text("🔄 Retrying transcription...")
+    # The spooled audio may have been evicted to respect the quota; the
+    # file can still be downloaded again if its ID is known
+    files_kept = (pcm_path and os.path.exists(pcm_path)) or (tmp_path and os.path.exists(tmp_path))
+    if not files_kept and not retry_data.get("file_id") and not FRONTEND_ONLY:
+        failed_transcriptions.delete(retry_id)
+        await query.answer()
+        await query.edit_message_text(t("commands.messages.expired", user_lang))
+        return
 
-        # Retry transcription
-        start_time = datetime.now()
-        loop = asyncio.get_event_loop()
-        text = await loop.run_in_executor(
-            executor, lambda: transcribe_audio(tmp_path, language=user_lang)
+    await query.answer()
+    log_user_action(user.id, user.username, "requested retry transcription")
+
+    # Show processing status before the pipeline can post a result
+    await query.edit_message_text("🔄 Retrying transcription...", rate_limit_args=PRIORITY_PROGRESS)
+
+    # Retries share the pipeline with new jobs; keep the retry data (and
+    # its audio) if there is no room so the button still works later
+    if not await resume_job(retry_data, user, user_lang, query.message.message_id):
+        await query.edit_message_text(
+            t("commands.transcription.busy", user_lang),
+            reply_markup=query.message.reply_markup
         )
+        return
 
-        # Calculate duration
-        transcription_time = (datetime.now() - start_time).total_seconds()
-
-        if text:
-            # Log success
-            log_transcription(user.id, user.username, "retry_" + retry_id, None, user_lang, "success")
-            log_api_call("whisper", "retry_transcribe", "success", transcription_time)
-
-            await query.edit_message_text(f"✅ Transcription successful:\n\n{text}")
-        else:
-            log_transcription(user.id, user.username, "retry_" + retry_id, None, user_lang, "error: no speech")
-            await query.edit_message_text(t("commands.transcription.no_speech", user_lang))
-
-    except Exception as e:
-        logger.error(f"Retry transcription error: {e}")
-        log_transcription(user.id, user.username, "retry_" + retry_id, None, user_lang, "error")
-        await query.edit_message_text(t("commands.transcription.error", user_lang, error=str(e)))
-
-    finally:
-        # Clean up retry data
-        if retry_id in failed_transcriptions:
-            del failed_transcriptions[retry_id]
-            # Clean up temp file
-            try:
-                os.unlink(tmp_path)
-            except:
-                pass
+    # The pipeline owns the audio files now, don't let expiry delete them
+    failed_transcriptions.delete(retry_id)
@@ -1,11 +1,13 @@
 """Handle summarize callback."""
 
+import asyncio
 import logging
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from ...utils import get_user_language, temp_transcripts
+from ...utils.outbox import PRIORITY_PROGRESS
 from ...utils.summarizer import summarize_text
 from ...i18n import t
 
@@ -26,19 +28,19 @@ async def handle_summarize_callback(update: Update, context: ContextTypes.DEFAUL
         return
 
     # Get transcript from temporary storage
-    if transcript_id not in temp_transcripts:
+    transcript_data = temp_transcripts.get(transcript_id)
+    if transcript_data is None:
         await query.edit_message_text(t("commands.messages.expired", "es"))
         return
 
-    transcript_data = temp_transcripts[transcript_id]
     text = transcript_data["text"]
     user_lang = transcript_data["language"]
 
     # Show summary immediately
-    await query.edit_message_text(t("commands.transcription.generating_summary", user_lang))
+    await query.edit_message_text(t("commands.transcription.generating_summary", user_lang), rate_limit_args=PRIORITY_PROGRESS)
 
-    # Generate summary
-    summary = summarize_text(text, user_lang)
+    # Generate summary (a blocking API call)
+    summary = await asyncio.to_thread(summarize_text, text, user_lang)
 
     if summary:
         # Create keyboard for full transcript
@@ -28,11 +28,11 @@ async def handle_transcript_full_callback(update: Update, context: ContextTypes.
         return
 
     # Get transcript from temporary storage
-    if transcript_id not in temp_transcripts:
+    transcript_data = temp_transcripts.get(transcript_id)
+    if transcript_data is None:
         await query.edit_message_text(t("commands.messages.expired", "es"))
         return
 
-    transcript_data = temp_transcripts[transcript_id]
     text = transcript_data["text"]
     user_lang = transcript_data["language"]
 
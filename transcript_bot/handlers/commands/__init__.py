@@ -2,7 +2,8 @@
 
 from .start import start
 from .setlang import setlang
+from .setmodel import setmodel
 from .command import command
 from .history import history
 
-__all__ = ["start", "setlang", "command", "history"]
+__all__ = ["start", "setlang", "setmodel", "command", "history"]
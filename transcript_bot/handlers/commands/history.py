@@ -9,6 +9,7 @@ from telegram.ext import ContextTypes
 from ...utils import LANGUAGES, get_user_language
 from ...db import get_user_history, get_user_stats
 from ...utils.logger import log_user_action
+from ...utils.quota import QUOTA_WINDOW_SECONDS, USER, quotas
 from ...i18n import t
 
 logger = logging.getLogger(__name__)
@@ -42,6 +43,13 @@ async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                     duration=stats.get('total_duration', 0),
                     fav_lang=LANGUAGES.get(stats.get('favorite_language', 'es'), 'Spanish'))
 
+        # Add what is left of the audio quota
+        if quotas.capacity[USER]:
+            message += t("commands.history.quota", user_lang,
+                        remaining=int(quotas.remaining(USER, user.id) // 60),
+                        limit=quotas.capacity[USER] // 60,
+                        window=QUOTA_WINDOW_SECONDS / 3600)
+
         # Add recent transcriptions
         message += t("commands.history.recent", user_lang)
 
@@ -0,0 +1,49 @@
+"""Handle the /setmodel command."""
+
+import logging
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+
+from ...utils import get_user_language, get_user_model
+from ...utils.logger import log_user_action
+from ...transcribers import available_models
+from ...i18n import t
+
+logger = logging.getLogger(__name__)
+
+
+async def setmodel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /setmodel command."""
+    user = update.effective_user
+    log_user_action(user.id, user.username, "requested model change")
+
+    user_lang = get_user_language(user.id)
+
+    models = available_models()
+    if not models:
+        await update.message.reply_text(t("commands.setmodel.unavailable", user_lang))
+        return
+
+    # Mark the current choice
+    current = get_user_model(user.id) or "auto"
+    keyboard = [[InlineKeyboardButton(
+        ("✅ " if current == "auto" else "") + t("commands.setmodel.auto", user_lang),
+        callback_data="model_auto"
+    )]]
+    for model in models:
+        keyboard.append([InlineKeyboardButton(
+            ("✅ " if current == model else "") + model,
+            callback_data=f"model_{model}"
+        )])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    try:
+        await update.message.reply_text(
+            t("commands.setmodel.select", user_lang),
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    except Exception as e:
+        logger.error(f"Failed to send model selection: {e}")
+        await update.message.reply_text(t("commands.setmodel.error", user_lang))
@@ -5,7 +5,8 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from ...utils import transcribe_message, get_user_language, SUPPORTED_FORMATS
+from ...utils import get_user_language, SUPPORTED_FORMATS
+from ...pipeline import transcribe_message
 from ...utils.logger import log_user_action
 from ...i18n import t
 
@@ -5,7 +5,7 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from ...utils import transcribe_message
+from ...pipeline import transcribe_message
 from ...utils.logger import log_user_action
 
 logger = logging.getLogger(__name__)
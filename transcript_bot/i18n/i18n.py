@@ -85,6 +85,3 @@ def get_translation(key: str, language: str = DEFAULT_LANGUAGE, **kwargs) -> str
 def t(key: str, language: str = DEFAULT_LANGUAGE, **kwargs) -> str:
     """Short alias for get_translation."""
     return get_translation(key, language, **kwargs)
-
-# Load translations on import
-load_translations()
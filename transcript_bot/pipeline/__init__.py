@@ -0,0 +1,17 @@
+"""Staged transcription pipeline."""
+
+from .job import TranscriptionJob
+from .pipeline import Pipeline, Stage
+from .stages import start_pipeline, get_pipeline
+from .intake import transcribe_message, resume_job, cancel_job
+
+__all__ = [
+    "TranscriptionJob",
+    "Pipeline",
+    "Stage",
+    "start_pipeline",
+    "get_pipeline",
+    "transcribe_message",
+    "resume_job",
+    "cancel_job",
+]
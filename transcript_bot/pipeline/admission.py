@@ -0,0 +1,137 @@
+"""Admission control: estimate the backlog in seconds of work and shed load past an SLA."""
+
+import logging
+import os
+import time
+
+from ..db import get_queue_work, get_worker_stats
+from ..utils import metrics
+from ..utils.governor import budget_plan
+from .job import TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+# Longest projected time (seconds) from receiving audio to finishing its
+# transcription that new audio is accepted with; 0 accepts everything
+ADMISSION_SLA_SECONDS = int(os.getenv("ADMISSION_SLA_SECONDS", "0"))
+
+# Past the SLA, "reject" turns audio away with when to send it again and
+# "defer" queues it, telling the user when it should be ready
+ADMISSION_OVERLOAD = os.getenv("ADMISSION_OVERLOAD", "reject").lower()
+
+# Real-time factor (inference seconds per audio second) assumed until
+# transcriptions have been measured
+ADMISSION_DEFAULT_RTF = float(os.getenv("ADMISSION_DEFAULT_RTF", "0.5"))
+
+# Shortest job first with aging: a job is queued as if it arrived this many
+# times its estimated work later, so short clips pass long ones that are
+# waiting but no job waits forever; 0 is first come, first served
+SJF_AGING_WEIGHT = float(os.getenv("SJF_AGING_WEIGHT", "1.0"))
+
+# Weight of the newest measurement in the real-time factor average
+RTF_SMOOTHING = 0.2
+
+
+class BacklogEstimator:
+    """
+    Work admitted to this process's pipeline, in seconds of inference.
+
+    A job's work is its audio duration times the real-time factor, a
+    moving average of the backend's measured transcriptions. Jobs in
+    inference count only what is left of their estimate.
+    """
+
+    def __init__(self, capacity: int, rtf: float = ADMISSION_DEFAULT_RTF):
+        """
+        Args:
+            capacity: Jobs transcribed at the same time
+            rtf: Real-time factor until one is measured
+        """
+        self.capacity = max(1, capacity)
+        self.rtf = rtf
+        self.measured = False
+        # Jobs by id(), which stays unique while the job is held here
+        self._jobs: dict[int, TranscriptionJob] = {}
+        self._started: dict[int, float] = {}
+
+    def work(self, job: TranscriptionJob) -> float:
+        """Estimated inference seconds of a job."""
+        return job.duration * self.rtf
+
+    def priority(self, job: TranscriptionJob) -> float:
+        """Queue key of a job: its arrival, pushed back by its work."""
+        return job.created_at + SJF_AGING_WEIGHT * self.work(job)
+
+    def add(self, job: TranscriptionJob) -> None:
+        """Count an admitted job."""
+        self._jobs[id(job)] = job
+        self._publish()
+
+    def start(self, job: TranscriptionJob) -> None:
+        """Note that a job's inference has started."""
+        self._started[id(job)] = time.monotonic()
+
+    def finish(self, job: TranscriptionJob) -> None:
+        """Forget a job that left the pipeline."""
+        self._jobs.pop(id(job), None)
+        self._started.pop(id(job), None)
+        self._publish()
+
+    def observe(self, audio_seconds: float, inference_seconds: float) -> None:
+        """Fold a finished transcription into the real-time factor."""
+        if audio_seconds <= 0:
+            return
+        rtf = inference_seconds / audio_seconds
+        self.rtf = rtf if not self.measured else (1 - RTF_SMOOTHING) * self.rtf + RTF_SMOOTHING * rtf
+        self.measured = True
+        metrics.set_gauge("admission_rtf", self.rtf)
+
+    def eta(self, job: TranscriptionJob) -> float:
+        """
+        Projected seconds until a new job's transcription is done.
+
+        Only jobs that would be served before it count: those already in
+        inference and those with a lower queue key.
+        """
+        key = self.priority(job)
+        now = time.monotonic()
+        ahead = 0.0
+        for job_key, other in self._jobs.items():
+            started = self._started.get(job_key)
+            if started is not None:
+                ahead += max(0.0, self.work(other) - (now - started))
+            elif self.priority(other) <= key:
+                ahead += self.work(other)
+        return ahead / self.capacity + self.work(job)
+
+    def backlog(self) -> float:
+        """Seconds until the admitted work is done, at full capacity."""
+        return sum(self.work(job) for job in self._jobs.values()) / self.capacity
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_backlog_seconds", self.backlog())
+
+
+# Backlog of the pipeline in this process (the bot, or a worker)
+estimator = BacklogEstimator(budget_plan["inference_workers"])
+
+
+def queue_eta(duration: float) -> float:
+    """
+    Projected seconds until new audio queued for the workers is transcribed.
+
+    Workers report their capacity and real-time factor with their leases;
+    without any, the default factor and one worker are assumed. Blocking:
+    reads the database.
+
+    Args:
+        duration: Audio duration in seconds
+
+    Returns:
+        Projected seconds, counting the jobs the workers would serve first
+    """
+    capacity, rtf = get_worker_stats()
+    rtf = rtf or ADMISSION_DEFAULT_RTF
+    weight = SJF_AGING_WEIGHT * rtf
+    ahead = get_queue_work(time.time() + weight * duration, weight)
+    return ahead * rtf / max(1, capacity) + duration * rtf
@@ -0,0 +1,157 @@
+"""Synthetic benchmark: sequential jobs vs the staged pipeline."""
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .pipeline import Pipeline, Stage
+
+# Mix of audio durations (seconds): mostly short notes, some long ones
+MIXED_WORKLOAD = (5, 5, 8, 12, 20, 30, 45, 60, 120, 300)
+
+# Simulated stage costs, in seconds per second of audio unless noted
+DOWNLOAD_FIXED = 0.25
+DOWNLOAD_PER_SECOND = 0.002
+DECODE_PER_SECOND = 0.004
+INFERENCE_PER_SECOND = 0.05
+DELIVER_FIXED = 0.15
+
+
+class _Simulation:
+    """Stage implementations that sleep for the simulated cost."""
+
+    def __init__(self, scale: float, decode_workers: int, inference_workers: int):
+        self.scale = scale
+        self.decode_pool = ThreadPoolExecutor(max_workers=decode_workers)
+        self.inference_pool = ThreadPoolExecutor(max_workers=inference_workers)
+        self.latencies: list[float] = []
+
+    async def download(self, job: dict) -> bool:
+        await asyncio.sleep((DOWNLOAD_FIXED + DOWNLOAD_PER_SECOND * job["duration"]) * self.scale)
+        return True
+
+    async def prepare(self, job: dict) -> bool:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.decode_pool, time.sleep, DECODE_PER_SECOND * job["duration"] * self.scale)
+        return True
+
+    async def transcribe(self, job: dict) -> bool:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.inference_pool, time.sleep, INFERENCE_PER_SECOND * job["duration"] * self.scale)
+        return True
+
+    async def deliver(self, job: dict) -> bool:
+        await asyncio.sleep(DELIVER_FIXED * self.scale)
+        self.latencies.append(time.perf_counter() - job["submitted"])
+        return True
+
+    def close(self) -> None:
+        self.decode_pool.shutdown()
+        self.inference_pool.shutdown()
+
+
+def _summary(name: str, jobs: int, wall: float, latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "mode": name,
+        "jobs": jobs,
+        "wall_seconds": wall,
+        "jobs_per_minute": jobs / wall * 60 if wall else 0.0,
+        "mean_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p95_latency": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+
+async def _run_sequential(durations: list[float], scale: float) -> dict:
+    """One job at a time through every stage, like the old processing lock."""
+    simulation = _Simulation(scale, 1, 1)
+    start = time.perf_counter()
+    jobs = [{"duration": duration, "submitted": start} for duration in durations]
+    for job in jobs:
+        for stage in (simulation.download, simulation.prepare, simulation.transcribe, simulation.deliver):
+            await stage(job)
+    wall = time.perf_counter() - start
+    simulation.close()
+    return _summary("sequential", len(jobs), wall, simulation.latencies)
+
+
+async def _run_pipelined(
+    durations: list[float],
+    scale: float,
+    name: str,
+    download_concurrency: int,
+    decode_workers: int,
+    inference_workers: int,
+    deliver_concurrency: int,
+    queue_size: int,
+) -> dict:
+    """All jobs submitted at once to a pipeline shaped like the bot's."""
+    simulation = _Simulation(scale, decode_workers, inference_workers)
+    pipeline = Pipeline([
+        Stage("download", simulation.download, download_concurrency, queue_size),
+        Stage("prepare", simulation.prepare, decode_workers, queue_size),
+        Stage("transcribe", simulation.transcribe, inference_workers, queue_size),
+        Stage("deliver", simulation.deliver, deliver_concurrency, queue_size),
+    ])
+    pipeline.start()
+
+    start = time.perf_counter()
+    for duration in durations:
+        job = {"duration": duration, "submitted": start}
+        # Wait for room instead of rejecting, so every job is measured
+        while not pipeline.submit(job):
+            await asyncio.sleep(0.01)
+    await pipeline.join()
+    wall = time.perf_counter() - start
+
+    await pipeline.stop()
+    simulation.close()
+    return _summary(name, len(durations), wall, simulation.latencies)
+
+
+async def run_benchmark(
+    jobs: int,
+    scale: float = 1.0,
+    seed: int = 0,
+    download_concurrency: int = 4,
+    decode_workers: int = 1,
+    inference_workers: int = 2,
+    deliver_concurrency: int = 4,
+    queue_size: int = 8,
+) -> list[dict]:
+    """
+    Process the same mixed workload sequentially and through the pipeline.
+
+    Stage costs are simulated with sleeps, so the benchmark measures how well
+    the stages overlap, not CPU contention between them. The pipeline is run
+    once with a single inference worker (pure overlap gain) and once with
+    the configured pool sizes.
+
+    Args:
+        jobs: Number of jobs
+        scale: Multiplier applied to every simulated cost
+        seed: Seed of the workload shuffle
+        download_concurrency: Download stage workers
+        decode_workers: Prepare stage workers
+        inference_workers: Transcribe stage workers
+        deliver_concurrency: Deliver stage workers
+        queue_size: Queue size in front of each stage
+
+    Returns:
+        One summary dict per mode
+    """
+    rng = random.Random(seed)
+    durations = [rng.choice(MIXED_WORKLOAD) for _ in range(jobs)]
+
+    return [
+        await _run_sequential(durations, scale),
+        await _run_pipelined(
+            durations, scale, "pipelined, 1 inference worker",
+            download_concurrency, decode_workers, 1, deliver_concurrency, queue_size,
+        ),
+        await _run_pipelined(
+            durations, scale, f"pipelined, {inference_workers} inference workers",
+            download_concurrency, decode_workers, inference_workers, deliver_concurrency, queue_size,
+        ),
+    ]
@@ -0,0 +1,132 @@
+"""Coalesce bursts of short voice notes from one chat into a single job."""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable
+
+from ..utils import metrics
+from .job import TranscriptionJob
+
+logger = logging.getLogger(__name__)
+
+# Voice notes of a user in a chat this close together (seconds) become one
+# job; 0 disables coalescing
+BURST_WINDOW_SECONDS = float(os.getenv("BURST_WINDOW_SECONDS", "0"))
+
+# A burst is sent off once it has this many notes or seconds of audio
+BURST_MAX_NOTES = int(os.getenv("BURST_MAX_NOTES", "10"))
+BURST_MAX_SECONDS = int(os.getenv("BURST_MAX_SECONDS", "240"))
+
+# Only notes shorter than this join bursts; their replies are plain text
+BURST_NOTE_MAX_SECONDS = 60
+
+# Silence between two notes in the joined audio
+BURST_GAP_SECONDS = 1.0
+
+
+def merge_jobs(jobs: list[TranscriptionJob]) -> TranscriptionJob:
+    """
+    Turn the jobs of a burst into one job with a part per note.
+
+    Args:
+        jobs: Jobs of the same user and chat, in arrival order
+
+    Returns:
+        The job itself for a single note, else a job whose parts are the notes
+    """
+    if len(jobs) == 1:
+        return jobs[0]
+
+    first = jobs[0]
+    return TranscriptionJob(
+        chat_id=first.chat_id,
+        message_id=first.message_id,
+        user_id=first.user_id,
+        username=first.username,
+        file_id=None,
+        file_unique_id=first.file_unique_id,
+        language=first.language,
+        audio_type=first.audio_type,
+        quota_seconds=sum(job.quota_seconds for job in jobs),
+        duration=sum(job.duration for job in jobs),
+        job_id=f"burst:{first.file_unique_id}:{first.language}",
+        parts=[
+            {
+                "message_id": job.message_id,
+                "file_id": job.file_id,
+                "file_unique_id": job.file_unique_id,
+                "duration": job.duration,
+                "quota_seconds": job.quota_seconds,
+            }
+            for job in jobs
+        ],
+    )
+
+
+class BurstCollector:
+    """
+    Hold short voice notes per user and chat until the burst ends.
+
+    Each note restarts the window, so a burst ends once the user has been
+    quiet for window seconds, or when it reaches BURST_MAX_NOTES notes or
+    BURST_MAX_SECONDS of audio.
+    """
+
+    def __init__(self, window: float, flush: Callable[[TranscriptionJob], Awaitable[None]]):
+        """
+        Args:
+            window: Seconds of quiet that end a burst
+            flush: Coroutine receiving the merged job of each burst
+        """
+        self.window = window
+        self.flush = flush
+        self._pending: dict[tuple[int, int], list[TranscriptionJob]] = {}
+        self._timers: dict[tuple[int, int], asyncio.TimerHandle] = {}
+        # Flushes started by timers, referenced until done so they are not collected
+        self._flushing: set[asyncio.Task] = set()
+
+    def accepts(self, job: TranscriptionJob) -> bool:
+        """Return whether a voice note's job may join a burst."""
+        return self.window > 0 and 0 < job.duration < BURST_NOTE_MAX_SECONDS
+
+    async def add(self, job: TranscriptionJob) -> None:
+        """Add a note to its user's burst in the chat."""
+        key = (job.chat_id, job.user_id)
+        pending = self._pending.get(key, [])
+
+        # Send off what is there rather than grow past the limits
+        if pending and sum(item.duration for item in pending) + job.duration > BURST_MAX_SECONDS:
+            await self._flush(key)
+
+        self._pending.setdefault(key, []).append(job)
+        if len(self._pending[key]) >= BURST_MAX_NOTES:
+            await self._flush(key)
+            return
+
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        self._timers[key] = asyncio.get_running_loop().call_later(self.window, self._flush_later, key)
+
+    def _flush_later(self, key: tuple[int, int]) -> None:
+        task = asyncio.ensure_future(self._flush(key))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, key: tuple[int, int]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        jobs = self._pending.pop(key, None)
+        if not jobs:
+            return
+
+        metrics.inc("burst_jobs_total")
+        metrics.inc("burst_notes_total", len(jobs))
+        if len(jobs) > 1:
+            logger.info(f"Coalesced {len(jobs)} voice notes of user {key[1]} into one job")
+        try:
+            await self.flush(merge_jobs(jobs))
+        except Exception as e:
+            logger.error(f"Failed to dispatch burst: {e}")
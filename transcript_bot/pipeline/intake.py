@@ -0,0 +1,284 @@
+"""Turn incoming messages and retries into pipeline jobs."""
+
+import asyncio
+import logging
+import math
+import os
+
+from telegram import Bot, Update
+from telegram.ext import ContextTypes
+
+from ..db import enqueue_job, request_cancel
+from ..utils import get_user_language, MAX_DURATION, MAX_FILE_SIZE
+from ..utils import metrics
+from ..utils.logger import log_transcription
+from ..utils.quota import QUOTA_WINDOW_SECONDS, quotas
+from ..i18n import t
+from .admission import ADMISSION_OVERLOAD, ADMISSION_SLA_SECONDS, estimator, queue_eta
+from .burst import BURST_WINDOW_SECONDS, BurstCollector
+from .job import TranscriptionJob
+from .stages import find_job, get_pipeline
+
+logger = logging.getLogger(__name__)
+
+# "frontend" only queues jobs for `run.py worker` processes; "local" runs
+# them in this process's pipeline
+PROCESSING_MODE = os.getenv("PROCESSING_MODE", "local").lower()
+FRONTEND_ONLY = PROCESSING_MODE == "frontend"
+
+
+async def dispatch(job: TranscriptionJob) -> bool:
+    """
+    Hand a job to whatever runs it.
+
+    Args:
+        job: Job to run, from the first stage whose input still exists
+
+    Returns:
+        False if the local pipeline has no room for the job
+    """
+    if FRONTEND_ONLY:
+        # Workers pick the stage: only they can see their files
+        await asyncio.to_thread(enqueue_job, job.to_payload())
+        metrics.inc("job_queue_enqueued_total")
+        return True
+    if not get_pipeline().submit(job, job.resume_stage()):
+        return False
+    estimator.add(job)
+    return True
+
+
+async def cancel_job(cancel_key: str, user_id: int) -> bool:
+    """
+    Cancel a job from its cancel button.
+
+    Args:
+        cancel_key: Key in the button's callback data
+        user_id: User who pressed it
+
+    Returns:
+        False if the job is no longer running or someone else sent it
+    """
+    if FRONTEND_ONLY:
+        # The worker running the job sees the flag within a poll interval
+        queue_id = cancel_key.removeprefix("q")
+        if not queue_id.isdigit():
+            return False
+        return await asyncio.to_thread(request_cancel, int(queue_id), user_id)
+
+    job = find_job(cancel_key)
+    if job is None or job.user_id != user_id:
+        return False
+    job.cancel.cancel()
+    return True
+
+
+def _audio_type(media) -> str | None:
+    """Best-effort MIME type of a voice, audio or video note."""
+    if getattr(media, 'mime_type', None):
+        return media.mime_type
+    if hasattr(media, 'length'):
+        return 'video_note/mp4'
+    return 'voice/ogg'
+
+
+async def _admit(update: Update, media, user_lang: str) -> bool:
+    """Check the duration and size Telegram reports for the media, and charge its quotas."""
+    user = update.effective_user
+    chat_id = update.effective_chat.id
+    duration = getattr(media, 'duration', None) or 0
+    file_size = getattr(media, 'file_size', None) or 0
+
+    if duration > MAX_DURATION:
+        metrics.inc("admission_rejected_total", reason="duration")
+        log_transcription(user.id, user.username, media.file_id, duration, "unknown", "error: too long")
+        await update.message.reply_text(
+            t("commands.transcription.too_long", user_lang,
+              duration=duration,
+              max_duration=MAX_DURATION // 60),
+            reply_to_message_id=update.message.message_id
+        )
+        return False
+
+    if file_size > MAX_FILE_SIZE:
+        metrics.inc("admission_rejected_total", reason="size")
+        log_transcription(user.id, user.username, media.file_id, duration, "unknown", "error: too large")
+        await update.message.reply_text(
+            t("commands.transcription.too_large", user_lang,
+              size_mb=file_size / (1024 * 1024),
+              max_mb=MAX_FILE_SIZE // (1024 * 1024)),
+            reply_to_message_id=update.message.message_id
+        )
+        return False
+
+    exhausted = quotas.check(user.id, chat_id, duration)
+    if exhausted is not None:
+        kind, wait = exhausted
+        metrics.inc("admission_rejected_total", reason="quota")
+        log_transcription(user.id, user.username, media.file_id, duration, "unknown", f"error: {kind} quota")
+        await update.message.reply_text(
+            t(f"commands.transcription.quota_{kind}", user_lang,
+              limit=quotas.capacity[kind] // 60,
+              window=QUOTA_WINDOW_SECONDS / 3600,
+              wait=math.ceil(wait / 60)),
+            reply_to_message_id=update.message.message_id
+        )
+        return False
+
+    # Charged with Telegram's duration: the download has not measured it yet
+    quotas.charge(user.id, chat_id, duration)
+    return True
+
+
+async def transcribe_message(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    media,
+) -> None:
+    """Queue audio from a message for transcription."""
+    user = update.effective_user
+    user_lang = get_user_language(user.id)
+
+    # Reject from Telegram's metadata, before spending a download on it
+    if not await _admit(update, media, user_lang):
+        return
+
+    # Telegram's value until the download measures it
+    duration = getattr(media, 'duration', None) or 0.0
+    job = TranscriptionJob(
+        chat_id=update.effective_chat.id,
+        message_id=update.message.message_id,
+        user_id=user.id,
+        username=user.username,
+        file_id=media.file_id,
+        file_unique_id=media.file_unique_id,
+        language=user_lang,
+        audio_type=_audio_type(media),
+        # What _admit charged
+        quota_seconds=duration if quotas.enabled else 0.0,
+        duration=duration,
+    )
+
+    # Short voice notes may wait for the rest of their burst
+    bursts = _get_bursts(context.bot)
+    if update.message.voice is not None and bursts.accepts(job):
+        await bursts.add(job)
+        return
+
+    await _dispatch_or_reply_busy(context.bot, job)
+
+
+async def _shed_load(bot: Bot, job: TranscriptionJob) -> bool:
+    """
+    Check a new job's projected completion against the SLA.
+
+    Past it, the job is either rejected with when to send it again, or
+    (ADMISSION_OVERLOAD=defer) accepted with an estimate of when it will
+    be ready.
+
+    Returns:
+        False if the job was rejected
+    """
+    if ADMISSION_SLA_SECONDS <= 0:
+        return True
+
+    if FRONTEND_ONLY:
+        eta = await asyncio.to_thread(queue_eta, job.duration)
+    else:
+        eta = estimator.eta(job)
+    if eta <= ADMISSION_SLA_SECONDS:
+        return True
+
+    if ADMISSION_OVERLOAD == "defer":
+        metrics.inc("admission_deferred_total")
+        await bot.send_message(
+            chat_id=job.chat_id,
+            text=t("commands.transcription.deferred", job.language, eta=math.ceil(eta / 60)),
+            reply_to_message_id=job.message_id
+        )
+        return True
+
+    # The work ahead drains at one second per second
+    metrics.inc("admission_rejected_total", reason="overload")
+    log_transcription(job.user_id, job.username, job.filename, job.duration, "unknown", "error: overloaded")
+    await bot.send_message(
+        chat_id=job.chat_id,
+        text=t("commands.transcription.overloaded", job.language,
+               eta=math.ceil(eta / 60),
+               sla=math.ceil(ADMISSION_SLA_SECONDS / 60),
+               retry=math.ceil((eta - ADMISSION_SLA_SECONDS) / 60)),
+        reply_to_message_id=job.message_id
+    )
+    return False
+
+
+async def _dispatch_or_reply_busy(bot: Bot, job: TranscriptionJob) -> None:
+    """Dispatch a new job unless it is shed, telling the user if there is no room for it."""
+    if not await _shed_load(bot, job):
+        # Audio turned away for load is not held against the quota
+        quotas.charge(job.user_id, job.chat_id, -job.quota_seconds)
+        return
+
+    # Every stage queue up to download is full: turn the job away
+    if not await dispatch(job):
+        quotas.charge(job.user_id, job.chat_id, -job.quota_seconds)
+        await bot.send_message(
+            chat_id=job.chat_id,
+            text=t("commands.transcription.busy", job.language),
+            reply_to_message_id=job.message_id
+        )
+
+
+# Burst collector of the running bot
+_bursts: BurstCollector | None = None
+
+
+def _get_bursts(bot: Bot) -> BurstCollector:
+    """Return the burst collector, creating it for the bot on first use."""
+    global _bursts
+    if _bursts is None:
+        _bursts = BurstCollector(BURST_WINDOW_SECONDS, lambda job: _dispatch_or_reply_busy(bot, job))
+    return _bursts
+
+
+async def resume_job(retry_data: dict, user, language: str, message_id: int) -> bool:
+    """
+    Queue a failed job again, starting at the stage it failed in.
+
+    If its audio is gone (spool eviction, or another worker's disk) the
+    job starts over from the download.
+
+    Args:
+        retry_data: Entry of failed_transcriptions
+        user: Telegram user who asked for the retry
+        language: User's language
+        message_id: Message showing the job's status (the retry button's)
+
+    Returns:
+        False if the pipeline has no room for the job
+    """
+    pcm_path = retry_data.get("pcm_path")
+    job = TranscriptionJob(
+        chat_id=retry_data["chat_id"],
+        message_id=retry_data["message_id"],
+        user_id=user.id,
+        username=user.username,
+        file_id=retry_data.get("file_id"),
+        file_unique_id=retry_data.get("file_unique_id"),
+        language=language,
+        audio_type=retry_data.get("audio_type"),
+        # Retries are not charged again, the first attempt's charge stands
+        quota_seconds=retry_data.get("quota_seconds") or 0.0,
+        duration=retry_data.get("duration") or 0.0,
+        job_id=retry_data.get("job_id"),
+        model=retry_data.get("model"),
+        tmp_path=retry_data.get("tmp_path"),
+        local_file=retry_data.get("local_file", False),
+        pcm_path=pcm_path,
+        remuxed=bool(pcm_path and retry_data.get("remuxed")),
+        parts=retry_data.get("parts"),
+        processing_message_id=message_id,
+    )
+
+    # Resume from the failed stage: reuse the preprocessed PCM if kept
+    return await dispatch(job)
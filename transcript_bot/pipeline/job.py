@@ -0,0 +1,117 @@
+"""State of one transcription job as it moves through the pipeline."""
+
+import os
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+from ..utils.cancel import CancelToken
+
+# Fields that only mean something in the process holding the job
+_PROCESS_LOCAL = {"created_at", "cancel"}
+
+
+@dataclass
+class TranscriptionJob:
+    """
+    Everything a stage needs to process a job, without the Telegram update.
+
+    Holding plain IDs instead of the Update lets a job outlive the handler
+    that created it, so stages can run whenever their queue gets to it.
+    """
+
+    chat_id: int
+    message_id: int
+    user_id: int
+    username: str | None
+    file_id: str | None
+    file_unique_id: str | None
+    language: str
+    audio_type: str | None = None
+
+    # Audio seconds charged against the quotas at admission
+    quota_seconds: float = 0.0
+
+    # Filled in by the stages
+    duration: float = 0.0
+    job_id: str | None = None
+    model: str | None = None
+    tmp_path: str | None = None
+    pcm_path: str | None = None
+    text: str | None = None
+    processing_message_id: int | None = None
+    transcription_time: float = 0.0
+
+    # tmp_path belongs to a local Bot API server and must not be deleted
+    local_file: bool = False
+
+    # pcm_path holds the remuxed original audio track, not decoded PCM
+    remuxed: bool = False
+
+    # Stage the job is in (or failed in)
+    stage: str = "download"
+    created_at: float = field(default_factory=time.monotonic)
+
+    # Notes of a coalesced burst, in order: message_id, file_id,
+    # file_unique_id and duration, plus tmp_path, start, end and text as
+    # the stages fill them in
+    parts: list[dict] | None = None
+
+    # ID in the durable job queue when a worker process runs the job
+    queue_id: int | None = None
+
+    # A deadline cut inference short: text holds what was transcribed
+    partial: bool = False
+
+    # Set by the cancel button; carries the deadline of the current stage
+    cancel: CancelToken = field(default_factory=CancelToken, repr=False, compare=False)
+
+    def to_payload(self) -> dict[str, Any]:
+        """Serialize the job for the durable job queue."""
+        # Monotonic clocks and cancel tokens mean nothing in another process
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name not in _PROCESS_LOCAL}
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "TranscriptionJob":
+        """Rebuild a job from to_payload() output, ignoring unknown keys."""
+        known = {f.name for f in fields(cls)} - _PROCESS_LOCAL
+        return cls(**{key: value for key, value in payload.items() if key in known})
+
+    def resume_stage(self) -> str:
+        """
+        First stage whose input is still on this machine's disk.
+
+        A retry picked up by another worker, or whose spooled audio was
+        evicted, starts over from the download.
+        """
+        if self.pcm_path and os.path.exists(self.pcm_path):
+            return "transcribe"
+        self.pcm_path = None
+        self.remuxed = False
+        if self.tmp_path and os.path.exists(self.tmp_path):
+            return "prepare"
+        self.tmp_path = None
+        self.local_file = False
+        return "download"
+
+    @property
+    def cancel_key(self) -> str:
+        """Identify the job in its cancel button (the queue row for workers)."""
+        if self.queue_id is not None:
+            return f"q{self.queue_id}"
+        return f"{self.chat_id}_{self.message_id}"
+
+    @property
+    def is_video_note(self) -> bool:
+        """Whether the job's file is an MP4 video note."""
+        return (self.audio_type or "").startswith("video_note")
+
+    @property
+    def suffix(self) -> str:
+        """Suffix of the downloaded file, so tools detect its container."""
+        return ".mp4" if self.is_video_note else ".ogg"
+
+    @property
+    def filename(self) -> str:
+        """Name used in transcription logs."""
+        return f"{self.file_id or self.job_id}{self.suffix}"
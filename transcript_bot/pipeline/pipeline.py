@@ -0,0 +1,171 @@
+"""Generic staged pipeline with bounded queues between stages."""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """One step of the pipeline with its own queue and concurrency."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[bool]],
+        concurrency: int,
+        queue_size: int,
+    ):
+        """
+        Args:
+            name: Stage name used in logs and metrics
+            handler: Coroutine processing a job; returns False to stop the
+                job here (e.g. it was rejected), True to pass it on
+            concurrency: Jobs processed at the same time
+            queue_size: Jobs waiting before the previous stage blocks
+        """
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        # Holds (priority, sequence, job) entries
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=queue_size)
+        self.active = 0
+
+
+class Pipeline:
+    """
+    Run jobs through a list of stages connected by bounded queues.
+
+    Each stage has its own workers, so while one job is in inference the
+    next one is already downloading or decoding. A full queue blocks the
+    stage before it, which bounds the work in flight; a full first queue
+    makes submit() refuse new jobs. Each queue hands out the job with the
+    lowest priority key first, in arrival order without a key function.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        on_error: Callable[[Any, Exception], Awaitable[None]] | None = None,
+        on_finish: Callable[[Any], Awaitable[None]] | None = None,
+        priority: Callable[[Any], float] | None = None,
+    ):
+        """
+        Args:
+            stages: Stages in processing order
+            on_error: Coroutine called when a stage raises
+            on_finish: Coroutine called once a job leaves the pipeline,
+                whether it was delivered, stopped by a stage or failed
+            priority: Key of a job in the stage queues, lowest first,
+                computed each time the job is queued
+        """
+        self.stages = stages
+        self.on_error = on_error
+        self.on_finish = on_finish
+        self.priority = priority
+        self._by_name = {stage.name: stage for stage in stages}
+        self._tasks: list[asyncio.Task] = []
+        self._sequence = itertools.count()
+
+    def _entry(self, job: Any) -> tuple:
+        # The sequence breaks ties in arrival order and keeps jobs from being compared
+        return (self.priority(job) if self.priority else 0, next(self._sequence), job)
+
+    def start(self) -> None:
+        """Start the stage workers on the running event loop."""
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for worker in range(stage.concurrency):
+                self._tasks.append(asyncio.create_task(
+                    self._work(stage, next_stage),
+                    name=f"pipeline-{stage.name}-{worker}",
+                ))
+
+    async def stop(self) -> None:
+        """Cancel the stage workers (queued jobs are dropped)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, job: Any, stage: str | None = None) -> bool:
+        """
+        Queue a job without waiting.
+
+        Args:
+            job: Job to process
+            stage: Stage to start at (default: the first), e.g. to resume
+
+        Returns:
+            False if that stage's queue is full
+        """
+        target = self._by_name[stage] if stage else self.stages[0]
+        try:
+            target.queue.put_nowait(self._entry(job))
+        except asyncio.QueueFull:
+            metrics.inc("pipeline_rejected_total", stage=target.name)
+            return False
+        metrics.set_gauge("pipeline_queue_depth", target.queue.qsize(), stage=target.name)
+        return True
+
+    def has_room(self, stage: str | None = None) -> bool:
+        """Return whether submit() would accept a job at a stage."""
+        target = self._by_name[stage] if stage else self.stages[0]
+        return not target.queue.full()
+
+    def backlog(self, stage: str) -> int:
+        """Return the number of jobs waiting for a stage."""
+        return self._by_name[stage].queue.qsize()
+
+    def in_flight(self) -> int:
+        """Return the number of jobs queued or being processed in any stage."""
+        return sum(stage.queue.qsize() + stage.active for stage in self.stages)
+
+    async def join(self) -> None:
+        """Wait until every queued job has left the pipeline."""
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def _work(self, stage: Stage, next_stage: Stage | None) -> None:
+        while True:
+            _, _, job = await stage.queue.get()
+            metrics.set_gauge("pipeline_queue_depth", stage.queue.qsize(), stage=stage.name)
+            stage.active += 1
+            start = time.perf_counter()
+            finished = True
+            try:
+                proceed = await stage.handler(job)
+                metrics.inc("pipeline_stage_seconds_total", time.perf_counter() - start, stage=stage.name)
+                metrics.inc("pipeline_stage_jobs_total", stage=stage.name)
+                if proceed and next_stage is not None:
+                    # Blocks while the next stage is saturated (backpressure)
+                    await next_stage.queue.put(self._entry(job))
+                    metrics.set_gauge("pipeline_queue_depth", next_stage.queue.qsize(), stage=next_stage.name)
+                    finished = False
+            except asyncio.CancelledError:
+                # Interrupted by stop(), not finished
+                finished = False
+                raise
+            except Exception as e:
+                metrics.inc("pipeline_stage_errors_total", stage=stage.name)
+                if self.on_error is None:
+                    logger.error(f"Pipeline stage {stage.name} failed: {e}")
+                else:
+                    try:
+                        await self.on_error(job, e)
+                    except Exception as handler_error:
+                        logger.error(f"Pipeline error handler failed: {handler_error}")
+            finally:
+                stage.active -= 1
+                stage.queue.task_done()
+
+            if finished and self.on_finish is not None:
+                try:
+                    await self.on_finish(job)
+                except Exception as e:
+                    logger.error(f"Pipeline finish handler failed: {e}")
@@ -0,0 +1,745 @@
+"""Transcription stages: download, prepare, transcribe and deliver."""
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+
+from ..transcribers import (
+    decode_audio,
+    extract_audio,
+    denoise_audio,
+    transcribe_prepared,
+    transcribe_preview,
+    transcribe_segments,
+    select_model,
+)
+from ..transcribers.chunking import concatenate_wavs, split_segments
+from ..transcribers.transcriber import PREVIEW_SECONDS
+from ..db import save_transcription, save_transcriptions, set_job_message
+from ..utils import metrics
+from ..utils.cancel import CancelToken, DeadlineExceeded, JobCancelled
+from ..utils.governor import budget_plan
+from ..utils.outbox import PRIORITY_PROGRESS
+from ..utils.logger import log_transcription, log_api_call
+from ..utils.spool import spool_file, release
+from ..utils.summarizer import summarize_text
+from ..utils.download import DurationExceeded, stream_download
+from ..utils.utils import (
+    MAX_DURATION,
+    TELEGRAM_LOCAL_MODE,
+    failed_transcriptions,
+    temp_transcripts,
+    get_audio_duration,
+    get_user_model,
+)
+from ..utils.workers import run_in_worker, run_decode, run_denoise, idle_workers
+from ..i18n import t
+from .admission import estimator
+from .burst import BURST_GAP_SECONDS
+from .job import TranscriptionJob
+from .pipeline import Pipeline, Stage
+
+logger = logging.getLogger(__name__)
+
+# Concurrent downloads and deliveries (network bound, so more than cores)
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+DELIVER_CONCURRENCY = int(os.getenv("DELIVER_CONCURRENCY", "4"))
+
+# Audio at least this long (seconds) gets a provisional preview reply
+PREVIEW_MIN_DURATION = int(os.getenv("PREVIEW_MIN_DURATION", "60"))
+
+# Jobs waiting in front of each stage; a full download queue turns new
+# jobs away with the busy message
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+# Seconds each stage may take (0 = no limit). A download or decode that
+# runs out fails with a retry button, inference that runs out delivers the
+# text transcribed so far, and a summary that runs out is left out
+DOWNLOAD_DEADLINE_SECONDS = int(os.getenv("DOWNLOAD_DEADLINE_SECONDS", "120"))
+DECODE_DEADLINE_SECONDS = int(os.getenv("DECODE_DEADLINE_SECONDS", "300"))
+INFERENCE_DEADLINE_SECONDS = int(os.getenv("INFERENCE_DEADLINE_SECONDS", "900"))
+SUMMARIZE_DEADLINE_SECONDS = int(os.getenv("SUMMARIZE_DEADLINE_SECONDS", "60"))
+
+# Longest text Telegram accepts in a message
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Jobs of this process showing a cancel button, by cancel key
+_cancellable: dict[str, TranscriptionJob] = {}
+
+
+def find_job(cancel_key: str) -> TranscriptionJob | None:
+    """Return the job of this process behind a cancel button."""
+    return _cancellable.get(cancel_key)
+
+
+def _cancel_markup(job: TranscriptionJob) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton(
+        t("commands.transcription.cancel_button", job.language),
+        callback_data=f"cancel_{job.cancel_key}"
+    )]])
+
+
+async def _start(bot: Bot, job: TranscriptionJob, stage: str, seconds: float) -> None:
+    """
+    Enter a stage: stop a job cancelled while it was queued, start the
+    stage's deadline and, the first time, post the cancel button.
+
+    Raises:
+        JobCancelled: If the job was cancelled while it waited
+    """
+    job.stage = stage
+    if job.cancel.cancelled:
+        raise JobCancelled()
+    job.cancel.start_stage(stage, seconds)
+
+    if job.cancel_key in _cancellable:
+        return
+    _cancellable[job.cancel_key] = job
+
+    # A retry keeps the message of its button and only gains the cancel button
+    if job.processing_message_id is None:
+        processing_message = await bot.send_message(
+            chat_id=job.chat_id,
+            text=t("commands.transcription.processing", job.language),
+            reply_to_message_id=job.message_id,
+            reply_markup=_cancel_markup(job),
+            rate_limit_args=PRIORITY_PROGRESS
+        )
+        job.processing_message_id = processing_message.message_id
+        # If this worker dies, whoever gives up on the job edits the message
+        if job.queue_id is not None:
+            try:
+                await asyncio.to_thread(set_job_message, job.queue_id, job.processing_message_id)
+            except Exception as e:
+                logger.warning(f"Failed to record processing message: {e}")
+    else:
+        try:
+            await bot.edit_message_reply_markup(
+                chat_id=job.chat_id,
+                message_id=job.processing_message_id,
+                reply_markup=_cancel_markup(job),
+                rate_limit_args=PRIORITY_PROGRESS
+            )
+        except Exception as e:
+            logger.warning(f"Failed to add cancel button: {e}")
+
+
+async def _guarded(job: TranscriptionJob, work, enforce_deadline: bool = True):
+    """
+    Await a stage's work unless the job is cancelled or out of time first.
+
+    Blocking work on the pools holds the same token and stops at its next
+    check, but the stage's slot is freed right away.
+
+    Args:
+        job: Job whose cancel button and deadline apply
+        work: Coroutine or future doing the stage's work
+        enforce_deadline: False if the work raises DeadlineExceeded itself
+            (to hand over partial results), so only cancellation is awaited
+
+    Returns:
+        The work's result
+
+    Raises:
+        JobCancelled: If the job was cancelled first
+        DeadlineExceeded: If the stage deadline passed first
+    """
+    task = asyncio.ensure_future(work)
+    cancelled = asyncio.ensure_future(job.cancel.wait())
+    timeout = job.cancel.remaining() if enforce_deadline else None
+    try:
+        done, _ = await asyncio.wait({task, cancelled}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        cancelled.cancel()
+        if not task.done():
+            task.cancel()
+
+    if task in done:
+        return task.result()
+    if job.cancel.cancelled:
+        raise JobCancelled()
+    raise DeadlineExceeded(job.stage, job.cancel.seconds)
+
+
+async def download(bot: Bot, job: TranscriptionJob) -> bool:
+    """Post the processing message, then download the audio and check its duration."""
+    await _start(bot, job, "download", DOWNLOAD_DEADLINE_SECONDS)
+    await bot.send_chat_action(chat_id=job.chat_id, action="typing")
+
+    if not await _guarded(job, _download_audio(bot, job)):
+        return False
+
+    # Log transcription start
+    log_transcription(job.user_id, job.username, job.filename, job.duration, job.language, "processing")
+
+    # Same file and language always map to the same job, so chunk
+    # checkpoints of long audio survive retries and restarts
+    if not job.parts:
+        job.job_id = f"{job.file_unique_id}:{job.language}"
+    return True
+
+
+async def _download_audio(bot: Bot, job: TranscriptionJob) -> bool:
+    """Fetch the job's audio; False if it turned out too long."""
+    if job.parts:
+        await _download_parts(bot, job)
+        return True
+
+    # Telegram's duration was checked at intake; the container is probed
+    # while downloading in case it was missing or wrong
+    try:
+        job.tmp_path = await _fetch(bot, job.file_id, job.suffix)
+        job.local_file = TELEGRAM_LOCAL_MODE
+    except DurationExceeded as e:
+        job.duration = e.duration
+        await _reject_too_long(bot, job)
+        return False
+
+    # Check duration
+    job.duration = await asyncio.to_thread(get_audio_duration, job.tmp_path)
+
+    if job.duration > MAX_DURATION:
+        _release_source(job)
+        await _reject_too_long(bot, job)
+        return False
+    return True
+
+
+async def _fetch(bot: Bot, file_id: str, suffix: str) -> str:
+    """
+    Get a file from Telegram.
+
+    Args:
+        bot: Bot to fetch the file with
+        file_id: Telegram file ID
+        suffix: Suffix of the temporary file
+
+    Returns:
+        Path to the file (on the local Bot API server's disk in local mode)
+
+    Raises:
+        DurationExceeded: If the audio is longer than MAX_DURATION
+    """
+    file = await bot.get_file(file_id)
+
+    # The local Bot API server has already written the file: read it
+    # where it is instead of copying it
+    if TELEGRAM_LOCAL_MODE:
+        return file.file_path
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        path = tmp.name
+    try:
+        await stream_download(file.file_path, path, MAX_DURATION)
+    except DurationExceeded:
+        raise
+    except BaseException:
+        # A partial file is no use to a retry, which downloads again (this
+        # includes downloads stopped by a cancel or the deadline)
+        release(path)
+        raise
+    return path
+
+
+async def _download_parts(bot: Bot, job: TranscriptionJob) -> None:
+    """Fetch every note of a burst at once and measure their durations."""
+    job.local_file = TELEGRAM_LOCAL_MODE
+
+    async def fetch(part: dict) -> None:
+        part["tmp_path"] = await _fetch(bot, part["file_id"], ".ogg")
+        part["duration"] = await asyncio.to_thread(get_audio_duration, part["tmp_path"])
+
+    # Let every download finish before failing, so none is left behind
+    results = await asyncio.gather(*(fetch(part) for part in job.parts), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    job.duration = sum(part["duration"] for part in job.parts)
+
+
+def _release_source(job: TranscriptionJob) -> None:
+    """Delete the downloaded files, unless the local Bot API server owns them."""
+    if not job.local_file:
+        release(job.tmp_path)
+        for part in job.parts or []:
+            release(part.get("tmp_path"))
+    job.tmp_path = None
+    for part in job.parts or []:
+        part.pop("tmp_path", None)
+
+
+async def _reject_too_long(bot: Bot, job: TranscriptionJob) -> None:
+    """Tell the user the audio exceeds MAX_DURATION."""
+    log_transcription(job.user_id, job.username, job.filename, job.duration, "unknown", "error: too long")
+    text = t("commands.transcription.too_long", job.language,
+             duration=job.duration,
+             max_duration=MAX_DURATION // 60)
+
+    # The processing message (and its cancel button) is replaced
+    if job.processing_message_id is not None:
+        await bot.edit_message_text(chat_id=job.chat_id, message_id=job.processing_message_id, text=text)
+    else:
+        await bot.send_message(chat_id=job.chat_id, text=text, reply_to_message_id=job.message_id)
+
+
+async def prepare(bot: Bot, job: TranscriptionJob) -> bool:
+    """Decode to 16 kHz PCM and denoise, each on its own CPU pool."""
+    await _start(bot, job, "prepare", DECODE_DEADLINE_SECONDS)
+    if job.parts:
+        return await _guarded(job, _prepare_parts(job))
+    return await _guarded(job, _prepare_audio(job))
+
+
+async def _prepare_audio(job: TranscriptionJob) -> bool:
+    """Decode (or remux) and denoise the job's file."""
+    start = time.perf_counter()
+    input_bytes = os.path.getsize(job.tmp_path)
+
+    # Video notes whose audio codec the backend takes are only remuxed
+    if job.is_video_note:
+        job.pcm_path = await run_decode(extract_audio, job.tmp_path)
+        job.remuxed = job.pcm_path is not None
+
+    if not job.remuxed:
+        job.pcm_path = await run_decode(decode_audio, job.tmp_path, job.cancel)
+
+    method = "remux" if job.remuxed else "decode"
+    metrics.inc("audio_decode_seconds_total", time.perf_counter() - start, method=method)
+    metrics.inc("audio_decode_input_bytes_total", input_bytes, method=method)
+    metrics.inc("audio_decode_output_bytes_total", os.path.getsize(job.pcm_path), method=method)
+
+    # Denoising works on PCM; remuxed audio goes to the backend untouched
+    if not job.remuxed:
+        job.pcm_path = await run_denoise(denoise_audio, job.pcm_path)
+
+    # The original file is no longer needed once the PCM exists
+    _release_source(job)
+    return True
+
+
+async def _prepare_parts(job: TranscriptionJob) -> bool:
+    """Decode the notes of a burst and join them into one PCM file."""
+    results = await asyncio.gather(
+        *(run_decode(decode_audio, part["tmp_path"], job.cancel) for part in job.parts),
+        return_exceptions=True,
+    )
+    wav_paths = [result for result in results if not isinstance(result, BaseException)]
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        # The notes that did decode are not needed without the others
+        for wav_path in wav_paths:
+            release(wav_path)
+        raise errors[0]
+    _release_source(job)
+
+    try:
+        job.pcm_path, spans = await run_decode(concatenate_wavs, wav_paths, BURST_GAP_SECONDS)
+    finally:
+        for wav_path in wav_paths:
+            release(wav_path)
+
+    for part, (start, end) in zip(job.parts, spans):
+        part["start"] = start
+        part["end"] = end
+
+    # One denoise pass for the whole burst
+    job.pcm_path = await run_denoise(denoise_audio, job.pcm_path)
+    return True
+
+
+async def transcribe(bot: Bot, job: TranscriptionJob) -> bool:
+    """Run inference, posting a preview of long audio if a worker is spare."""
+    await _start(bot, job, "transcribe", INFERENCE_DEADLINE_SECONDS)
+    estimator.start(job)
+
+    # Smaller models take short notes and absorb backlogs
+    if job.model is None:
+        job.model = select_model(job.duration, get_pipeline().backlog("transcribe"), get_user_model(job.user_id))
+    logger.info(f"Job {job.job_id} ({job.duration:.1f}s) served by model {job.model}")
+    metrics.inc("transcription_jobs_total", model=job.model)
+
+    start = time.monotonic()
+    if job.parts:
+        # A single inference for the burst, split back per note by timestamp
+        try:
+            segments = await _guarded(
+                job,
+                run_in_worker(transcribe_segments, job.pcm_path, job.language, job.model, job.cancel),
+                enforce_deadline=False,
+            )
+        except DeadlineExceeded as e:
+            _cut_short(job, e)
+            segments = e.segments
+        spans = [(part["start"], part["end"]) for part in job.parts]
+        for part, text in zip(job.parts, split_segments(segments, spans)):
+            part["text"] = text
+        job.text = "\n\n".join(part["text"] for part in job.parts if part["text"])
+        job.transcription_time = time.monotonic() - start
+        if not job.partial:
+            estimator.observe(job.duration, job.transcription_time)
+
+        release(job.pcm_path)
+        job.pcm_path = None
+        return True
+
+    transcription = asyncio.ensure_future(
+        run_in_worker(transcribe_prepared, job.pcm_path, job.language, job.job_id, job.model, job.cancel)
+    )
+
+    # Preview long audio, but only with a worker to spare beside the
+    # full transcription; under load the preview would only slow it
+    wants_preview = PREVIEW_SECONDS > 0 and job.duration >= PREVIEW_MIN_DURATION and not job.remuxed
+    if wants_preview and idle_workers() >= 2:
+        await _post_preview(bot, job, transcription)
+    elif wants_preview:
+        metrics.inc("transcription_previews_skipped_total")
+
+    # The backend stops at the deadline itself, with what it has so far
+    try:
+        job.text = await _guarded(job, transcription, enforce_deadline=False)
+    except DeadlineExceeded as e:
+        _cut_short(job, e)
+        job.text = e.text.strip()
+    job.transcription_time = time.monotonic() - start
+
+    if not job.partial:
+        estimator.observe(job.duration, job.transcription_time)
+
+    release(job.pcm_path)
+    job.pcm_path = None
+    return True
+
+
+def _cut_short(job: TranscriptionJob, error: DeadlineExceeded) -> None:
+    """Accept the partial result of an inference deadline, unless it is empty."""
+    if not error.text.strip():
+        raise error
+    job.partial = True
+    metrics.inc("transcription_partial_total")
+    logger.warning(f"Job {job.job_id} ran out of time in inference, delivering the partial text")
+
+
+async def deliver(bot: Bot, job: TranscriptionJob) -> bool:
+    """Save the transcript and reply with it, a summary or a summarize button."""
+    await _start(bot, job, "deliver", 0)
+    text = job.text
+
+    async def edit(message_text: str, **kwargs) -> None:
+        await bot.edit_message_text(
+            chat_id=job.chat_id,
+            message_id=job.processing_message_id,
+            text=message_text,
+            **kwargs
+        )
+
+    if job.parts:
+        return await _deliver_parts(bot, job, edit)
+
+    if not text:
+        log_transcription(job.user_id, job.username, job.filename, job.duration, job.language, "error: no speech")
+        await edit(t("commands.transcription.no_speech", job.language))
+        return True
+
+    # Save to database
+    try:
+        await asyncio.to_thread(
+            save_transcription,
+            user_id=job.user_id,
+            text=text,
+            language=job.language,
+            duration_seconds=job.duration,
+            audio_type=job.audio_type,
+            quota_seconds=job.quota_seconds
+        )
+    except Exception as e:
+        logger.error(f"Failed to save to database: {e}")
+
+    # Log success
+    log_transcription(job.user_id, job.username, job.filename, job.duration, job.language, "success")
+    log_api_call("whisper", "transcribe", "success", job.transcription_time)
+
+    # Say so when the inference deadline cut the transcript short
+    if job.partial:
+        text = t("commands.transcription.partial", job.language, text=text)
+
+    # Handle summarization based on duration
+    if job.duration >= 180:  # 3+ minutes - auto summarize
+        # Keeps the cancel button, which now skips the summary
+        await edit(
+            t("commands.transcription.generating_summary", job.language),
+            reply_markup=_cancel_markup(job),
+            rate_limit_args=PRIORITY_PROGRESS,
+        )
+
+        # Store transcript temporarily with unique ID
+        transcript_id = str(uuid.uuid4())[:8]
+        temp_transcripts[transcript_id] = {
+            "text": text,
+            "language": job.language
+        }
+
+        # Add button for full transcript
+        keyboard = [[InlineKeyboardButton(
+            t("commands.transcription.full_transcript_button", job.language),
+            callback_data=f"transcript_full_{transcript_id}"
+        )]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+
+        # The summarizer calls a blocking API, aborted if the job is cancelled.
+        # The transcript is saved by now, so a cancel only drops the summary.
+        try:
+            summary = await _guarded(job, asyncio.to_thread(
+                summarize_text, job.text, job.language, SUMMARIZE_DEADLINE_SECONDS or None, job.cancel
+            ))
+        except (JobCancelled, DeadlineExceeded):
+            logger.info(f"Job {job.job_id or job.cancel_key} skipped its summary")
+            metrics.inc("transcription_summaries_skipped_total")
+            # The full transcript button has all of it
+            await edit(text[:TELEGRAM_MESSAGE_LIMIT], reply_markup=reply_markup)
+            return True
+
+        if summary:
+            message = f"📝 **Summary:**\n\n{summary}"
+            await edit(message, reply_markup=reply_markup, parse_mode='Markdown')
+        else:
+            # If summary fails, offer full transcript
+            await edit(t("commands.transcription.no_speech", job.language), reply_markup=reply_markup)
+
+    elif job.duration >= 60:  # 1-3 minutes - offer summarize button
+        # Store transcript temporarily
+        transcript_id = str(uuid.uuid4())[:8]
+        temp_transcripts[transcript_id] = {
+            "text": text,
+            "language": job.language
+        }
+
+        keyboard = [[InlineKeyboardButton(
+            t("commands.transcription.summarize_button", job.language),
+            callback_data=f"summarize_short_{transcript_id}"
+        )]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        await edit(text, reply_markup=reply_markup)
+
+    else:  # Less than 1 minute - just transcript
+        await edit(text)
+
+    return True
+
+
+async def _deliver_parts(bot: Bot, job: TranscriptionJob, edit) -> bool:
+    """Reply to every note of a burst with its own transcript."""
+    items = [
+        {
+            "text": part["text"],
+            "language": job.language,
+            "duration_seconds": part["duration"],
+            "audio_type": job.audio_type,
+            "quota_seconds": part.get("quota_seconds"),
+        }
+        for part in job.parts if part.get("text")
+    ]
+
+    # Save to database, one transaction for the whole burst
+    if items:
+        try:
+            await asyncio.to_thread(save_transcriptions, job.user_id, items)
+        except Exception as e:
+            logger.error(f"Failed to save to database: {e}")
+
+    log_transcription(job.user_id, job.username, job.filename, job.duration, job.language,
+                      f"success ({len(job.parts)} notes)" if items else "error: no speech")
+    log_api_call("whisper", "transcribe", "success", job.transcription_time)
+
+    # The processing message answers the first note, the others get replies
+    for index, part in enumerate(job.parts):
+        text = part.get("text") or t("commands.transcription.no_speech", job.language)
+        if job.partial:
+            text = t("commands.transcription.partial", job.language, text=text)
+        if index == 0:
+            await edit(text)
+        else:
+            await bot.send_message(chat_id=job.chat_id, text=text, reply_to_message_id=part["message_id"])
+
+    return True
+
+
+async def handle_failure(bot: Bot, job: TranscriptionJob, error: Exception) -> None:
+    """Keep the job's audio for a retry and offer a retry button."""
+    if isinstance(error, JobCancelled):
+        await _cancelled(bot, job)
+        return
+    if isinstance(error, DeadlineExceeded):
+        metrics.inc("stage_deadline_exceeded_total", stage=error.stage)
+
+    logger.error(f"Transcription error: {error}")
+    log_transcription(job.user_id, job.username, job.filename, job.duration, job.language, "error")
+
+    # Store file for retry
+    retry_id = str(uuid.uuid4())[:8]
+    retry_data = {
+        "chat_id": job.chat_id,
+        "user_id": job.user_id,
+        "message_id": job.message_id,
+        "file_id": job.file_id,
+        "file_unique_id": job.file_unique_id,
+        "stage": job.stage,
+        "job_id": job.job_id,
+        "model": job.model,
+        "duration": job.duration,
+        "quota_seconds": job.quota_seconds,
+        "audio_type": job.audio_type,
+        "remuxed": job.remuxed,
+        "parts": job.parts
+    }
+
+    # If preprocessing already finished, keep the PCM so the retry
+    # resumes at inference; the original file is no longer needed
+    if job.stage == "transcribe" and job.pcm_path and os.path.exists(job.pcm_path):
+        retry_data["pcm_path"] = spool_file(job.pcm_path, retry_id)
+    else:
+        release(job.pcm_path)
+
+    if retry_data.get("pcm_path") or job.parts:
+        # Notes of a burst are downloaded again unless the joined PCM is kept
+        _release_source(job)
+    elif job.tmp_path and os.path.exists(job.tmp_path):
+        # Only add tmp_path if it exists
+        retry_data["stage"] = "prepare"
+        retry_data["tmp_path"] = job.tmp_path
+        retry_data["local_file"] = job.local_file
+
+    failed_transcriptions[retry_id] = retry_data
+
+    keyboard = [[InlineKeyboardButton(
+        t("commands.transcription.retry_button", job.language),
+        callback_data=f"retry_{retry_id}"
+    )]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    error_msg = t("commands.transcription.error", job.language, error=str(error))
+
+    if job.processing_message_id is not None:
+        await bot.edit_message_text(
+            chat_id=job.chat_id,
+            message_id=job.processing_message_id,
+            text=error_msg,
+            reply_markup=reply_markup
+        )
+    else:
+        await bot.send_message(
+            chat_id=job.chat_id,
+            text=error_msg,
+            reply_markup=reply_markup,
+            reply_to_message_id=job.message_id
+        )
+
+
+async def _cancelled(bot: Bot, job: TranscriptionJob) -> None:
+    """Drop a cancelled job's files and say it was cancelled."""
+    logger.info(f"Job {job.job_id or job.cancel_key} cancelled in {job.stage}")
+    metrics.inc("jobs_cancelled_total", stage=job.stage)
+    log_transcription(job.user_id, job.username, job.filename, job.duration, job.language, "cancelled")
+
+    release(job.pcm_path)
+    job.pcm_path = None
+    _release_source(job)
+
+    text = t("commands.transcription.cancelled", job.language)
+    if job.processing_message_id is not None:
+        await bot.edit_message_text(chat_id=job.chat_id, message_id=job.processing_message_id, text=text)
+    else:
+        await bot.send_message(chat_id=job.chat_id, text=text, reply_to_message_id=job.message_id)
+
+
+async def _post_preview(bot: Bot, job: TranscriptionJob, transcription: asyncio.Future) -> None:
+    """
+    Show a quick preview of the audio's start until the full result is ready.
+
+    Args:
+        bot: Bot used to edit the processing message
+        job: Job being transcribed
+        transcription: Future of the full transcription
+    """
+    # Stops the preview's inference once the full result makes it moot
+    stop = CancelToken()
+
+    async def preview() -> str | None:
+        try:
+            return await run_in_worker(transcribe_preview, job.pcm_path, job.language, stop)
+        except JobCancelled:
+            return None
+        except Exception as e:
+            logger.warning(f"Preview failed: {e}")
+            return None
+
+    preview_task = asyncio.ensure_future(preview())
+    await asyncio.wait({preview_task, transcription}, return_when=asyncio.FIRST_COMPLETED)
+
+    # Never overwrite the full result with the preview, nor keep a worker on it
+    if transcription.done() or not preview_task.done():
+        stop.cancel()
+        metrics.inc("transcription_previews_cancelled_total")
+        return
+
+    text = preview_task.result()
+    if text:
+        metrics.inc("transcription_previews_total")
+        try:
+            await bot.edit_message_text(
+                chat_id=job.chat_id,
+                message_id=job.processing_message_id,
+                text=t("commands.transcription.preview", job.language, seconds=PREVIEW_SECONDS, text=text),
+                reply_markup=_cancel_markup(job),
+                rate_limit_args=PRIORITY_PROGRESS
+            )
+        except Exception as e:
+            logger.warning(f"Failed to post preview: {e}")
+
+
+# Pipeline of the running bot
+_pipeline: Pipeline | None = None
+
+
+def build_pipeline(bot: Bot, on_finish=None) -> Pipeline:
+    """Create the transcription pipeline, sizing CPU stages like their pools."""
+    async def finish(job: TranscriptionJob) -> None:
+        # Its cancel button has nothing left to stop
+        if _cancellable.get(job.cancel_key) is job:
+            del _cancellable[job.cancel_key]
+        estimator.finish(job)
+        if on_finish is not None:
+            await on_finish(job)
+
+    return Pipeline(
+        [
+            Stage("download", lambda job: download(bot, job), DOWNLOAD_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+            Stage("prepare", lambda job: prepare(bot, job), budget_plan["decode_workers"], PIPELINE_QUEUE_SIZE),
+            Stage("transcribe", lambda job: transcribe(bot, job), budget_plan["inference_workers"], PIPELINE_QUEUE_SIZE),
+            Stage("deliver", lambda job: deliver(bot, job), DELIVER_CONCURRENCY, PIPELINE_QUEUE_SIZE),
+        ],
+        on_error=lambda job, error: handle_failure(bot, job, error),
+        on_finish=finish,
+        # Shortest job first, with aging
+        priority=estimator.priority,
+    )
+
+
+def start_pipeline(bot: Bot, on_finish=None) -> Pipeline:
+    """Build and start the pipeline of the running bot (or worker)."""
+    global _pipeline
+    _pipeline = build_pipeline(bot, on_finish)
+    _pipeline.start()
+    return _pipeline
+
+
+def get_pipeline() -> Pipeline:
+    """Return the running pipeline."""
+    if _pipeline is None:
+        raise RuntimeError("Transcription pipeline is not running")
+    return _pipeline
@@ -0,0 +1,173 @@
+"""Worker loop: claim jobs from the durable queue and run them in the pipeline."""
+
+import asyncio
+import logging
+import os
+import socket
+
+from telegram import Bot
+
+from ..db import (
+    claim_job, complete_job, fail_abandoned_jobs, get_cancel_requests, get_queue_depth, release_job, renew_leases,
+    report_worker
+)
+from ..utils import metrics
+from ..utils.cancel import JobCancelled
+from ..utils.governor import budget_plan
+from .admission import SJF_AGING_WEIGHT, estimator
+from .job import TranscriptionJob
+from .stages import handle_failure, start_pipeline
+
+logger = logging.getLogger(__name__)
+
+# A claimed job returns to the queue if its worker stops renewing the lease
+WORKER_LEASE_SECONDS = int(os.getenv("WORKER_LEASE_SECONDS", "120"))
+
+# Seconds between queue polls while it is empty
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+
+# Claims of a job (i.e. workers dying on it) before it is given up on
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+def default_worker_id() -> str:
+    """Identify this process in leases: host name and PID."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Worker:
+    """
+    Feed jobs leased from the durable queue into a local pipeline.
+
+    Jobs are only claimed while the pipeline has room for them, so idle
+    workers pick up the queue's jobs and busy ones leave them alone. Every
+    held lease is renewed until the job leaves the pipeline, then the job
+    is removed from the queue. A worker that dies stops renewing, and its
+    jobs are claimed again by the others. Cancel buttons pressed on the
+    frontend reach the worker through the queue row.
+
+    Along with its leases, the worker reports its capacity and measured
+    real-time factor, from which the frontend estimates the backlog.
+    Shorter jobs are claimed first, with aging. Jobs given up on after
+    their workers died are reported to their users by whichever worker
+    notices, with a retry button.
+    """
+
+    def __init__(self, bot: Bot, worker_id: str | None = None):
+        """
+        Args:
+            bot: Bot used to download files and post results
+            worker_id: Name of this worker in leases
+        """
+        self.bot = bot
+        self.worker_id = worker_id or default_worker_id()
+        self.leases: dict[int, TranscriptionJob] = {}
+        self.pipeline = None
+
+    async def run(self) -> None:
+        """Claim and process jobs until cancelled."""
+        self.pipeline = start_pipeline(self.bot, on_finish=self._finish)
+        background = [
+            asyncio.create_task(self._renew_leases()),
+            asyncio.create_task(self._watch_cancellations()),
+        ]
+        logger.info(f"Worker {self.worker_id} waiting for jobs")
+        try:
+            while True:
+                if not await self._claim_next():
+                    await asyncio.sleep(WORKER_POLL_INTERVAL)
+        finally:
+            for task in background:
+                task.cancel()
+            await self.pipeline.stop()
+            # Whatever was still in flight goes back to the queue
+            for queue_id in list(self.leases):
+                await asyncio.to_thread(release_job, queue_id, self.worker_id)
+            self.leases.clear()
+
+    async def _claim_next(self) -> bool:
+        """Claim one job if the pipeline has room; False if none was run."""
+        if not self.pipeline.has_room():
+            return False
+
+        claimed = await asyncio.to_thread(
+            claim_job, self.worker_id, WORKER_LEASE_SECONDS, JOB_MAX_ATTEMPTS, SJF_AGING_WEIGHT * estimator.rtf
+        )
+        if claimed is None:
+            metrics.set_gauge("job_queue_depth", 0)
+            return False
+
+        queue_id, payload = claimed
+        job = TranscriptionJob.from_payload(payload)
+        job.queue_id = queue_id
+
+        if not self.pipeline.submit(job, job.resume_stage()):
+            # The job's stage is full even though downloads have room
+            await asyncio.to_thread(release_job, queue_id, self.worker_id)
+            return False
+
+        self.leases[queue_id] = job
+        estimator.add(job)
+        metrics.inc("job_queue_claimed_total")
+        metrics.set_gauge("job_queue_depth", await asyncio.to_thread(get_queue_depth))
+        return True
+
+    async def _finish(self, job: TranscriptionJob) -> None:
+        """Remove a job from the queue once it has left the pipeline."""
+        if job.queue_id is None:
+            return
+        self.leases.pop(job.queue_id, None)
+        await asyncio.to_thread(complete_job, job.queue_id, self.worker_id)
+
+    async def _watch_cancellations(self) -> None:
+        """Cancel the jobs in flight whose users pressed cancel."""
+        while True:
+            await asyncio.sleep(WORKER_POLL_INTERVAL)
+            if not self.leases:
+                continue
+            try:
+                cancelled = await asyncio.to_thread(get_cancel_requests, self.worker_id)
+            except Exception as e:
+                logger.error(f"Failed to check cancellations: {e}")
+                continue
+            for queue_id in cancelled:
+                job = self.leases.get(queue_id)
+                if job is not None and not job.cancel.cancelled:
+                    job.cancel.cancel()
+
+    async def _renew_leases(self) -> None:
+        """Keep the leases of jobs in flight from running out, and report in."""
+        while True:
+            try:
+                await asyncio.to_thread(
+                    report_worker,
+                    self.worker_id,
+                    budget_plan["inference_workers"],
+                    estimator.rtf if estimator.measured else None,
+                    WORKER_LEASE_SECONDS,
+                )
+                await asyncio.to_thread(renew_leases, self.worker_id, list(self.leases), WORKER_LEASE_SECONDS)
+            except Exception as e:
+                logger.error(f"Failed to renew leases: {e}")
+            await self._fail_abandoned()
+            await asyncio.sleep(WORKER_LEASE_SECONDS / 3)
+
+    async def _fail_abandoned(self) -> None:
+        """Tell the users of jobs given up on that they failed, or were cancelled."""
+        try:
+            abandoned = await asyncio.to_thread(fail_abandoned_jobs, JOB_MAX_ATTEMPTS)
+        except Exception as e:
+            logger.error(f"Failed to check abandoned jobs: {e}")
+            return
+
+        for payload, cancelled in abandoned:
+            job = TranscriptionJob.from_payload(payload)
+            metrics.inc("job_queue_abandoned_total")
+            if cancelled:
+                error = JobCancelled()
+            else:
+                error = RuntimeError(f"workers stopped {JOB_MAX_ATTEMPTS} times while running it")
+            try:
+                await handle_failure(self.bot, job, error)
+            except Exception as e:
+                logger.error(f"Failed to report abandoned job {job.job_id}: {e}")
@@ -1,11 +1,46 @@
 """Transcription engines."""
 
-from .transcriber import transcribe_audio
-from .transcriber_local import transcribe_audio as transcribe_local
-from .transcriber_openai import transcribe_audio as transcribe_openai
+from .transcriber import (
+    transcribe_audio,
+    prepare_audio,
+    decode_audio,
+    extract_audio,
+    denoise_audio,
+    transcribe_prepared,
+    transcribe_segments,
+    transcribe_preview,
+    get_backend,
+    warm_up,
+    unload_idle_models,
+    select_model,
+    available_models,
+)
 
 __all__ = [
     "transcribe_audio",
+    "prepare_audio",
+    "decode_audio",
+    "extract_audio",
+    "denoise_audio",
+    "transcribe_prepared",
+    "transcribe_segments",
+    "transcribe_preview",
+    "get_backend",
+    "warm_up",
+    "unload_idle_models",
+    "select_model",
+    "available_models",
     "transcribe_local",
     "transcribe_openai"
 ]
+
+
+def __getattr__(name):
+    # Backends pull in heavy dependencies, only import the one asked for
+    if name == "transcribe_local":
+        from .transcriber_local import transcribe_audio
+        return transcribe_audio
+    if name == "transcribe_openai":
+        from .transcriber_openai import transcribe_audio
+        return transcribe_audio
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,123 @@
+"""Audio decoding shared by all transcription backends."""
+
+import os
+import tempfile
+
+import av
+
+from ..utils.cancel import CancelToken, check
+
+# Container written for each audio codec that can be passed through as is
+REMUX_FORMATS = {
+    'aac': ('.m4a', 'ipod'),
+}
+
+
+def convert_to_wav(input_path: str, cancel: CancelToken | None = None) -> str:
+    """
+    Convert audio file to WAV format using PyAV.
+
+    Args:
+        input_path: Path to the input audio file
+        cancel: Token checked between packets
+
+    Returns:
+        Path to the converted WAV file
+    """
+    output_path = tempfile.mktemp(suffix=".wav")
+
+    try:
+        _decode_to_wav(input_path, output_path, cancel)
+    except BaseException:
+        # Cancelled, out of time or undecodable: nobody will read the rest
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise
+
+    return output_path
+
+
+def _decode_to_wav(input_path: str, output_path: str, cancel: CancelToken | None = None) -> None:
+    """Decode the first audio stream of a file into a 16 kHz mono WAV file."""
+    # A path lets libavformat read the file natively, without Python I/O
+    input_container = av.open(input_path)
+    output_container = av.open(output_path, mode='w')
+
+    # Get audio stream
+    input_stream = input_container.streams.audio[0]
+
+    # Create output stream (16kHz mono WAV - optimal for Whisper)
+    output_stream = output_container.add_stream('pcm_s16le', rate=16000)
+    output_stream.layout = 'mono'
+
+    # Create resampler
+    resampler = av.AudioResampler(
+        format='s16',
+        layout='mono',
+        rate=16000,
+    )
+
+    # Demuxing only the audio stream makes the demuxer discard every other
+    # stream (e.g. the video of a video note) without reading it into packets
+    for packet in input_container.demux(input_stream):
+        check(cancel)
+        for frame in packet.decode():
+            # Resample frame
+            resampled_frames = resampler.resample(frame)
+            for resampled_frame in resampled_frames:
+                for packet_out in output_stream.encode(resampled_frame):
+                    output_container.mux(packet_out)
+
+    # Flush encoder
+    for packet in output_stream.encode():
+        output_container.mux(packet)
+
+    output_container.close()
+    input_container.close()
+
+
+def remux_audio(input_path: str, codecs: set[str]) -> str | None:
+    """
+    Copy the audio track of a file into an audio-only container.
+
+    The packets are copied without decoding or re-encoding, so this costs
+    little more than reading the audio track once.
+
+    Args:
+        input_path: Path to the input file (e.g. an MP4 video note)
+        codecs: Audio codecs the caller accepts as is (e.g. {'aac'})
+
+    Returns:
+        Path to the audio-only file, or None if the audio codec is not
+        one of codecs (decode it with convert_to_wav instead)
+    """
+    input_container = av.open(input_path)
+    try:
+        if not input_container.streams.audio:
+            return None
+        input_stream = input_container.streams.audio[0]
+        codec = input_stream.codec_context.name
+        if codec not in codecs or codec not in REMUX_FORMATS:
+            return None
+
+        suffix, container_format = REMUX_FORMATS[codec]
+        output_path = tempfile.mktemp(suffix=suffix)
+        output_container = av.open(output_path, mode='w', format=container_format)
+        try:
+            # add_stream_from_template replaced add_stream(template=) in PyAV 14
+            if hasattr(output_container, 'add_stream_from_template'):
+                output_stream = output_container.add_stream_from_template(input_stream)
+            else:
+                output_stream = output_container.add_stream(template=input_stream)
+
+            for packet in input_container.demux(input_stream):
+                # The demuxer ends with an empty flush packet
+                if packet.dts is None:
+                    continue
+                packet.stream = output_stream
+                output_container.mux(packet)
+        finally:
+            output_container.close()
+        return output_path
+    finally:
+        input_container.close()
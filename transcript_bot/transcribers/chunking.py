@@ -0,0 +1,220 @@
+"""Chunked transcription with per-chunk checkpoints for long audio."""
+
+import array
+import logging
+import os
+import sys
+import tempfile
+import wave
+from typing import Callable
+
+from ..db import save_chunk, get_chunks, delete_chunks
+from ..utils.cancel import CancelToken, DeadlineExceeded, check
+
+logger = logging.getLogger(__name__)
+
+# Audio at least this long (seconds) is transcribed in checkpointed chunks
+CHUNKING_MIN_DURATION = int(os.getenv("CHUNKING_MIN_DURATION", "300"))
+
+# Target chunk length (seconds)
+CHUNK_SECONDS = int(os.getenv("CHUNK_SECONDS", "120"))
+
+# Chunk boundaries are moved to the quietest point within this window
+# before the target, so words are not cut in half
+BOUNDARY_SEARCH_SECONDS = 2.0
+BOUNDARY_STEP_SECONDS = 0.02
+
+
+def get_wav_duration(wav_path: str) -> float:
+    """Return the duration of a WAV file in seconds."""
+    with wave.open(wav_path, "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def _quietest_frame(wav: wave.Wave_read, start: int, end: int) -> int:
+    """Return the frame in [start, end) with the lowest short-term energy."""
+    rate = wav.getframerate()
+    step = max(1, int(rate * BOUNDARY_STEP_SECONDS))
+
+    wav.setpos(start)
+    samples = array.array("h", wav.readframes(end - start))
+    if sys.byteorder == "big":
+        samples.byteswap()
+
+    best_offset, best_energy = len(samples), None
+    for offset in range(0, len(samples) - step + 1, step):
+        energy = sum(abs(sample) for sample in samples[offset:offset + step])
+        if best_energy is None or energy < best_energy:
+            best_offset, best_energy = offset + step // 2, energy
+
+    return start + best_offset
+
+
+def _next_boundary(wav: wave.Wave_read, start: int) -> int:
+    """Pick the end frame of the chunk starting at start."""
+    rate = wav.getframerate()
+    total = wav.getnframes()
+    target = start + CHUNK_SECONDS * rate
+
+    # Avoid leaving a tiny tail chunk at the end
+    if target + int(BOUNDARY_SEARCH_SECONDS * rate) >= total:
+        return total
+
+    return _quietest_frame(wav, target - int(BOUNDARY_SEARCH_SECONDS * rate), target)
+
+
+def _write_chunk(wav: wave.Wave_read, start: int, end: int) -> str:
+    """Copy frames [start, end) into a temporary WAV file."""
+    chunk_path = tempfile.mktemp(suffix="_chunk.wav")
+    wav.setpos(start)
+    with wave.open(chunk_path, "wb") as chunk:
+        chunk.setnchannels(wav.getnchannels())
+        chunk.setsampwidth(wav.getsampwidth())
+        chunk.setframerate(wav.getframerate())
+        chunk.writeframes(wav.readframes(end - start))
+    return chunk_path
+
+
+def write_head(wav_path: str, seconds: float) -> str:
+    """Copy the first seconds of a WAV file into a temporary WAV file."""
+    with wave.open(wav_path, "rb") as wav:
+        end = min(wav.getnframes(), int(seconds * wav.getframerate()))
+        return _write_chunk(wav, 0, end)
+
+
+def concatenate_wavs(wav_paths: list[str], gap_seconds: float) -> tuple[str, list[tuple[float, float]]]:
+    """
+    Join WAV files of the same format with silence between them.
+
+    The silence keeps Whisper segments from running across two inputs, so
+    the text of each input can be told apart again by timestamp.
+
+    Args:
+        wav_paths: WAV files, in order
+        gap_seconds: Silence inserted between two files
+
+    Returns:
+        Path to the joined WAV file, and the (start, end) seconds of each
+        input within it
+    """
+    output_path = tempfile.mktemp(suffix="_joined.wav")
+    spans = []
+    position = 0
+
+    with wave.open(output_path, "wb") as output:
+        for index, path in enumerate(wav_paths):
+            with wave.open(path, "rb") as wav:
+                if index == 0:
+                    output.setnchannels(wav.getnchannels())
+                    output.setsampwidth(wav.getsampwidth())
+                    output.setframerate(wav.getframerate())
+                    rate = wav.getframerate()
+                    gap = b"\0" * (int(gap_seconds * rate) * wav.getsampwidth() * wav.getnchannels())
+                else:
+                    output.writeframes(gap)
+                    position += int(gap_seconds * rate)
+
+                frames = wav.getnframes()
+                output.writeframes(wav.readframes(frames))
+                spans.append((position / rate, (position + frames) / rate))
+                position += frames
+
+    return output_path, spans
+
+
+def split_segments(segments: list[dict], spans: list[tuple[float, float]]) -> list[str]:
+    """
+    Split the segments of joined audio back into the text of each input.
+
+    Args:
+        segments: Timestamped segments of the output of concatenate_wavs
+        spans: Spans returned by concatenate_wavs
+
+    Returns:
+        Text of each input, in order
+    """
+    texts = [[] for _ in spans]
+    for segment in segments:
+        middle = (segment["start"] + segment["end"]) / 2
+        # The input whose span (or the gap after it) holds the middle
+        index = 0
+        for candidate, (start, _) in enumerate(spans):
+            if middle >= start:
+                index = candidate
+        texts[index].append(segment["text"])
+    return ["".join(parts).strip() for parts in texts]
+
+
+def transcribe_checkpointed(
+    wav_path: str,
+    language: str | None,
+    job_id: str,
+    transcribe_segments: Callable[[str, str | None], list[dict]],
+    cancel: CancelToken | None = None,
+) -> str:
+    """
+    Transcribe long audio chunk by chunk, checkpointing each finished chunk.
+
+    Chunks already stored for job_id are skipped, so a retry (or a re-sent
+    file after a restart) only transcribes what is left.
+
+    Args:
+        wav_path: Path to a prepared 16 kHz mono WAV file
+        language: Language code (e.g., 'es')
+        job_id: Stable identifier of the job (same file, same language)
+        transcribe_segments: Backend function returning timestamped segments
+        cancel: Token checked between chunks (the backend checks within)
+
+    Returns:
+        Transcribed text
+
+    Raises:
+        JobCancelled: If the job was cancelled
+        DeadlineExceeded: If the stage ran out of time, with the text of
+            every chunk finished until then (their checkpoints are kept)
+    """
+    done = {chunk["chunk_index"]: chunk for chunk in get_chunks(job_id)}
+    if done:
+        logger.info(f"Resuming {job_id}: {len(done)} chunks already transcribed")
+
+    texts = []
+    with wave.open(wav_path, "rb") as wav:
+        rate = wav.getframerate()
+        total = wav.getnframes()
+        start = 0
+        index = 0
+
+        while start < total:
+            if index in done:
+                # Reuse the stored boundary so resumed chunks line up exactly
+                chunk = done[index]
+                texts.append(chunk["text"])
+                start = int(round(chunk["end_seconds"] * rate))
+                index += 1
+                continue
+
+            check(cancel, text="".join(texts))
+            end = _next_boundary(wav, start)
+            chunk_path = _write_chunk(wav, start, end)
+            try:
+                segments = transcribe_segments(chunk_path, language)
+            except DeadlineExceeded as e:
+                e.text = "".join(texts) + e.text
+                raise
+            finally:
+                os.unlink(chunk_path)
+
+            offset = start / rate
+            for segment in segments:
+                segment["start"] += offset
+                segment["end"] += offset
+
+            text = "".join(segment["text"] for segment in segments)
+            save_chunk(job_id, index, offset, end / rate, text, segments)
+            texts.append(text)
+
+            start = end
+            index += 1
+
+    delete_chunks(job_id)
+    return "".join(texts).strip()
@@ -0,0 +1,144 @@
+"""Load, share and unload Whisper models according to their use."""
+
+import gc
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Models unused for this long (seconds) are unloaded; 0 keeps them loaded
+WHISPER_IDLE_UNLOAD_SECONDS = int(os.getenv("WHISPER_IDLE_UNLOAD_SECONDS", "0"))
+
+# Optional small model that is never unloaded (e.g. "tiny")
+WHISPER_RESIDENT_MODEL = os.getenv("WHISPER_RESIDENT_MODEL", "")
+
+
+def get_resident_memory() -> int:
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but better than nothing off Linux
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelManager:
+    """
+    Keep models loaded while they are used and unload them when idle.
+
+    Models are loaded on first acquire (concurrent callers wait for the same
+    load), counted while in use and unloaded by unload_idle() once nobody
+    has used them for idle_seconds. The resident model is never unloaded.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Any],
+        idle_seconds: int = WHISPER_IDLE_UNLOAD_SECONDS,
+        resident: str = WHISPER_RESIDENT_MODEL,
+    ):
+        """
+        Args:
+            loader: Function building a model from its name
+            idle_seconds: Idle time before unloading, 0 to never unload
+            resident: Model name that stays loaded regardless of use
+        """
+        self.loader = loader
+        self.idle_seconds = idle_seconds
+        self.resident = resident
+        self._models: dict[str, Any] = {}
+        self._in_use: dict[str, int] = {}
+        self._last_used: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    def get(self, name: str) -> Any:
+        """Return the model, loading it if needed (without tracking use)."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Other models stay usable while this one loads
+        with load_lock:
+            model = self._models.get(name)
+            if model is None:
+                start = time.perf_counter()
+                model = self.loader(name)
+                elapsed = time.perf_counter() - start
+
+                with self._lock:
+                    self._models[name] = model
+                    self._last_used[name] = time.monotonic()
+
+                logger.info(f"Loaded Whisper model {name} in {elapsed:.1f}s")
+                metrics.inc("whisper_model_loads_total", model=name)
+                metrics.set_gauge("whisper_model_load_seconds", elapsed, model=name)
+                metrics.set_gauge("whisper_model_loaded", 1, model=name)
+                self._update_memory()
+        return model
+
+    @contextmanager
+    def acquire(self, name: str) -> Iterator[Any]:
+        """Use a model for the duration of the block."""
+        # Counted before the lookup, so unload_idle cannot drop it in between
+        with self._lock:
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                self._last_used[name] = time.monotonic()
+
+    def loaded(self) -> list[str]:
+        """Return the names of the models currently loaded."""
+        with self._lock:
+            return list(self._models)
+
+    def unload_idle(self, now: float | None = None) -> list[str]:
+        """
+        Unload models that have been idle longer than idle_seconds.
+
+        Args:
+            now: Current time.monotonic() value (defaults to now)
+
+        Returns:
+            Names of the unloaded models
+        """
+        if self.idle_seconds <= 0:
+            return []
+        now = time.monotonic() if now is None else now
+
+        unloaded = []
+        with self._lock:
+            for name in list(self._models):
+                if name == self.resident or self._in_use.get(name, 0):
+                    continue
+                if now - self._last_used.get(name, now) < self.idle_seconds:
+                    continue
+                del self._models[name]
+                unloaded.append(name)
+
+        if unloaded:
+            # Drop the last references so the weights are actually freed
+            gc.collect()
+            for name in unloaded:
+                logger.info(f"Unloaded idle Whisper model {name}")
+                metrics.inc("whisper_model_unloads_total", model=name)
+                metrics.set_gauge("whisper_model_loaded", 0, model=name)
+        self._update_memory()
+        return unloaded
+
+    def _update_memory(self) -> None:
+        metrics.set_gauge("process_resident_memory_bytes", get_resident_memory())
@@ -0,0 +1,94 @@
+"""Named decoding profiles for the local backend, optionally autotuned."""
+
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Built-in profiles. compute_type None uses the device default, cpu_threads
+# 0 lets CTranslate2 decide.
+PROFILES = {
+    "fast": {"beam_size": 1, "compute_type": None, "cpu_threads": 0, "num_workers": 1},
+    "balanced": {"beam_size": 3, "compute_type": None, "cpu_threads": 0, "num_workers": 1},
+    "accurate": {"beam_size": 5, "compute_type": None, "cpu_threads": 0, "num_workers": 1},
+}
+
+# Profile used by the bot
+WHISPER_PROFILE = os.getenv("WHISPER_PROFILE", "accurate")
+
+# Output of `run.py tune`; its settings override the profile's
+WHISPER_TUNE_FILE = Path(os.getenv("WHISPER_TUNE_FILE", "whisper_tune.json"))
+
+
+def default_compute_type(device: str) -> str:
+    """Return the compute type used when a profile does not set one."""
+    return "float16" if device == "cuda" else "int8"
+
+
+def load_profile(
+    name: str = WHISPER_PROFILE,
+    tune_file: Path = WHISPER_TUNE_FILE,
+    model: str | None = None,
+    device: str | None = None,
+) -> dict:
+    """
+    Resolve a decoding profile, applying autotuned settings if available.
+
+    Tuned settings are only applied to the model and device they were
+    measured on; other models of the pool keep the built-in profile.
+
+    Args:
+        name: Profile name (fast, balanced or accurate)
+        tune_file: JSON file written by the tune command
+        model: Model size being loaded, None for the profile alone
+        device: Device the model is loaded on
+
+    Returns:
+        Dict with beam_size, compute_type, cpu_threads and num_workers
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown WHISPER_PROFILE {name!r}, expected one of {', '.join(PROFILES)}")
+
+    profile = dict(PROFILES[name])
+    if model is None or not tune_file.exists():
+        return profile
+
+    try:
+        tuning = json.loads(tune_file.read_text())
+        tuned = tuning["profiles"].get(name)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Ignoring unreadable tuning file {tune_file}: {e}")
+        return profile
+
+    if (tuning.get("model"), tuning.get("device")) != (model, device):
+        logger.warning(
+            f"{tune_file} was tuned for {tuning.get('model')} on {tuning.get('device')}, "
+            f"not applied to {model} on {device}"
+        )
+        return profile
+    if tuned:
+        profile.update({key: tuned[key] for key in profile if key in tuned})
+        logger.info(f"Using tuned {name} profile from {tune_file} for {model}: {profile}")
+    return profile
+
+
+def save_tuning(path: Path, model: str, device: str, profiles: dict, results: list[dict]) -> None:
+    """
+    Write the tune command's choice per profile and its raw measurements.
+
+    Args:
+        path: Destination JSON file
+        model: Model size that was benchmarked
+        device: Device that was benchmarked
+        profiles: Best settings per profile name
+        results: Every measured configuration
+    """
+    path.write_text(json.dumps({
+        "model": model,
+        "device": device,
+        "cpu_count": os.cpu_count(),
+        "profiles": profiles,
+        "results": results,
+    }, indent=2))
@@ -0,0 +1,73 @@
+"""Pick a Whisper model per job from a pool of sizes."""
+
+import os
+
+# Pool of local models, smallest first, each with the longest audio it
+# takes by default: "tiny:15,base:300,small". The last entry takes the rest.
+WHISPER_POOL = os.getenv("WHISPER_POOL", "")
+
+# Every this many queued jobs, new jobs drop one model size
+WHISPER_DEGRADE_QUEUE_DEPTH = int(os.getenv("WHISPER_DEGRADE_QUEUE_DEPTH", "2"))
+
+
+def parse_pool(spec: str, default_model: str) -> list[tuple[str, float | None]]:
+    """
+    Parse a WHISPER_POOL value.
+
+    Args:
+        spec: Comma-separated "model[:max_seconds]" entries
+        default_model: Model used when spec is empty
+
+    Returns:
+        List of (model, max_seconds) pairs; max_seconds None means no limit
+    """
+    pool = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, limit = entry.partition(":")
+        pool.append((name.strip(), float(limit) if limit else None))
+
+    if not pool:
+        return [(default_model, None)]
+
+    # The last model catches everything longer than the other limits
+    name, _ = pool[-1]
+    pool[-1] = (name, None)
+    return pool
+
+
+def route_model(
+    pool: list[tuple[str, float | None]],
+    duration: float,
+    queue_depth: int = 0,
+    preferred: str | None = None,
+) -> str:
+    """
+    Choose the model for a job.
+
+    Duration picks the smallest model whose limit covers the audio, a user
+    preference for a pool model overrides that, and a backlog moves the
+    choice down one size per WHISPER_DEGRADE_QUEUE_DEPTH queued jobs.
+
+    Args:
+        pool: Output of parse_pool
+        duration: Audio duration in seconds
+        queue_depth: Jobs waiting for or running on the workers
+        preferred: Model chosen by the user, if any
+
+    Returns:
+        Model name
+    """
+    names = [name for name, _ in pool]
+
+    if preferred in names:
+        index = names.index(preferred)
+    else:
+        index = next(
+            (i for i, (_, limit) in enumerate(pool) if limit is None or duration <= limit),
+            len(pool) - 1,
+        )
+
+    if WHISPER_DEGRADE_QUEUE_DEPTH > 0:
+        index = max(0, index - queue_depth // WHISPER_DEGRADE_QUEUE_DEPTH)
+
+    return names[index]
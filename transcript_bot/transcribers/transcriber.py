@@ -1,16 +1,203 @@
 """Audio transcription module that switches between local and OpenAI based on environment."""
 
 import os
+from functools import partial
 
-# Determine which transcriber to use
-ENVIRONMENT = os.getenv("ENVIRONMENT", "development").lower()
+from .chunking import CHUNKING_MIN_DURATION, get_wav_duration, transcribe_checkpointed, write_head
+from ..utils.cancel import CancelToken
 
-if ENVIRONMENT == "production":
-    print("🚀 Using OpenAI Whisper API for transcription")
-    from .transcriber_openai import transcribe_audio as _transcribe_audio
-else:
-    print("🔧 Using local Whisper model for transcription")
-    from .transcriber_local import transcribe_audio as _transcribe_audio
+# Length of the audio head transcribed for a preview (seconds)
+PREVIEW_SECONDS = int(os.getenv("PREVIEW_SECONDS", "15"))
+
+# Backend module, imported on first use so importing the package stays cheap
+_backend = None
+
+
+def get_backend():
+    """Import and return the transcription backend for the current environment."""
+    global _backend
+    if _backend is None:
+        # Determine which transcriber to use
+        environment = os.getenv("ENVIRONMENT", "development").lower()
+
+        if environment == "production":
+            print("🚀 Using OpenAI Whisper API for transcription")
+            from . import transcriber_openai as backend
+        else:
+            print("🔧 Using local Whisper model for transcription")
+            from . import transcriber_local as backend
+
+        _backend = backend
+    return _backend
+
+
+def warm_up() -> None:
+    """Load the backend (and its model, if any) ahead of the first job."""
+    get_backend().warm_up()
+
+
+def unload_idle_models() -> list[str]:
+    """Unload backend models that have been idle too long."""
+    # Don't import the backend just to find nothing loaded
+    if _backend is None:
+        return []
+    return _backend.unload_idle()
+
+
+def select_model(duration: float, queue_depth: int = 0, preferred: str | None = None) -> str:
+    """
+    Choose the model for a job.
+
+    Args:
+        duration: Audio duration in seconds
+        queue_depth: Jobs waiting for or running on the workers
+        preferred: Model chosen by the user, if any
+
+    Returns:
+        Model name understood by the backend
+    """
+    return get_backend().select_model(duration, queue_depth, preferred)
+
+
+def available_models() -> list[str]:
+    """Return the models users can choose between (empty if there is no choice)."""
+    return get_backend().available_models()
+
+
+def decode_audio(audio_path: str, cancel: CancelToken | None = None) -> str:
+    """
+    Run the decode stage (any format to 16 kHz mono PCM WAV).
+
+    Args:
+        audio_path: Path to the audio file
+        cancel: Token checked between packets
+
+    Returns:
+        Path to the decoded WAV file (caller must delete it)
+    """
+    # PyAV is only needed once there is audio to decode
+    from .audio import convert_to_wav
+    return convert_to_wav(audio_path, cancel)
+
+
+def extract_audio(audio_path: str) -> str | None:
+    """
+    Remux the audio track of a video note if the backend takes its codec.
+
+    Args:
+        audio_path: Path to the video file
+
+    Returns:
+        Path to an audio-only file to transcribe as is (caller must delete
+        it), or None if the audio has to go through decode_audio
+    """
+    codecs = get_backend().PASSTHROUGH_CODECS
+    if not codecs:
+        return None
+
+    from .audio import remux_audio
+    return remux_audio(audio_path, codecs)
+
+
+def denoise_audio(wav_path: str) -> str:
+    """
+    Run the backend's denoise stage on a decoded WAV file.
+
+    Args:
+        wav_path: Path to the output of decode_audio (consumed)
+
+    Returns:
+        Path to the prepared WAV file (caller must delete it)
+    """
+    return get_backend().denoise_audio(wav_path)
+
+
+def prepare_audio(audio_path: str) -> str:
+    """
+    Run the CPU preprocessing stage (decode to 16 kHz PCM, denoise).
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        Path to the prepared WAV file (caller must delete it)
+    """
+    return get_backend().prepare_audio(audio_path)
+
+
+def transcribe_prepared(
+    wav_path: str,
+    language: str | None = None,
+    job_id: str | None = None,
+    model: str | None = None,
+    cancel: CancelToken | None = None,
+) -> str:
+    """
+    Run the inference stage on a file produced by prepare_audio.
+
+    Long audio with a job_id is transcribed in checkpointed chunks, so a
+    retry of the same job only transcribes the chunks that are missing.
+
+    Args:
+        wav_path: Path to the prepared WAV file
+        language: Language code (e.g., 'es')
+        job_id: Stable job identifier enabling chunk checkpoints
+        model: Model from select_model, the backend default if None
+        cancel: Token of the job, checked as the backend works
+
+    Returns:
+        Transcribed text
+
+    Raises:
+        JobCancelled: If the job was cancelled
+        DeadlineExceeded: If the stage ran out of time, with the partial text
+    """
+    backend = get_backend()
+    # Remuxed audio from extract_audio is not WAV and goes to the backend whole
+    if job_id and wav_path.endswith(".wav") and get_wav_duration(wav_path) >= CHUNKING_MIN_DURATION:
+        segments = partial(backend.transcribe_segments, model=model, cancel=cancel)
+        return transcribe_checkpointed(wav_path, language, job_id, segments, cancel)
+    return backend.transcribe_prepared(wav_path, language, model, cancel)
+
+
+def transcribe_preview(wav_path: str, language: str | None = None, cancel: CancelToken | None = None) -> str:
+    """
+    Quickly transcribe the first PREVIEW_SECONDS with a cheap model.
+
+    Args:
+        wav_path: Path to the prepared WAV file
+        language: Language code (e.g., 'es')
+        cancel: Token that stops the preview once it is no longer wanted
+
+    Returns:
+        Low-fidelity text of the start of the audio
+    """
+    clip_path = write_head(wav_path, PREVIEW_SECONDS)
+    try:
+        return get_backend().transcribe_preview(clip_path, language, cancel)
+    finally:
+        os.unlink(clip_path)
+
+
+def transcribe_segments(
+    wav_path: str,
+    language: str | None = None,
+    model: str | None = None,
+    cancel: CancelToken | None = None,
+) -> list[dict]:
+    """
+    Run the inference stage and keep segment timestamps.
+
+    Args:
+        wav_path: Path to the prepared WAV file
+        language: Language code (e.g., 'es')
+        model: Model from select_model, the backend default if None
+        cancel: Token of the job, checked as the backend works
+
+    Returns:
+        List of {"start", "end", "text"} dicts, times in seconds
+    """
+    return get_backend().transcribe_segments(wav_path, language, model, cancel)
 
 
 def transcribe_audio(audio_path: str, language: str | None = None) -> str:
@@ -25,4 +212,4 @@ def transcribe_audio(audio_path: str, language: str | None = None) -> str:
         Transcribed text
     """
     # Both transcribers handle conversion and noise reduction internally
-    return _transcribe_audio(audio_path, language)
+    return get_backend().transcribe_audio(audio_path, language)
@@ -1,35 +1,194 @@
 """Local Whisper transcription module for development."""
 
 import os
+
+import numpy as np
 from faster_whisper import WhisperModel
 
-# Global transcriber instance
-_transcriber = None
+from .audio import convert_to_wav
+from .model_manager import ModelManager, WHISPER_RESIDENT_MODEL
+from .routing import WHISPER_POOL, parse_pool, route_model
+from .profiles import load_profile, default_compute_type
+from ..utils.cancel import CancelToken, check
+from ..utils.governor import budget_plan
+
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto")
+
+# Model for previews, decoded greedily
+PREVIEW_MODEL = os.getenv("PREVIEW_MODEL", WHISPER_RESIDENT_MODEL or "tiny")
+
+# Chunking and previews cut WAV files, so every codec is decoded to PCM
+PASSTHROUGH_CODECS: set[str] = set()
+
+# Decoding settings of WHISPER_PROFILE
+decoding = load_profile()
+
+
+def _load_model(model_size: str) -> WhisperModel:
+    """Build a Whisper model for the configured device and profile."""
+    device = WHISPER_DEVICE if WHISPER_DEVICE != "auto" else "cpu"
+    # Tuned by `run.py tune` if it benchmarked this model on this device
+    settings = load_profile(model=model_size, device=device)
+    compute_type = settings["compute_type"] or default_compute_type(device)
+
+    print(f"Loading local Whisper model: {model_size} on {WHISPER_DEVICE} ({compute_type})")
+    return WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        # Without a tuned value, take the threads the CPU budget leaves per worker
+        cpu_threads=settings["cpu_threads"] or budget_plan["inference_threads"],
+        num_workers=settings["num_workers"],
+    )
+
+
+# Loaded models, unloaded again after WHISPER_IDLE_UNLOAD_SECONDS of disuse
+models = ModelManager(_load_model)
+
+# Model sizes jobs are routed between (just WHISPER_MODEL without a pool)
+pool = parse_pool(WHISPER_POOL, WHISPER_MODEL)
 
 
 def get_transcriber():
     """Get or create the local Whisper transcriber."""
-    global _transcriber
-    if _transcriber is None:
-        model_size = os.getenv("WHISPER_MODEL", "base")
-        device = os.getenv("WHISPER_DEVICE", "auto")
-
-        if device == "auto":
-            compute_type = "int8"
-        elif device == "cuda":
-            compute_type = "float16"
-        else:
-            compute_type = "int8"
-
-        print(f"Loading local Whisper model: {model_size} on {device}")
-        _transcriber = WhisperModel(
-            model_size,
-            device=device if device != "auto" else "cpu",
-            compute_type=compute_type,
+    return models.get(WHISPER_MODEL)
+
+
+def select_model(duration: float, queue_depth: int = 0, preferred: str | None = None) -> str:
+    """Route a job to a model of the pool by duration, backlog and preference."""
+    return route_model(pool, duration, queue_depth, preferred)
+
+
+def available_models() -> list[str]:
+    """Models users can choose between."""
+    return [name for name, _ in pool] if len(pool) > 1 else []
+
+
+def warm_up() -> None:
+    """Load the models and run a short inference so the first job is fast."""
+    if WHISPER_RESIDENT_MODEL:
+        models.get(WHISPER_RESIDENT_MODEL)
+
+    for model_size, _ in pool:
+        with models.acquire(model_size) as transcriber:
+            # One second of silence is enough to initialize the decoder
+            segments, info = transcriber.transcribe(
+                np.zeros(16000, dtype=np.float32),
+                language="en",
+                beam_size=1,
+            )
+            list(segments)
+
+
+def unload_idle() -> list[str]:
+    """Unload models that have not been used recently."""
+    return models.unload_idle()
+
+
+def denoise_audio(wav_path: str) -> str:
+    """Whisper copes with noise well enough locally, keep the audio as is."""
+    return wav_path
+
+
+def prepare_audio(audio_path: str) -> str:
+    """
+    Decode audio to 16 kHz mono WAV.
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        Path to the prepared WAV file (caller must delete it)
+    """
+    return convert_to_wav(audio_path)
+
+
+def transcribe_segments(
+    wav_path: str,
+    language: str | None = None,
+    model: str | None = None,
+    cancel: CancelToken | None = None,
+) -> list[dict]:
+    """
+    Transcribe a prepared WAV file into timestamped segments.
+
+    Args:
+        wav_path: Path to the output of prepare_audio
+        language: Language code (e.g., 'es')
+        model: Model size, WHISPER_MODEL if None
+        cancel: Token checked between segments
+
+    Returns:
+        List of {"start", "end", "text"} dicts, times in seconds
+
+    Raises:
+        JobCancelled: If the job was cancelled
+        DeadlineExceeded: If the stage ran out of time, with the segments
+            decoded until then
+    """
+    with models.acquire(model or WHISPER_MODEL) as transcriber:
+        segments, info = transcriber.transcribe(
+            wav_path,
+            language=language,
+            beam_size=decoding["beam_size"],
         )
-        print("Local Whisper model loaded successfully!")
 
-    return _transcriber
+        # Segments are decoded lazily, so consume them while the model is
+        # held; stopping between two frees the worker for the next job
+        results = []
+        for segment in segments:
+            results.append({"start": segment.start, "end": segment.end, "text": segment.text})
+            check(cancel, results)
+        return results
+
+
+def transcribe_preview(wav_path: str, language: str | None = None, cancel: CancelToken | None = None) -> str:
+    """
+    Transcribe a short clip with PREVIEW_MODEL and greedy decoding.
+
+    Args:
+        wav_path: Path to a prepared WAV clip
+        language: Language code (e.g., 'es')
+        cancel: Token checked between segments
+
+    Returns:
+        Transcribed text
+    """
+    with models.acquire(PREVIEW_MODEL) as transcriber:
+        segments, info = transcriber.transcribe(
+            wav_path,
+            language=language,
+            beam_size=1,
+            without_timestamps=True,
+        )
+        texts = []
+        for segment in segments:
+            texts.append(segment.text)
+            check(cancel)
+        return "".join(texts).strip()
+
+
+def transcribe_prepared(
+    wav_path: str,
+    language: str | None = None,
+    model: str | None = None,
+    cancel: CancelToken | None = None,
+) -> str:
+    """
+    Transcribe a prepared WAV file with the local Whisper model.
+
+    Args:
+        wav_path: Path to the output of prepare_audio
+        language: Language code (e.g., 'es')
+        model: Model size, WHISPER_MODEL if None
+        cancel: Token checked between segments
+
+    Returns:
+        Transcribed text
+    """
+    segments = transcribe_segments(wav_path, language, model, cancel)
+    return "".join(segment["text"] for segment in segments).strip()
 
 
 def transcribe_audio(audio_path: str, language: str | None = None) -> str:
@@ -43,13 +202,9 @@ def transcribe_audio(audio_path: str, language: str | None = None) -> str:
     Returns:
         Transcribed text
     """
-    transcriber = get_transcriber()
-
-    segments, info = transcriber.transcribe(
-        audio_path,
-        language=language,
-        beam_size=5,
-    )
-
-    text_parts = [segment.text for segment in segments]
-    return "".join(text_parts).strip()
+    wav_path = prepare_audio(audio_path)
+    try:
+        return transcribe_prepared(wav_path, language)
+    finally:
+        if os.path.exists(wav_path):
+            os.unlink(wav_path)
@@ -2,71 +2,51 @@
 
 import os
 import tempfile
-from openai import OpenAI
+from openai import AsyncOpenAI
 import noisereduce as nr
 import soundfile as sf
 import numpy as np
-import av
 
-# Global OpenAI client
-_client: OpenAI | None = None
+from .audio import convert_to_wav
+from ..utils.cancel import CancelToken, check, run_cancellable
 
+# Model used for every API transcription
+OPENAI_MODEL = "whisper-1"
 
-def convert_to_wav(input_path: str) -> str:
-    """
-    Convert audio file to WAV format using PyAV.
-
-    Args:
-        input_path: Path to the input audio file
-
-    Returns:
-        Path to the converted WAV file
-    """
-    output_path = tempfile.mktemp(suffix=".wav")
+# Audio codecs the API takes as is (remuxed to .m4a, never decoded)
+PASSTHROUGH_CODECS = {"aac"}
 
-    input_container = av.open(input_path)
-    output_container = av.open(output_path, mode='w')
 
-    # Get audio stream
-    input_stream = input_container.streams.audio[0]
+def get_api_key() -> str:
+    """Return the OpenAI API key."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set")
+    return api_key
 
-    # Create output stream (16kHz mono WAV - optimal for Whisper)
-    output_stream = output_container.add_stream('pcm_s16le', rate=16000)
-    output_stream.layout = 'mono'
 
-    # Create resampler
-    resampler = av.AudioResampler(
-        format='s16',
-        layout='mono',
-        rate=16000,
-    )
-
-    for frame in input_container.decode(audio=0):
-        # Resample frame
-        resampled_frames = resampler.resample(frame)
-        for resampled_frame in resampled_frames:
-            for packet in output_stream.encode(resampled_frame):
-                output_container.mux(packet)
+def _client_for(cancel: CancelToken | None) -> AsyncOpenAI:
+    """
+    A client for one request, bounded by the time left to the stage deadline.
 
-    # Flush encoder
-    for packet in output_stream.encode():
-        output_container.mux(packet)
+    Each request gets its own client: it runs on a private event loop
+    (see run_cancellable) so that cancelling the job aborts it mid-flight.
+    """
+    remaining = cancel.remaining() if cancel is not None else None
+    if remaining is None:
+        return AsyncOpenAI(api_key=get_api_key())
+    # Retrying past the deadline would only hold the worker longer
+    return AsyncOpenAI(api_key=get_api_key(), timeout=max(1.0, remaining), max_retries=0)
 
-    output_container.close()
-    input_container.close()
 
-    return output_path
+def warm_up() -> None:
+    """Check the API key ahead of the first job."""
+    get_api_key()
 
 
-def get_client() -> OpenAI:
-    """Get or create the OpenAI client."""
-    global _client
-    if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is not set")
-        _client = OpenAI(api_key=api_key)
-    return _client
+def unload_idle() -> list[str]:
+    """Nothing to unload: inference runs on the API."""
+    return []
 
 
 def reduce_noise(audio_path: str) -> str:
@@ -99,47 +79,154 @@ def reduce_noise(audio_path: str) -> str:
     return cleaned_path
 
 
-def transcribe_audio(audio_path: str, language: str | None = None) -> str:
+def denoise_audio(wav_path: str) -> str:
     """
-    Transcribe an audio file using OpenAI Whisper API with noise reduction.
+    Apply noise reduction to a decoded WAV file, replacing it.
+
+    Args:
+        wav_path: Path to the output of convert_to_wav
+
+    Returns:
+        Path to the cleaned WAV file (the input if denoising failed)
+    """
+    try:
+        cleaned_path = reduce_noise(wav_path)
+    except Exception as e:
+        print(f"Noise reduction failed, using converted file: {e}")
+        return wav_path
+
+    os.unlink(wav_path)
+    return cleaned_path
+
+
+def prepare_audio(audio_path: str) -> str:
+    """
+    Convert audio to 16 kHz mono WAV and apply noise reduction.
 
     Args:
         audio_path: Path to the audio file
+
+    Returns:
+        Path to the prepared WAV file (caller must delete it)
+    """
+    # Convert to WAV first (handles OGG Opus and other formats)
+    return denoise_audio(convert_to_wav(audio_path))
+
+
+def select_model(duration: float, queue_depth: int = 0, preferred: str | None = None) -> str:
+    """The API serves every job with the same model."""
+    return OPENAI_MODEL
+
+
+def available_models() -> list[str]:
+    """Models users can choose between (none: there is a single API model)."""
+    return []
+
+
+def transcribe_prepared(
+    wav_path: str,
+    language: str | None = None,
+    model: str | None = None,
+    cancel: CancelToken | None = None,
+) -> str:
+    """
+    Transcribe a prepared WAV file with the OpenAI Whisper API.
+
+    Args:
+        wav_path: Path to the output of prepare_audio
         language: Optional language code (e.g., 'en', 'it'). Auto-detected if None.
+        model: API model name, OPENAI_MODEL if None
+        cancel: Token whose deadline bounds the request and whose cancel
+            aborts it
 
     Returns:
         Transcribed text
     """
-    client = get_client()
-    wav_path = None
-    cleaned_path = None
+    async def request() -> str:
+        async with _client_for(cancel) as client:
+            with open(wav_path, "rb") as audio_file:
+                return await client.audio.transcriptions.create(
+                    model=model or OPENAI_MODEL,
+                    file=audio_file,
+                    language=language,  # Optional, auto-detect if None
+                    response_format="text"
+                )
+
+    try:
+        transcript = run_cancellable(cancel, request)
+    except Exception:
+        # A request cut off by the deadline is reported as such
+        check(cancel)
+        raise
+
+    # The result of a request that outlived a cancel is dropped
+    check(cancel)
+    return transcript.strip() if transcript else ""
+
+
+def transcribe_preview(wav_path: str, language: str | None = None, cancel: CancelToken | None = None) -> str:
+    """Transcribe a short clip (the API has no cheaper mode)."""
+    return transcribe_prepared(wav_path, language, cancel=cancel)
+
+
+def transcribe_segments(
+    wav_path: str,
+    language: str | None = None,
+    model: str | None = None,
+    cancel: CancelToken | None = None,
+) -> list[dict]:
+    """
+    Transcribe a prepared WAV file into timestamped segments.
+
+    Args:
+        wav_path: Path to the output of prepare_audio
+        language: Optional language code. Auto-detected if None.
+        model: API model name, OPENAI_MODEL if None
+        cancel: Token whose deadline bounds the request and whose cancel
+            aborts it
+
+    Returns:
+        List of {"start", "end", "text"} dicts, times in seconds
+    """
+    async def request():
+        async with _client_for(cancel) as client:
+            with open(wav_path, "rb") as audio_file:
+                return await client.audio.transcriptions.create(
+                    model=model or OPENAI_MODEL,
+                    file=audio_file,
+                    language=language,
+                    response_format="verbose_json",
+                    timestamp_granularities=["segment"]
+                )
 
     try:
-        # Convert to WAV first (handles OGG Opus and other formats)
-        wav_path = convert_to_wav(audio_path)
-        use_path = wav_path
-
-        # Apply noise reduction
-        try:
-            cleaned_path = reduce_noise(wav_path)
-            use_path = cleaned_path
-        except Exception as e:
-            print(f"Noise reduction failed, using converted file: {e}")
-
-        # Transcribe
-        with open(use_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language=language,  # Optional, auto-detect if None
-                response_format="text"
-            )
-
-        return transcript.strip() if transcript else ""
+        transcript = run_cancellable(cancel, request)
+    except Exception:
+        check(cancel)
+        raise
+
+    check(cancel)
+    return [
+        {"start": segment.start, "end": segment.end, "text": segment.text}
+        for segment in (transcript.segments or [])
+    ]
+
+
+def transcribe_audio(audio_path: str, language: str | None = None) -> str:
+    """
+    Transcribe an audio file using OpenAI Whisper API with noise reduction.
 
+    Args:
+        audio_path: Path to the audio file
+        language: Optional language code (e.g., 'en', 'it'). Auto-detected if None.
+
+    Returns:
+        Transcribed text
+    """
+    prepared_path = prepare_audio(audio_path)
+    try:
+        return transcribe_prepared(prepared_path, language)
     finally:
         # Clean up temporary files
-        if wav_path and os.path.exists(wav_path):
-            os.unlink(wav_path)
-        if cleaned_path and os.path.exists(cleaned_path):
-            os.unlink(cleaned_path)
+        if os.path.exists(prepared_path):
+            os.unlink(prepared_path)
@@ -0,0 +1,146 @@
+"""Benchmark decoding settings of the local backend on a sample set."""
+
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from faster_whisper import WhisperModel
+
+from .audio import convert_to_wav
+from .chunking import get_wav_duration
+from .profiles import PROFILES
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SUFFIXES = {".wav", ".ogg", ".oga", ".opus", ".mp3", ".m4a", ".flac", ".aac"}
+
+
+def load_samples(directory: Path) -> list[str]:
+    """
+    Prepare the benchmark samples as 16 kHz WAV files (caller must delete them).
+
+    Args:
+        directory: Folder of real speech recordings
+
+    Returns:
+        Paths to prepared WAV files
+    """
+    files = sorted(path for path in directory.iterdir() if path.suffix.lower() in SAMPLE_SUFFIXES)
+    if not files:
+        raise ValueError(f"No audio samples found in {directory}")
+    return [convert_to_wav(str(path)) for path in files]
+
+
+def check_speech(model: WhisperModel, samples: list[str]) -> None:
+    """
+    Make sure every sample is speech the model can transcribe.
+
+    Whisper emits nothing, or hallucinates, on silence and noise, which
+    makes its speed and beam comparisons meaningless.
+
+    Raises:
+        ValueError: If a sample transcribes to no text
+    """
+    for path in samples:
+        segments, info = model.transcribe(path, beam_size=1)
+        if not "".join(segment.text for segment in segments).strip():
+            raise ValueError(f"{path} contains no recognizable speech; tune on real recordings")
+
+
+def candidate_grid(device: str, cpu_count: int) -> list[dict]:
+    """
+    Return the load-time settings worth trying on this host.
+
+    Args:
+        device: "cpu" or "cuda"
+        cpu_count: Cores available to the bot
+
+    Returns:
+        List of {compute_type, cpu_threads, num_workers} dicts
+    """
+    if device == "cuda":
+        compute_types = ["float16", "int8_float16"]
+    else:
+        compute_types = ["int8", "int8_float32", "float32"]
+
+    threads = sorted({max(1, cpu_count // divisor) for divisor in (1, 2, 4)}, reverse=True)
+    workers = [n for n in (1, 2, 4) if n <= cpu_count]
+
+    return [
+        {"compute_type": compute_type, "cpu_threads": cpu_threads, "num_workers": num_workers}
+        for compute_type, cpu_threads, num_workers in itertools.product(compute_types, threads, workers)
+        # More threads than cores only adds contention
+        if cpu_threads * num_workers <= cpu_count
+    ]
+
+
+def _measure(model: WhisperModel, samples: list[str], beam_size: int, num_workers: int) -> float:
+    """Transcribe all samples (num_workers at a time) and return the wall time."""
+    def run(path: str) -> None:
+        segments, info = model.transcribe(path, beam_size=beam_size)
+        list(segments)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        list(pool.map(run, samples))
+    return time.perf_counter() - start
+
+
+def benchmark(
+    model_size: str,
+    device: str,
+    samples: list[str],
+    cpu_count: int | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> tuple[dict, list[dict]]:
+    """
+    Measure the real-time factor of every setting combination.
+
+    Args:
+        model_size: Whisper model to benchmark
+        device: "cpu" or "cuda"
+        samples: Prepared WAV files
+        cpu_count: Core budget (defaults to all cores)
+        progress: Called with each result as it is measured
+
+    Returns:
+        (best settings per profile, all results), lowest RTF wins within
+        each profile's beam size
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    audio_seconds = sum(get_wav_duration(path) for path in samples)
+    beam_sizes = sorted({profile["beam_size"] for profile in PROFILES.values()})
+
+    results = []
+    for index, settings in enumerate(candidate_grid(device, cpu_count)):
+        model = WhisperModel(model_size, device=device, **settings)
+        if index == 0:
+            # Also excludes one-off initialization from the timings
+            check_speech(model, samples)
+        else:
+            _measure(model, samples[:1], 1, 1)
+
+        for beam_size in beam_sizes:
+            elapsed = _measure(model, samples, beam_size, settings["num_workers"])
+            result = {**settings, "beam_size": beam_size, "rtf": elapsed / audio_seconds}
+            results.append(result)
+            if progress:
+                progress(result)
+        del model
+
+    best = {}
+    for name, profile in PROFILES.items():
+        candidates = [result for result in results if result["beam_size"] == profile["beam_size"]]
+        if candidates:
+            best[name] = min(candidates, key=lambda result: result["rtf"])
+    return best, results
+
+
+def default_device() -> str:
+    """Return the device the bot would use."""
+    device = os.getenv("WHISPER_DEVICE", "auto")
+    return "cpu" if device == "auto" else device
@@ -1,13 +1,18 @@
 """Utility modules."""
 
 from .utils import (
-    transcribe_message,
     get_user_language,
+    get_user_profile,
     set_user_language,
+    get_user_model,
+    set_user_model,
+    warm_user_cache,
     LANGUAGES,
     SUPPORTED_FORMATS,
     VIDEO_NOTE_FORMATS,
     MAX_DURATION,
+    MAX_FILE_SIZE,
+    TELEGRAM_LOCAL_MODE,
     failed_transcriptions,
     temp_transcripts
 )
@@ -19,13 +24,18 @@ from .logger import (
 from .summarizer import summarize_text
 
 __all__ = [
-    "transcribe_message",
     "get_user_language",
+    "get_user_profile",
     "set_user_language",
+    "get_user_model",
+    "set_user_model",
+    "warm_user_cache",
     "LANGUAGES",
     "SUPPORTED_FORMATS",
     "VIDEO_NOTE_FORMATS",
     "MAX_DURATION",
+    "MAX_FILE_SIZE",
+    "TELEGRAM_LOCAL_MODE",
     "failed_transcriptions",
     "temp_transcripts",
     "log_user_action",
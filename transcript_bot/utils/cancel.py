@@ -0,0 +1,177 @@
+"""Cancellation and deadlines shared by a job's stages and worker threads."""
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class JobCancelled(Exception):
+    """The user cancelled the job."""
+
+    def __init__(self):
+        super().__init__("Cancelled by the user")
+
+
+class DeadlineExceeded(Exception):
+    """A stage ran out of time; carries whatever was transcribed by then."""
+
+    def __init__(self, stage: str, seconds: float, text: str = "", segments: list[dict] | None = None):
+        super().__init__(f"{stage} took longer than {seconds:.0f}s")
+        self.stage = stage
+        self.seconds = seconds
+        self.text = text
+        self.segments = segments or []
+
+
+class CancelToken:
+    """
+    Cancellation flag and current stage deadline of one job.
+
+    The event loop cancels the token and awaits wait(); blocking code on
+    the worker pools calls check() between units of work (segments,
+    chunks, packets) and stops with an exception as soon as it is set.
+    """
+
+    def __init__(self):
+        self._flag = threading.Event()
+        self._event: asyncio.Event | None = None
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.stage: str | None = None
+        self.seconds = 0.0
+        self.deadline: float | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._flag.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the job (call from the event loop)."""
+        self._flag.set()
+        if self._event is not None:
+            self._event.set()
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call callback (from the thread cancelling) when the job is cancelled,
+        right away if it already is.
+
+        Returns:
+            Function unregistering the callback
+        """
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    async def wait(self) -> None:
+        """Wait until the job is cancelled."""
+        if self._event is None:
+            self._event = asyncio.Event()
+            if self.cancelled:
+                self._event.set()
+        await self._event.wait()
+
+    def start_stage(self, stage: str, seconds: float) -> None:
+        """Start the deadline of a stage; 0 seconds means none."""
+        self.stage = stage
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds if seconds > 0 else None
+
+    def remaining(self) -> float | None:
+        """Seconds left before the stage deadline, None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check(self, segments: list[dict] | None = None, text: str = "") -> None:
+        """
+        Stop the current work if the job was cancelled or is out of time.
+
+        Args:
+            segments: Segments finished so far, handed to DeadlineExceeded
+            text: Text finished before those segments (e.g. earlier chunks)
+
+        Raises:
+            JobCancelled: If the job was cancelled
+            DeadlineExceeded: If the stage deadline has passed
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        if self.expired():
+            raise DeadlineExceeded(self.stage or "job", self.seconds, text + _join(segments), segments)
+
+
+def _join(segments: list[dict] | None) -> str:
+    return "".join(segment["text"] for segment in segments or [])
+
+
+def check(cancel: CancelToken | None, segments: list[dict] | None = None, text: str = "") -> None:
+    """CancelToken.check() for code that may run without a token."""
+    if cancel is not None:
+        cancel.check(segments, text)
+
+
+def run_cancellable(cancel: CancelToken | None, request: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run a request on a private event loop, aborting it as soon as the job
+    is cancelled.
+
+    A blocking HTTP client cannot be interrupted once a request is in
+    flight; a cancelled task closes its connection and frees the worker
+    thread at once. Call from the worker pools, never from the bot's loop.
+
+    Args:
+        cancel: Token whose cancel aborts the request
+        request: Function returning the request's coroutine (clients must
+            be created inside it, as they belong to the private loop)
+
+    Returns:
+        The request's result
+
+    Raises:
+        JobCancelled: If the job was cancelled before or during the request
+    """
+    check(cancel)
+
+    async def run() -> T:
+        if cancel is None:
+            return await request()
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+
+        def abort() -> None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # The request finished and its loop is already closed
+
+        unregister = cancel.on_cancel(abort)
+        try:
+            return await request()
+        finally:
+            unregister()
+
+    try:
+        return asyncio.run(run())
+    except asyncio.CancelledError:
+        check(cancel)
+        raise
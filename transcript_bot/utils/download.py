@@ -0,0 +1,113 @@
+"""Streaming downloads that stop as soon as audio is known to be too long."""
+
+import asyncio
+import logging
+import os
+
+import httpx
+from mutagen import File as MutagenFile
+from mutagen.flac import FLAC
+from mutagen.mp3 import MP3, BitrateMode
+from mutagen.mp4 import MP4
+from mutagen.ogg import OggFileType
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bytes downloaded between two duration probes of the partial file
+PROBE_INTERVAL_BYTES = int(os.getenv("PROBE_INTERVAL_BYTES", str(256 * 1024)))
+
+# The first probe runs once this much is there (enough for most headers)
+FIRST_PROBE_BYTES = 64 * 1024
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class DurationExceeded(Exception):
+    """The audio is provably longer than allowed; the download was aborted."""
+
+    def __init__(self, duration: float, downloaded_bytes: int):
+        super().__init__(f"Audio is at least {duration:.1f}s long")
+        self.duration = duration
+        self.downloaded_bytes = downloaded_bytes
+
+
+def probe_duration(path: str) -> float:
+    """
+    Read the duration of a possibly incomplete audio file.
+
+    Only lengths that cannot overestimate are returned. MP4, FLAC and MP3
+    with a Xing/VBRI header declare their length up front. Ogg files give
+    the last granule position that has arrived, a lower bound. Other
+    lengths are estimates: mutagen extrapolates a headerless MP3's length
+    from the first frame's bitrate, which can overshoot a VBR file. Those
+    count as unknown, so exceeding a limit here proves the whole file
+    exceeds it.
+
+    Args:
+        path: File being written
+
+    Returns:
+        Duration in seconds, 0 if it cannot be read yet or is only estimated
+    """
+    try:
+        audio = MutagenFile(path)
+    except Exception:
+        # Truncated pages and boxes are expected mid-download
+        return 0.0
+    if audio is None or not hasattr(audio, 'info'):
+        return 0.0
+
+    if isinstance(audio, MP3):
+        # Without a VBR header the bitrate mode stays unknown
+        declared = audio.info.bitrate_mode != BitrateMode.UNKNOWN
+    else:
+        declared = isinstance(audio, (MP4, FLAC, OggFileType))
+    return (audio.info.length or 0.0) if declared else 0.0
+
+
+async def stream_download(url: str, path: str, max_duration: float) -> int:
+    """
+    Download a file, probing its duration as it arrives.
+
+    Args:
+        url: File URL
+        path: Destination file
+        max_duration: Longest acceptable audio in seconds
+
+    Returns:
+        Number of bytes downloaded
+
+    Raises:
+        DurationExceeded: If the audio is provably too long (the partial
+            file is deleted)
+    """
+    downloaded = 0
+    next_probe = FIRST_PROBE_BYTES
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            with open(path, "wb") as out:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    out.write(chunk)
+                    downloaded += len(chunk)
+                    if downloaded < next_probe:
+                        continue
+
+                    next_probe = downloaded + PROBE_INTERVAL_BYTES
+                    out.flush()
+                    duration = await asyncio.to_thread(probe_duration, path)
+                    if duration > max_duration:
+                        break
+                else:
+                    return downloaded
+
+    # Only reached when the probe proved the audio too long
+    os.unlink(path)
+    total = int(response.headers.get("content-length") or downloaded)
+    metrics.inc("download_aborted_total")
+    metrics.inc("download_aborted_bytes_saved_total", max(0, total - downloaded))
+    logger.info(f"Aborted download after {downloaded} bytes: audio is at least {duration:.1f}s")
+    raise DurationExceeded(duration, downloaded)
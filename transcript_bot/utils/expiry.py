@@ -0,0 +1,40 @@
+"""Min-heap of expiry deadlines for O(log n) expiration."""
+
+import heapq
+import threading
+from typing import Hashable, List
+
+
+class ExpiryHeap:
+    """
+    Deadline-ordered heap of keys.
+
+    Entries are never removed in place: a key that is deleted or re-armed
+    with a later deadline leaves a stale entry behind, which the owner
+    recognises and skips when it is popped.
+    """
+
+    def __init__(self):
+        self._heap: list = []
+        self._lock = threading.Lock()
+
+    def push(self, deadline: float, key: Hashable) -> None:
+        """Schedule a key to expire at deadline (epoch seconds)."""
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, key))
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """Pop every key whose deadline has passed."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def next_deadline(self) -> float | None:
+        """Return the earliest pending deadline, if any."""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
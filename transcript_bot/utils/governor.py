@@ -0,0 +1,169 @@
+"""CPU budget shared by the decode, denoise and inference worker pools."""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from . import metrics
+
+try:
+    import threadpoolctl
+except ImportError:  # Optional: only needed when numpy was imported first
+    threadpoolctl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        return os.cpu_count() or 1
+
+
+# Cores the bot may keep busy (0 = all cores available to the process)
+CPU_BUDGET = int(os.getenv("CPU_BUDGET", "0")) or _available_cores()
+
+# Pool sizes (0 = derived from CPU_BUDGET). TRANSCRIPTION_WORKERS is the
+# older name for the inference pool size.
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "0"))
+DENOISE_WORKERS = int(os.getenv("DENOISE_WORKERS", "0"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", os.getenv("TRANSCRIPTION_WORKERS", "2")))
+
+# Thread-count variables of the BLAS/OpenMP runtimes used by numpy, scipy
+# (noisereduce) and onnxruntime
+THREAD_LIMIT_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def plan(budget: int = CPU_BUDGET) -> dict:
+    """
+    Split the core budget between the pools.
+
+    Preprocessing gets a quarter of the cores, inference the rest, divided
+    between its workers as CTranslate2 intra-op threads. BLAS runs single
+    threaded: parallelism comes from the pools, not from inside a call.
+
+    Args:
+        budget: Number of cores
+
+    Returns:
+        Dict with decode_workers, denoise_workers, inference_workers,
+        inference_threads and blas_threads
+    """
+    decode_workers = DECODE_WORKERS or max(1, budget // 4)
+    denoise_workers = DENOISE_WORKERS or max(1, budget // 4)
+    inference_workers = max(1, INFERENCE_WORKERS)
+
+    # A job is decoding or denoising, not both, so reserve for the larger pool
+    reserved = min(budget - 1, max(decode_workers, denoise_workers))
+    inference_threads = max(1, (budget - reserved) // inference_workers)
+
+    return {
+        "decode_workers": decode_workers,
+        "denoise_workers": denoise_workers,
+        "inference_workers": inference_workers,
+        "inference_threads": inference_threads,
+        "blas_threads": 1,
+    }
+
+
+budget_plan = plan()
+
+
+def apply_thread_limits() -> None:
+    """
+    Cap BLAS/OpenMP threads before the numeric libraries start.
+
+    Variables already set in the environment win. Call this early, before
+    numpy is imported; later calls fall back to threadpoolctl if installed.
+    """
+    limit = str(budget_plan["blas_threads"])
+    for name in THREAD_LIMIT_VARIABLES:
+        os.environ.setdefault(name, limit)
+
+    if threadpoolctl is not None:
+        threadpoolctl.threadpool_limits(limits=budget_plan["blas_threads"], user_api="blas")
+
+    logger.info(f"CPU budget {CPU_BUDGET} cores: {budget_plan}")
+
+
+class GovernedPool:
+    """Thread pool that reports its size, queue and busy time as metrics."""
+
+    def __init__(self, name: str, size: int):
+        """
+        Args:
+            name: Pool name used in metric labels and thread names
+            size: Number of worker threads
+        """
+        self.name = name
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=name)
+        self.busy_seconds = 0.0
+        self._pending = 0
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        metrics.set_gauge("pool_size", size, pool=name)
+
+    def pending(self) -> int:
+        """Return the number of calls waiting for or running on the pool."""
+        return self._pending
+
+    def idle(self) -> int:
+        """Return how many threads have nothing to do."""
+        return max(0, self.size - self._pending)
+
+    def utilization(self) -> float:
+        """Return the fraction of thread time spent busy since startup."""
+        elapsed = time.monotonic() - self._started
+        return self.busy_seconds / (self.size * elapsed) if elapsed > 0 else 0.0
+
+    def _timed(self, func: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self._busy += 1
+            metrics.set_gauge("pool_busy_workers", self._busy, pool=self.name)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._busy -= 1
+                self.busy_seconds += elapsed
+                metrics.set_gauge("pool_busy_workers", self._busy, pool=self.name)
+            metrics.inc("pool_busy_seconds_total", elapsed, pool=self.name)
+            metrics.set_gauge("pool_utilization", self.utilization(), pool=self.name)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call on the pool."""
+        with self._lock:
+            self._pending += 1
+            metrics.set_gauge("pool_pending", self._pending, pool=self.name)
+        future = self.executor.submit(self._timed, func, args)
+        # A cancelled caller stops waiting but cannot stop the thread: the
+        # call counts as pending until it has actually finished (or was
+        # cancelled before it started)
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            metrics.set_gauge("pool_pending", self._pending, pool=self.name)
+
+
+decode_pool = GovernedPool("decode", budget_plan["decode_workers"])
+denoise_pool = GovernedPool("denoise", budget_plan["denoise_workers"])
+inference_pool = GovernedPool("inference", budget_plan["inference_workers"])
+
@@ -0,0 +1,91 @@
+"""Thread-safe LRU cache bounded by entry count and/or size in bytes."""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Least-recently-used map with optional count and byte limits.
+
+    Args:
+        max_items: Maximum number of entries, None for unlimited
+        max_bytes: Maximum total size of values, None for unlimited
+        sizeof: Function returning the size of a value in bytes
+    """
+
+    def __init__(
+        self,
+        max_items: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: OrderedDict = OrderedDict()
+        self._sizes: dict = {}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a value and mark it as recently used."""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or replace a value, evicting the oldest entries if needed."""
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self.size_bytes -= self._sizes.pop(key)
+                del self._data[key]
+
+            # Values larger than the whole budget are not cached at all
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._data[key] = value
+            self._sizes[key] = size
+            self.size_bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a value and return it."""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self.size_bytes -= self._sizes.pop(key)
+            return self._data.pop(key)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.size_bytes = 0
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until within limits (lock held)."""
+        while self._data and (
+            (self.max_items is not None and len(self._data) > self.max_items)
+            or (self.max_bytes is not None and self.size_bytes > self.max_bytes)
+        ):
+            key, _ = self._data.popitem(last=False)
+            self.size_bytes -= self._sizes.pop(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
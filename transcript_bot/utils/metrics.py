@@ -0,0 +1,63 @@
+"""In-process metrics: counters and gauges with Prometheus text export."""
+
+import threading
+from typing import Dict, Tuple
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_gauges: Dict[Tuple[str, Tuple], float] = {}
+
+
+def _key(name: str, labels: dict) -> Tuple[str, Tuple]:
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, amount: float = 1.0, **labels) -> None:
+    """Increase a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + amount
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge to the current value."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def get_value(name: str, **labels) -> float:
+    """Return the current value of a counter or gauge (0 if unset)."""
+    key = _key(name, labels)
+    with _lock:
+        return _counters.get(key, _gauges.get(key, 0.0))
+
+
+def snapshot() -> Dict[str, float]:
+    """Return all metrics as a flat {"name{labels}": value} dict."""
+    with _lock:
+        items = list(_counters.items()) + list(_gauges.items())
+    return {_format_name(name, labels): value for (name, labels), value in items}
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+
+    lines = []
+    for kind, items in (("counter", counters), ("gauge", gauges)):
+        declared = set()
+        for (name, labels), value in items:
+            if name not in declared:
+                lines.append(f"# TYPE {name} {kind}")
+                declared.add(name)
+            lines.append(f"{_format_name(name, labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_name(name: str, labels: Tuple) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels)
+    return f"{name}{{{rendered}}}"
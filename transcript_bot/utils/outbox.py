@@ -0,0 +1,221 @@
+"""Scheduler for outgoing Telegram messages: rate limits, priorities and edit coalescing."""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from . import metrics
+from .lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Messages per second across all chats (Telegram allows about 30)
+OUTPUT_GLOBAL_RATE = float(os.getenv("OUTPUT_GLOBAL_RATE", "25"))
+
+# Messages per second to one private chat, and the burst allowed on top
+OUTPUT_CHAT_RATE = float(os.getenv("OUTPUT_CHAT_RATE", "1"))
+OUTPUT_CHAT_BURST = int(os.getenv("OUTPUT_CHAT_BURST", "3"))
+
+# Messages per minute to one group (Telegram allows about 20)
+OUTPUT_GROUP_RATE_PER_MINUTE = float(os.getenv("OUTPUT_GROUP_RATE_PER_MINUTE", "20"))
+
+# Times a request is sent again after a 429 before the error is raised
+OUTPUT_MAX_RETRIES = int(os.getenv("OUTPUT_MAX_RETRIES", "3"))
+
+# Request priorities (lower goes first), passed as rate_limit_args
+PRIORITY_FINAL = 0
+PRIORITY_PROGRESS = 1
+
+# Chats whose buckets are remembered; forgetting one only refills it
+CHAT_BUCKETS = 10000
+
+
+def _is_message(endpoint: str) -> bool:
+    """Whether an endpoint posts to a chat and counts against flood limits."""
+    return endpoint.startswith(("send", "edit", "delete", "copy", "forward"))
+
+
+class _Bucket:
+    """Token bucket refilled continuously at rate tokens per second."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Set from 429 responses: nothing is sent before this time
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Return when the next token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return max(now, self.blocked_until)
+        return max(now + (1 - self.tokens) / self.rate, self.blocked_until)
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class OutputScheduler(BaseRateLimiter):
+    """
+    Rate limiter through which the bot sends every message.
+
+    Requests that post to a chat wait for a token from the global bucket
+    and from their chat's bucket. Among waiting requests, final results
+    (PRIORITY_FINAL, the default) go before progress updates
+    (PRIORITY_PROGRESS, and chat actions). An edit of a message that still
+    has an earlier edit waiting replaces it, so only the latest text is
+    sent. A 429 blocks the chat (or everything, if it has no chat) for the
+    time Telegram asks, then the request is sent again.
+
+    Other requests (getFile, answerCallbackQuery, ...) are not delayed.
+    """
+
+    def __init__(self):
+        self._global = _Bucket(OUTPUT_GLOBAL_RATE, max(1.0, OUTPUT_GLOBAL_RATE))
+        self._chats = LRUCache(max_items=CHAT_BUCKETS)
+        # Waiting requests: [priority, sequence, chat_id, edit key, future]
+        self._waiting: list[list] = []
+        self._edits: dict[tuple, list] = {}
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def initialize(self) -> None:
+        self._task = asyncio.create_task(self._dispatch(), name="output-scheduler")
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: int | None,
+    ) -> Any:
+        if not _is_message(endpoint) or self._task is None:
+            return await callback(*args, **kwargs)
+
+        if rate_limit_args is not None:
+            priority = rate_limit_args
+        else:
+            priority = PRIORITY_PROGRESS if endpoint == "sendChatAction" else PRIORITY_FINAL
+
+        chat_id = data.get("chat_id")
+        edit_key = None
+        if endpoint.startswith("edit") and data.get("message_id") is not None:
+            edit_key = (chat_id, data["message_id"])
+
+        for attempt in range(OUTPUT_MAX_RETRIES + 1):
+            if not await self._wait_turn(priority, chat_id, edit_key):
+                # A later edit of the same message is sent instead
+                metrics.inc("output_coalesced_total", endpoint=endpoint)
+                return True
+
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == OUTPUT_MAX_RETRIES:
+                    raise
+                delay = e.retry_after
+                delay = delay.total_seconds() if isinstance(delay, timedelta) else float(delay)
+                self._block(chat_id, delay)
+                metrics.inc("output_retry_after_total", endpoint=endpoint)
+                logger.warning(f"Flood limit on {endpoint} (chat {chat_id}), retrying in {delay:.1f}s")
+
+    def _bucket(self, chat_id) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Group and channel IDs are negative
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = _Bucket(OUTPUT_GROUP_RATE_PER_MINUTE / 60, 1)
+            else:
+                bucket = _Bucket(OUTPUT_CHAT_RATE, OUTPUT_CHAT_BURST)
+            self._chats.set(chat_id, bucket)
+        return bucket
+
+    def _block(self, chat_id, delay: float) -> None:
+        """Hold back a chat (or every chat) after a 429."""
+        bucket = self._bucket(chat_id) if chat_id is not None else self._global
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+        self._wakeup.set()
+
+    async def _wait_turn(self, priority: int, chat_id, edit_key: tuple | None) -> bool:
+        """Wait until the request may be sent; False if a newer edit replaced it."""
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        entry = [priority, self._sequence, chat_id, edit_key, future]
+
+        if edit_key is not None:
+            previous = self._edits.get(edit_key)
+            if previous is not None and not previous[4].done():
+                previous[4].set_result(False)
+                # Keep the place of the replaced edit in the queue
+                entry[0] = min(priority, previous[0])
+                entry[1] = previous[1]
+            self._edits[edit_key] = entry
+
+        self._waiting.append(entry)
+        metrics.set_gauge("output_queue_depth", len(self._waiting))
+        self._wakeup.set()
+        start = time.monotonic()
+        try:
+            return await future
+        finally:
+            metrics.inc("output_wait_seconds_total", time.monotonic() - start)
+            if edit_key is not None and self._edits.get(edit_key) is entry:
+                del self._edits[edit_key]
+
+    async def _dispatch(self) -> None:
+        """Grant waiting requests in priority order as tokens allow."""
+        while True:
+            now = time.monotonic()
+            self._waiting = [entry for entry in self._waiting if not entry[4].done()]
+            metrics.set_gauge("output_queue_depth", len(self._waiting))
+
+            granted = None
+            next_time = None
+            global_ready = self._global.ready_at(now)
+            if global_ready > now:
+                next_time = global_ready
+            else:
+                for entry in sorted(self._waiting):
+                    ready = self._bucket(entry[2]).ready_at(now)
+                    if ready <= now:
+                        granted = entry
+                        break
+                    next_time = ready if next_time is None else min(next_time, ready)
+
+            if granted is not None:
+                self._global.take(now)
+                self._bucket(granted[2]).take(now)
+                self._waiting.remove(granted)
+                granted[4].set_result(True)
+                continue
+
+            self._wakeup.clear()
+            timeout = None if next_time is None or not self._waiting else max(0.0, next_time - now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
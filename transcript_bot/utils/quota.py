@@ -0,0 +1,142 @@
+"""Per-user and per-chat audio quotas: token buckets measured in audio seconds."""
+
+import logging
+import os
+import time
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Quotas refill over this many seconds
+QUOTA_WINDOW_SECONDS = int(os.getenv("QUOTA_WINDOW_SECONDS", "3600"))
+
+# Seconds of audio a user, and a group chat, may send per window (0 = no quota)
+QUOTA_USER_SECONDS = int(os.getenv("QUOTA_USER_SECONDS", "0"))
+QUOTA_CHAT_SECONDS = int(os.getenv("QUOTA_CHAT_SECONDS", "0"))
+
+# Seconds between syncs of quota usage with the database
+QUOTA_SYNC_INTERVAL = int(os.getenv("QUOTA_SYNC_INTERVAL", "60"))
+
+USER = "user"
+CHAT = "chat"
+
+
+class QuotaTracker:
+    """
+    Token buckets of audio seconds, shared through SQLite by every frontend.
+
+    A bucket holds up to its quota and refills at quota per window. Only
+    buckets that are not full are kept: a subject without one has its
+    whole quota, so the memory and table sizes follow recent senders, not
+    all users. Checks never touch the database: they read the buckets as
+    last loaded, minus what this process charged since. The periodic sync
+    adds those charges to the table as deltas, so frontends sharing it add
+    up their usage, and reloads the result.
+    """
+
+    def __init__(self, window: int, user_seconds: int, chat_seconds: int):
+        """
+        Args:
+            window: Seconds over which an empty bucket refills
+            user_seconds: Quota of each user, 0 for none
+            chat_seconds: Quota of each group chat, 0 for none
+        """
+        self.window = window
+        self.capacity = {USER: user_seconds, CHAT: chat_seconds}
+        # (kind, subject ID) -> [tokens, wall-clock time of tokens], as loaded
+        self._buckets: dict[tuple[str, int], list[float]] = {}
+        # Seconds charged since the last sync, and those being synced
+        self._pending: dict[tuple[str, int], float] = {}
+        self._syncing: dict[tuple[str, int], float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and any(self.capacity.values())
+
+    def _tokens(self, key: tuple[str, int], now: float) -> float:
+        capacity = self.capacity[key[0]]
+        tokens = capacity
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * capacity / self.window)
+        charged = self._pending.get(key, 0.0) + self._syncing.get(key, 0.0)
+        return min(capacity, tokens - charged)
+
+    def _subjects(self, user_id: int, chat_id: int) -> list[tuple[str, int]]:
+        keys = []
+        if self.capacity[USER]:
+            keys.append((USER, user_id))
+        # A private chat's ID is its user's: the user quota covers it
+        if self.capacity[CHAT] and chat_id != user_id:
+            keys.append((CHAT, chat_id))
+        return keys
+
+    def check(self, user_id: int, chat_id: int, seconds: float) -> tuple[str, float] | None:
+        """
+        Check whether audio fits the sender's and the chat's quotas.
+
+        Audio longer than a whole quota is accepted from a full bucket,
+        which it then overdraws.
+
+        Args:
+            user_id: Sender
+            chat_id: Chat the audio was sent in
+            seconds: Audio duration
+
+        Returns:
+            None if it fits, else the exhausted quota's kind and the
+            seconds until it has refilled enough
+        """
+        now = time.time()
+        for key in self._subjects(user_id, chat_id):
+            capacity = self.capacity[key[0]]
+            missing = min(seconds, capacity) - self._tokens(key, now)
+            if missing > 0:
+                return key[0], missing * self.window / capacity
+        return None
+
+    def charge(self, user_id: int, chat_id: int, seconds: float) -> None:
+        """Take audio seconds from the quotas (negative to give them back)."""
+        for key in self._subjects(user_id, chat_id):
+            self._pending[key] = self._pending.get(key, 0.0) + seconds
+        metrics.inc("quota_charged_seconds_total", seconds)
+
+    def remaining(self, kind: str, subject_id: int) -> float:
+        """Audio seconds a user or chat may still send now."""
+        return max(0.0, self._tokens((kind, subject_id), time.time()))
+
+    def take_charges(self) -> list[tuple[str, int, float]]:
+        """
+        Start a sync: take the seconds charged since the last one.
+
+        They still count against the buckets until load() brings in the
+        database's state, or restore() hands them to the next sync.
+
+        Returns:
+            (kind, subject ID, seconds) per charged bucket
+        """
+        for key, seconds in self._pending.items():
+            self._syncing[key] = self._syncing.get(key, 0.0) + seconds
+        self._pending.clear()
+        return [(kind, subject_id, seconds) for (kind, subject_id), seconds in self._syncing.items() if seconds]
+
+    def restore(self) -> None:
+        """Give the charges of a failed sync back to the next one."""
+        for key, seconds in self._syncing.items():
+            self._pending[key] = self._pending.get(key, 0.0) + seconds
+        self._syncing.clear()
+
+    def load(self, rows: list[tuple[str, int, float, float]]) -> None:
+        """Replace the buckets with the rows read from the database, which include the synced charges."""
+        self._buckets = {
+            (kind, subject_id): [tokens, updated]
+            for kind, subject_id, tokens, updated in rows
+            if kind in self.capacity
+        }
+        self._syncing.clear()
+        metrics.set_gauge("quota_buckets", len(self._buckets))
+
+
+# Quotas of the process admitting audio (the bot, or the frontend)
+quotas = QuotaTracker(QUOTA_WINDOW_SECONDS, QUOTA_USER_SECONDS, QUOTA_CHAT_SECONDS)
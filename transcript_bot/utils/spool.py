@@ -0,0 +1,79 @@
+"""Size-capped spool directory for preprocessed audio kept for retries."""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Where preprocessed PCM of failed jobs is kept
+SPOOL_DIR = Path(os.getenv("SPOOL_DIR", os.path.join(tempfile.gettempdir(), "transcript_bot_spool")))
+
+# Total size cap of the spool; the oldest files are evicted first
+SPOOL_MAX_BYTES = int(os.getenv("SPOOL_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_lock = threading.Lock()
+
+
+def spool_file(path: str, key: str) -> str | None:
+    """
+    Move a file into the spool, evicting old files to stay within quota.
+
+    Args:
+        path: File to keep (it is moved, not copied)
+        key: Unique name for the spooled file
+
+    Returns:
+        New path of the file, or None if it does not fit in the quota
+    """
+    size = os.path.getsize(path)
+    if size > SPOOL_MAX_BYTES:
+        os.unlink(path)
+        logger.warning(f"Not spooling {key}: {size} bytes exceeds SPOOL_MAX_BYTES")
+        return None
+
+    with _lock:
+        SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+        _evict(SPOOL_MAX_BYTES - size)
+        target = SPOOL_DIR / f"{key}{Path(path).suffix}"
+        shutil.move(path, target)
+
+    return str(target)
+
+
+def release(path: str | None) -> int:
+    """Delete a spooled file, returning the bytes freed."""
+    if not path:
+        return 0
+    try:
+        size = os.path.getsize(path)
+        os.unlink(path)
+        return size
+    except OSError:
+        return 0
+
+
+def get_spool_usage() -> int:
+    """Return the current size of the spool in bytes."""
+    if not SPOOL_DIR.exists():
+        return 0
+    return sum(entry.stat().st_size for entry in SPOOL_DIR.iterdir() if entry.is_file())
+
+
+def _evict(budget: int) -> None:
+    """Delete the oldest spooled files until usage fits in budget (lock held)."""
+    files = sorted(
+        (entry for entry in SPOOL_DIR.iterdir() if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    usage = sum(entry.stat().st_size for entry in files)
+
+    for entry in files:
+        if usage <= budget:
+            break
+        usage -= entry.stat().st_size
+        logger.info(f"Evicting spooled audio {entry.name} to stay within quota")
+        entry.unlink(missing_ok=True)
@@ -1,23 +1,31 @@
 """Summarization module using OpenAI API."""
 
 import os
-import openai
 from typing import Optional
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .cancel import CancelToken, JobCancelled, run_cancellable
 
 
-def summarize_text(text: str, language: str = "es") -> Optional[str]:
+def summarize_text(
+    text: str,
+    language: str = "es",
+    timeout: Optional[float] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Optional[str]:
     """
     Summarize text using OpenAI GPT.
 
     Args:
         text: Text to summarize
         language: Language code for summary
+        timeout: Seconds to wait for the API (not retried), client default if None
+        cancel: Token of the job whose cancel aborts the request
 
     Returns:
         Summary text or None if error
+
+    Raises:
+        JobCancelled: If the job was cancelled before the summary arrived
     """
     try:
         # Determine language for prompt
@@ -26,18 +34,27 @@ def summarize_text(text: str, language: str = "es") -> Optional[str]:
         else:
             system_prompt = "Summarize the following text in concise bullet points:"
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text}
-            ],
-            max_tokens=300,
-            temperature=0.3
-        )
-
+        import openai
+        options = {"timeout": timeout, "max_retries": 0} if timeout is not None else {}
+
+        async def request():
+            # Runs on its own event loop, so the client cannot be shared
+            async with openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), **options) as client:
+                return await client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": text}
+                    ],
+                    max_tokens=300,
+                    temperature=0.3
+                )
+
+        response = run_cancellable(cancel, request)
         return response.choices[0].message.content.strip()
 
+    except JobCancelled:
+        raise
     except Exception as e:
         print(f"Summarization error: {e}")
         return None
@@ -0,0 +1,232 @@
+"""Key-value store with expiry: a bounded in-memory LRU in front of SQLite."""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..db.storage import read_connection, write_connection
+from . import metrics
+from .expiry import ExpiryHeap
+from .lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _ensure_schema() -> None:
+    """Create the backing table on first use."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with write_connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS kv_store (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_kv_store_expires ON kv_store (expires_at)')
+        _schema_ready = True
+
+
+class TTLStore:
+    """
+    Persistent key-value store whose entries expire after a TTL.
+
+    Values are JSON-serializable dicts. Writes go through to SQLite, reads
+    hit the in-memory LRU first and fall back to SQLite, so entries survive
+    restarts while memory stays bounded. Deadlines are tracked in a min-heap
+    so expire_due() only touches entries that are actually due.
+
+    Args:
+        namespace: Name separating this store's keys from other stores
+        ttl_seconds: Default lifetime of an entry
+        max_memory_bytes: Size cap of the in-memory front
+        on_expire: Called with (key, value) for every expired entry, may
+            return the number of extra bytes it reclaimed (e.g. files)
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        max_memory_bytes: int,
+        on_expire: Optional[Callable[[str, Dict[str, Any]], Optional[int]]] = None,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.on_expire = on_expire
+        # Cached entries are (expires_at, value, serialized size)
+        self._memory = LRUCache(max_bytes=max_memory_bytes, sizeof=lambda entry: entry[2])
+        self._deadlines = ExpiryHeap()
+        self._deadlines_loaded = False
+        self._deadlines_lock = threading.Lock()
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (defaults to the store's TTL)."""
+        self._load_deadlines()
+        payload = json.dumps(value)
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl_seconds)
+
+        with write_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO kv_store (namespace, key, value, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (self.namespace, key, payload, expires_at))
+
+        self._memory.set(key, (expires_at, value, len(payload)))
+        self._deadlines.push(expires_at, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a live value, reading through to SQLite on a memory miss."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value, _ = entry
+            if expires_at > now:
+                return value
+            self._memory.pop(key)
+            return default
+
+        _ensure_schema()
+        with read_connection() as conn:
+            row = conn.execute('''
+                SELECT value, expires_at FROM kv_store
+                WHERE namespace = ? AND key = ? AND expires_at > ?
+            ''', (self.namespace, key, now)).fetchone()
+
+        if row is None:
+            return default
+
+        payload, expires_at = row
+        value = json.loads(payload)
+        self._memory.set(key, (expires_at, value, len(payload)))
+        return value
+
+    def delete(self, key: str) -> None:
+        """Remove a value."""
+        _ensure_schema()
+        self._memory.pop(key)
+        with write_connection() as conn:
+            conn.execute(
+                'DELETE FROM kv_store WHERE namespace = ? AND key = ?',
+                (self.namespace, key)
+            )
+
+    def expire_due(self, now: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Expire the entries whose deadline has passed.
+
+        Only due heap entries are visited, so the cost is O(log n) per
+        expired item rather than a scan of the whole store.
+
+        Returns:
+            (expired entries, reclaimed bytes)
+        """
+        self._load_deadlines()
+        now = now or time.time()
+        due = self._deadlines.pop_due(now)
+        if not due:
+            return 0, 0
+
+        expired = []
+        with write_connection() as conn:
+            for key in due:
+                row = conn.execute(
+                    'SELECT value, expires_at FROM kv_store WHERE namespace = ? AND key = ?',
+                    (self.namespace, key)
+                ).fetchone()
+                # Deleted, or re-armed with a later deadline (a newer heap entry exists)
+                if row is None or row[1] > now:
+                    continue
+                conn.execute(
+                    'DELETE FROM kv_store WHERE namespace = ? AND key = ?',
+                    (self.namespace, key)
+                )
+                expired.append((key, row[0]))
+
+        return self._finish_expiry(expired)
+
+    def purge_expired(self) -> Tuple[int, int]:
+        """
+        Delete every expired row with a full indexed scan.
+
+        Catches entries whose deadline is not in this process's heap, e.g.
+        ones written by another process.
+
+        Returns:
+            (expired entries, reclaimed bytes)
+        """
+        _ensure_schema()
+        now = time.time()
+
+        with write_connection() as conn:
+            rows = conn.execute(
+                'SELECT key, value FROM kv_store WHERE namespace = ? AND expires_at <= ?',
+                (self.namespace, now)
+            ).fetchall()
+            conn.execute(
+                'DELETE FROM kv_store WHERE namespace = ? AND expires_at <= ?',
+                (self.namespace, now)
+            )
+
+        return self._finish_expiry(rows)
+
+    def _finish_expiry(self, expired: list) -> Tuple[int, int]:
+        """Drop expired entries from memory, run callbacks and count them."""
+        reclaimed = 0
+        for key, payload in expired:
+            self._memory.pop(key)
+            reclaimed += len(payload)
+            if self.on_expire:
+                try:
+                    reclaimed += self.on_expire(key, json.loads(payload)) or 0
+                except Exception as e:
+                    logger.error(f"Expiry callback failed for {self.namespace}/{key}: {e}")
+
+        if expired:
+            metrics.inc("ttl_store_expired_entries_total", len(expired), store=self.namespace)
+            metrics.inc("ttl_store_reclaimed_bytes_total", reclaimed, store=self.namespace)
+        return len(expired), reclaimed
+
+    def _load_deadlines(self) -> None:
+        """Seed the heap with entries persisted by a previous run."""
+        if self._deadlines_loaded:
+            return
+        with self._deadlines_lock:
+            if self._deadlines_loaded:
+                return
+            _ensure_schema()
+            with read_connection() as conn:
+                rows = conn.execute(
+                    'SELECT key, expires_at FROM kv_store WHERE namespace = ?',
+                    (self.namespace,)
+                ).fetchall()
+            for key, expires_at in rows:
+                self._deadlines.push(expires_at, key)
+            self._deadlines_loaded = True
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Dict[str, Any]) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.delete(key)
@@ -0,0 +1,30 @@
+"""Shared worker pools for the blocking transcription stages."""
+
+from typing import Any, Callable
+
+from .governor import decode_pool, denoise_pool, inference_pool
+
+
+def queue_depth() -> int:
+    """Return the number of inference calls waiting for or running on the pool."""
+    return inference_pool.pending()
+
+
+def idle_workers() -> int:
+    """Return how many inference threads have nothing to do."""
+    return inference_pool.idle()
+
+
+async def run_in_worker(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking inference call on the inference pool."""
+    return await inference_pool.run(func, *args)
+
+
+async def run_decode(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking decode call on the decode pool."""
+    return await decode_pool.run(func, *args)
+
+
+async def run_denoise(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking denoise call on the denoise pool."""
+    return await denoise_pool.run(func, *args)